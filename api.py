@@ -0,0 +1,294 @@
+"""
+Headless JSON API for prescription parsing, validation, OCR and diagnosis.
+
+    POST /parse       {"text": "..."}                                 -> {"prescriptions": [...]}
+    POST /validate    {"prescriptions": [...], "patient_info": {...},
+                       "diagnosis": "..."}                            -> validation result
+    POST /ocr         image upload (form field "image" or raw body)   -> {"text", "medications"}
+    POST /diagnose    image upload and/or form field "symptoms"       -> {"result"}
+    GET  /health                                                      -> pool status
+
+Request threads only decode input and wait: the work runs in a process pool of
+API_WORKERS, each worker holding its own knowledge base, OCR engine and caches. At most
+API_WORKERS + API_QUEUE jobs are admitted at once; beyond that requests are refused
+straight away with 429 and a Retry-After header instead of queueing without bound. A job
+that hasn't finished within API_TIMEOUT seconds gets 504; its slot is only freed when
+the worker actually finishes, so admission always reflects real pool occupancy. A job
+that raises gets 500 with the error, and a worker that dies (e.g. killed for memory)
+gets 503 while the pool is restarted.
+
+The pool belongs to the process, so serve with one process and many threads:
+    python api.py --port 8000 --workers 4
+"""
+import argparse
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List
+
+from flask import Flask, jsonify, request
+from PIL import Image, UnidentifiedImageError
+
+import ocr_engine
+from jobs import diagnose_job, ocr_job
+
+API_WORKERS = int(os.environ.get("API_WORKERS", os.cpu_count() or 1))
+API_QUEUE = int(os.environ.get("API_QUEUE", 4 * API_WORKERS))  # admitted jobs waiting for a worker
+API_TIMEOUT = float(os.environ.get("API_TIMEOUT", 30))  # seconds
+MAX_UPLOAD_BYTES = 16 * 1024 * 1024
+NUMERIC_PATIENT_FIELDS = ("age", "weight")  # JSON numbers accepted as well as text
+
+app = Flask(__name__)
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+
+
+class Overloaded(Exception):
+    """Every worker is busy and the admission queue is full."""
+
+
+class JobFailed(Exception):
+    """A job raised in its worker; carries the original error as text."""
+
+
+# Jobs: module-level so they pickle into the worker processes (OCR and diagnosis are
+# shared with the app's background jobs in jobs.py)
+
+def _init_worker():
+    # Parallelism comes from the process pool, so each worker needs only one OCR engine
+    ocr_engine.configure_pool(size=1)
+    import validation_cache
+    validation_cache.load_knowledge_base()
+
+
+def _call(job: Callable, *args):
+    # Not every exception survives pickling back to the parent (tesseract's don't), and
+    # one that fails to unpickle breaks the whole pool, so errors travel as text
+    try:
+        return job(*args)
+    except Exception as e:
+        raise JobFailed(f"{type(e).__name__}: {e}") from None
+
+
+def parse_job(text: str) -> List[Dict]:
+    from validation_cache import cached_parse
+    return cached_parse(text)
+
+
+def validate_job(prescriptions: List[Dict], patient_info: Dict, diagnosis: str) -> Dict:
+    from validation_cache import cached_validate
+    return cached_validate(prescriptions, patient_info, diagnosis)
+
+
+class WorkerPool:
+    """Process pool with bounded admission: run() refuses work rather than queueing it."""
+
+    def __init__(self, workers: int = API_WORKERS, max_queue: int = API_QUEUE):
+        self.workers = workers
+        self.capacity = workers + max_queue
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def run(self, job: Callable, *args, timeout: float = API_TIMEOUT):
+        """
+        Run job(*args) in a worker and return its result. Raises Overloaded when no slot is
+        free, TimeoutError when the job takes longer than timeout seconds, JobFailed when
+        it raises and BrokenProcessPool when its worker died.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise Overloaded()
+        with self._lock:
+            self._in_flight += 1
+        executor = self._executor
+        try:
+            future = executor.submit(_call, job, *args)
+        except BrokenProcessPool:
+            self._release(None)
+            self._restart(executor)
+            raise
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()  # only helps if it never started; otherwise the slot frees when it ends
+            raise
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is not broken:
+                return  # another request got here first
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> WorkerPool:
+    """Process-wide worker pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool()
+    return _pool
+
+
+def configure_worker_pool(workers: int = API_WORKERS, max_queue: int = API_QUEUE) -> WorkerPool:
+    """Replace the process-wide worker pool, e.g. from the command line."""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, WorkerPool(workers, max_queue)
+    if old is not None:
+        old.shutdown()
+    return _pool
+
+
+def error(status: int, message: str):
+    return jsonify({"error": message}), status
+
+
+def upload_bytes() -> bytes:
+    """Image bytes from the "image" form field, or the raw request body."""
+    if "image" in request.files:
+        return request.files["image"].read()
+    return b"" if request.form else request.get_data()
+
+
+def is_image(data: bytes) -> bool:
+    # Only reads the header, so rejecting junk costs the request thread next to nothing
+    try:
+        Image.open(io.BytesIO(data))
+    except (UnidentifiedImageError, OSError):
+        return False
+    return True
+
+
+@app.errorhandler(Overloaded)
+def overloaded(_e):
+    response, status = error(429, "server busy, retry shortly")
+    response.headers["Retry-After"] = "1"
+    return response, status
+
+
+@app.errorhandler(TimeoutError)
+def timed_out(_e):
+    return error(504, f"job did not finish within {API_TIMEOUT:g}s")
+
+
+@app.errorhandler(JobFailed)
+def failed(e):
+    # e.g. tesseract or the diagnosis model isn't installed on this server
+    return error(500, str(e))
+
+
+@app.errorhandler(BrokenProcessPool)
+def worker_died(_e):
+    response, status = error(503, "worker process died; the pool is restarting, retry shortly")
+    response.headers["Retry-After"] = "1"
+    return response, status
+
+
+@app.errorhandler(413)
+def too_large(_e):
+    return error(413, f"upload exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+
+
+@app.post("/parse")
+def parse():
+    body = request.get_json(silent=True) or {}
+    text = body.get("text")
+    if not isinstance(text, str):
+        return error(400, 'expected {"text": "<prescription text>"}')
+    return jsonify({"prescriptions": get_worker_pool().run(parse_job, text)})
+
+
+@app.post("/validate")
+def validate():
+    body = request.get_json(silent=True) or {}
+    prescriptions = body.get("prescriptions")
+    patient_info = body.get("patient_info", {})
+    diagnosis = body.get("diagnosis", "")
+    if not isinstance(prescriptions, list) or not all(isinstance(p, dict) for p in prescriptions):
+        return error(400, '"prescriptions" must be a list of objects')
+    if not isinstance(patient_info, dict) or not isinstance(diagnosis, str):
+        return error(400, '"patient_info" must be an object and "diagnosis" a string')
+    # Fields may be left out, but the validator strips and parses them all as text
+    for i, p in enumerate(prescriptions):
+        for field, value in p.items():
+            if not isinstance(value, str):
+                return error(400, f'"prescriptions"[{i}].{field} must be a string')
+    for field, value in patient_info.items():
+        if field in NUMERIC_PATIENT_FIELDS:
+            if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+                return error(400, f'"patient_info".{field} must be a number or a string')
+        elif not isinstance(value, str):
+            return error(400, f'"patient_info".{field} must be a string')
+    return jsonify(get_worker_pool().run(validate_job, prescriptions, patient_info, diagnosis))
+
+
+@app.post("/ocr")
+def ocr():
+    data = upload_bytes()
+    if not data:
+        return error(400, 'expected an image in form field "image" or as the request body')
+    if not is_image(data):
+        return error(400, "upload is not a readable image")
+    return jsonify(get_worker_pool().run(ocr_job, data))
+
+
+@app.post("/diagnose")
+def diagnose():
+    data = upload_bytes()
+    symptoms = request.form.get("symptoms", "")
+    if not data and not symptoms:
+        return error(400, 'expected an image (form field "image") and/or form field "symptoms"')
+    if data and not is_image(data):
+        return error(400, "upload is not a readable image")
+    return jsonify({"result": get_worker_pool().run(diagnose_job, data, symptoms)})
+
+
+@app.get("/health")
+def health():
+    pool = get_worker_pool()
+    return jsonify({"workers": pool.workers, "capacity": pool.capacity, "in_flight": pool.in_flight})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON API for prescription parsing, validation, OCR and diagnosis")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="worker processes")
+    parser.add_argument("--queue", type=int, default=None, help="admitted jobs waiting for a worker (default 4 per worker)")
+    args = parser.parse_args()
+
+    pool = configure_worker_pool(args.workers, args.queue if args.queue is not None else 4 * args.workers)
+    print(f"✅ Serving on http://{args.host}:{args.port} with {pool.workers} workers, "
+          f"{pool.capacity} admitted jobs at most", file=sys.stderr)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,22 @@
 import streamlit as st
 import time
-import random
-from datetime import datetime
-from typing import List, Dict, Any
+import uuid
+from typing import List, Dict, Any, Optional
 import json
-from prescription_parser import parse_prescription_text
-from validator import validate_prescription_data
-from ocr_utils import extract_text_from_image, parse_prescription
+import html
+import re
 
 
+# The chat shows the latest CHAT_WINDOW messages; each "show earlier" adds CHAT_PAGE more
+CHAT_WINDOW = 20
+CHAT_PAGE = 20
+JOB_POLL_SECONDS = 0.5
+JOB_QUICK_WAIT = 0.1  # seconds to wait for a job before showing progress (cache hits finish in time)
+# Session state kept in the bounded session store between reruns instead of st.session_state
+STORED_STATE = ('dark_mode', 'messages', 'chat_window', 'current_symptoms', 'diagnosis_stage', 'answers',
+                'pending_question', 'prescription_data', 'validation_result', 'ocr')
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+
 # Page config
 st.set_page_config(
     page_title="MedValidator AI",
@@ -17,6 +25,31 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Heavy modules (OCR, SciPy, the knowledge base) are imported on first use, not per rerun,
+# and held as cache_resource so every session of this server process shares one copy
+@st.cache_resource(show_spinner="Loading the drug knowledge base...")
+def validation_service():
+    import validation_cache
+    validation_cache.load_knowledge_base()
+    return validation_cache
+
+@st.cache_resource(show_spinner="Loading the symptom knowledge base...")
+def symptom_service():
+    from symptom_engine import get_symptom_engine
+    return get_symptom_engine()
+
+@st.cache_resource
+def session_store():
+    from session_store import get_session_store
+    return get_session_store()
+
+@st.cache_resource
+def job_service():
+    # OCR (and any model inference) runs here, off the script thread, for every session
+    import jobs
+    jobs.get_job_runner()
+    return jobs
+
 # Custom CSS for styling
 def load_css():
     st.markdown("""
@@ -177,21 +210,28 @@ def load_css():
 
 # Initialize session state
 def init_session_state():
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    for key, value in (session_store().get(st.session_state.session_id) or {}).items():
+        if key not in st.session_state:
+            st.session_state[key] = value
     if 'dark_mode' not in st.session_state:
         st.session_state.dark_mode = False
     if 'messages' not in st.session_state:
+        # (type, content, unix time) tuples: compact however long the consultation gets
         st.session_state.messages = [
-            {
-                'id': '1',
-                'type': 'bot',
-                'content': "Hello! I'm your AI medical assistant. I'll help you understand your symptoms better. Please describe your main symptoms, and I'll ask follow-up questions to narrow down possible conditions.",
-                'timestamp': datetime.now()
-            }
+            ('bot', "Hello! I'm your AI medical assistant. I'll help you understand your symptoms better. Please describe your main symptoms, and I'll ask follow-up questions to narrow down possible conditions.", int(time.time()))
         ]
+    if 'chat_window' not in st.session_state:
+        st.session_state.chat_window = CHAT_WINDOW
     if 'current_symptoms' not in st.session_state:
         st.session_state.current_symptoms = []
     if 'diagnosis_stage' not in st.session_state:
         st.session_state.diagnosis_stage = 'initial'
+    if 'answers' not in st.session_state:
+        # {symptom id: yes/no} replies to follow-up questions, and the question awaiting one
+        st.session_state.answers = {}
+        st.session_state.pending_question = None
     if 'prescription_data' not in st.session_state:
         st.session_state.prescription_data = {
             'diagnosis': '',
@@ -205,6 +245,16 @@ def init_session_state():
         }
     if 'validation_result' not in st.session_state:
         st.session_state.validation_result = None
+    if 'ocr' not in st.session_state:
+        # The current upload's file id, background job id and, once collected, result or error
+        st.session_state.ocr = None
+
+def save_session_state():
+    """Hand this session's state to the store, holding none of it here until the next rerun."""
+    state = {key: st.session_state[key] for key in STORED_STATE if key in st.session_state}
+    session_store().put(st.session_state.session_id, state)
+    for key in state:
+        del st.session_state[key]
 
 def toggle_theme():
     st.session_state.dark_mode = not st.session_state.dark_mode
@@ -227,25 +277,14 @@ def diagnosis_chat():
     st.markdown("### AI Diagnosis Assistant")
     st.caption("Describe your symptoms and I'll help narrow down possible conditions")
     
-    # Chat messages container
-    chat_container = st.container()
-    
-    with chat_container:
-        for message in st.session_state.messages:
-            if message['type'] == 'user':
-                st.markdown(f"""
-                <div class="message user-message">
-                    {message['content']}<br>
-                    <small>{message['timestamp'].strftime('%H:%M:%S')}</small>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown(f"""
-                <div class="message bot-message">
-                    🤖 {message['content']}<br>
-                    <small>{message['timestamp'].strftime('%H:%M:%S')}</small>
-                </div>
-                """, unsafe_allow_html=True)
+    # Only the latest messages are rendered, as one HTML block, so a rerun costs the same
+    # however long the transcript is
+    messages = st.session_state.messages
+    hidden = max(0, len(messages) - st.session_state.chat_window)
+    if hidden and st.button(f"Show earlier messages ({hidden} more)"):
+        st.session_state.chat_window += CHAT_PAGE
+        st.rerun()
+    st.markdown(chat_html(messages[hidden:]), unsafe_allow_html=True)
     
     # Input area
     st.markdown("---")
@@ -266,6 +305,7 @@ def diagnosis_chat():
     
     if send_button and user_input.strip():
         process_user_message(user_input.strip())
+        st.session_state.chat_window = CHAT_WINDOW
         st.rerun()
     
     # Warning notice
@@ -275,31 +315,31 @@ def diagnosis_chat():
     </div>
     """, unsafe_allow_html=True)
 
+def chat_html(messages: List[tuple]) -> str:
+    """One HTML block for a run of (type, content, unix time) messages."""
+    parts = []
+    for kind, content, sent in messages:
+        # Escaped so message text can't inject markup; **bold** and line breaks are kept
+        text = _BOLD.sub(r"<strong>\1</strong>", html.escape(content)).replace("\n", "<br>")
+        prefix = "" if kind == 'user' else "🤖 "
+        parts.append(f'<div class="message {kind}-message">{prefix}{text}<br>'
+                     f'<small>{time.strftime("%H:%M:%S", time.localtime(sent))}</small></div>')
+    return "".join(parts)
+
 def process_user_message(user_input: str):
     # Add user message
-    user_message = {
-        'id': str(int(time.time() * 1000)),
-        'type': 'user',
-        'content': user_input,
-        'timestamp': datetime.now()
-    }
-    st.session_state.messages.append(user_message)
+    st.session_state.messages.append(('user', user_input, int(time.time())))
     
     # Process based on diagnosis stage
-    if st.session_state.diagnosis_stage == 'initial':
-        symptom = {
-            'name': user_input,
-            'severity': 5,
-            'duration': 'recent'
-        }
-        st.session_state.current_symptoms = [symptom]
-        st.session_state.diagnosis_stage = 'followup'
-        
-        # Generate follow-up question
-        bot_response = generate_followup_question(st.session_state.current_symptoms)
-        
-    elif st.session_state.diagnosis_stage == 'followup':
-        # Add more context
+    if st.session_state.diagnosis_stage in ('initial', 'followup'):
+        from symptom_engine import parse_answer
+        # A reply opening with yes/no answers the pending question; the rest of it is
+        # still read for symptoms ("no, but my throat hurts")
+        pending = st.session_state.pending_question
+        answer = parse_answer(user_input) if pending is not None else None
+        if answer is not None:
+            st.session_state.answers[pending] = answer
+        st.session_state.pending_question = None
         symptom = {
             'name': user_input,
             'severity': 5,
@@ -307,91 +347,67 @@ def process_user_message(user_input: str):
         }
         st.session_state.current_symptoms.append(symptom)
         
-        if len(st.session_state.current_symptoms) >= 3:
-            st.session_state.diagnosis_stage = 'diagnosis'
-            bot_response = generate_diagnosis(st.session_state.current_symptoms)
+        texts = [s['name'] for s in st.session_state.current_symptoms]
+        if not symptom_service().rank(texts, k=1, answers=st.session_state.answers):
+            bot_response = ("I couldn't match that to symptoms I know about. Could you describe them "
+                            "differently (for example \"fever\", \"sore throat\" or \"stomach pain\")?")
         else:
             bot_response = generate_followup_question(st.session_state.current_symptoms)
+            if bot_response is None:
+                st.session_state.diagnosis_stage = 'diagnosis'
+                bot_response = generate_diagnosis(st.session_state.current_symptoms)
+            else:
+                st.session_state.diagnosis_stage = 'followup'
     
     else:  # diagnosis stage
         if 'new' in user_input.lower() or 'start' in user_input.lower():
             st.session_state.diagnosis_stage = 'initial'
             st.session_state.current_symptoms = []
+            st.session_state.answers = {}
+            st.session_state.pending_question = None
             bot_response = "Let's start a new consultation. Please describe your main symptoms."
         else:
             bot_response = "I can help you with symptom analysis. Type 'new consultation' to start over, or switch to the Prescription Checker tab if you need prescription validation."
     
     # Add bot response
-    bot_message = {
-        'id': str(int(time.time() * 1000) + 1),
-        'type': 'bot',
-        'content': bot_response,
-        'timestamp': datetime.now()
-    }
-    st.session_state.messages.append(bot_message)
-
-def generate_followup_question(symptoms: List[Dict]) -> str:
-    questions = [
-        "How long have you been experiencing these symptoms?",
-        "On a scale of 1-10, how would you rate the severity of your symptoms?",
-        "Do you have any fever or temperature changes?",
-        "Have you experienced any nausea or vomiting?",
-        "Are you taking any medications currently?",
-        "Do you have any known allergies or medical conditions?",
-        "Have you traveled recently or been exposed to anyone who was sick?"
-    ]
-    return random.choice(questions)
+    st.session_state.messages.append(('bot', bot_response, int(time.time())))
+
+def generate_followup_question(symptoms: List[Dict]) -> Optional[str]:
+    """
+    The yes/no question expected to narrow the diagnosis most, or None once the
+    assessment is confident enough (or further questions wouldn't change it).
+    """
+    engine = symptom_service()
+    question = engine.next_question([s['name'] for s in symptoms], st.session_state.answers)
+    st.session_state.pending_question = question
+    return engine.questions[question] if question is not None else None
 
 def generate_diagnosis(symptoms: List[Dict]) -> str:
-    possible_diagnoses = [
-        {
-            'condition': "Upper Respiratory Infection",
-            'confidence': "85%",
-            'description': "Common cold or flu-like symptoms",
-            'recommendations': [
-                "Rest and stay hydrated",
-                "Consider over-the-counter pain relievers",
-                "Monitor symptoms for 7-10 days",
-                "Seek medical attention if symptoms worsen"
-            ]
-        },
-        {
-            'condition': "Seasonal Allergies",
-            'confidence': "70%",
-            'description': "Allergic reaction to environmental factors",
-            'recommendations': [
-                "Avoid known allergens",
-                "Consider antihistamines",
-                "Use air purifiers indoors",
-                "Consult an allergist if symptoms persist"
-            ]
-        },
-        {
-            'condition': "Mild Gastroenteritis",
-            'confidence': "75%",
-            'description': "Stomach flu or food-related illness",
-            'recommendations': [
-                "Stay hydrated with clear fluids",
-                "Follow the BRAT diet (Bananas, Rice, Applesauce, Toast)",
-                "Rest and avoid solid foods temporarily",
-                "Seek medical care if symptoms persist over 3 days"
-            ]
-        }
-    ]
-    
-    diagnosis = random.choice(possible_diagnoses)
-    
+    ranked = symptom_service().rank([s['name'] for s in symptoms], answers=st.session_state.answers)
+    if not ranked:
+        return ("I couldn't match what you've described to symptoms I know about. Could you describe "
+                "them differently (for example \"fever\", \"sore throat\" or \"stomach pain\")? "
+                "Type 'new consultation' to start over.")
+
+    diagnosis = ranked[0]
     response = f"""Based on your symptoms, here's my assessment:
 
 **Likely Condition:** {diagnosis['condition']}
-**Confidence Level:** {diagnosis['confidence']}
+**Confidence Level:** {diagnosis['probability']:.0%}
 
 **Description:** {diagnosis['description']}
 
-**Recommendations:**
+**Matched Symptoms:** {', '.join(diagnosis['matched'])}
 """
+    if diagnosis['urgent']:
+        response += "\n🚨 **This can be serious. Please seek medical care promptly.**\n"
+    response += "\n**Recommendations:**\n"
     for rec in diagnosis['recommendations']:
         response += f"• {rec}\n"
+    others = [other for other in ranked[1:] if other['probability'] >= 0.01]
+    if others:
+        response += "\n**Other Possibilities:** " + ", ".join(
+            f"{other['condition']} ({other['probability']:.0%})" for other in others) + "\n"
     
     response += "\n⚠️ **Important:** This is an AI assessment only. Please consult with a healthcare professional for proper diagnosis and treatment.\n\nWould you like to start a new consultation or check a prescription?"
     
@@ -514,16 +530,17 @@ def prescription_checker():
                 )
                 
                 # Convert free-text into structured prescriptions
-                parsed_prescriptions = parse_prescription_text(user_text)
+                service = validation_service()
+                parsed_prescriptions = service.cached_parse(user_text)
                 
                 # Overwrite the structured prescriptions in session state
                 st.session_state.prescription_data['prescriptions'] = parsed_prescriptions
 
-                # ✅ Call validator with all arguments
-                st.session_state.validation_result = validate_prescription_data(
-                    st.session_state.prescription_data['diagnosis'],
+                # ✅ Call validator with all arguments (memoized across reruns)
+                st.session_state.validation_result = service.cached_validate(
+                    st.session_state.prescription_data['prescriptions'],
                     st.session_state.prescription_data['patient_info'],
-                    st.session_state.prescription_data['prescriptions']
+                    st.session_state.prescription_data['diagnosis']
                 )
 
                 st.rerun()
@@ -547,21 +564,7 @@ def prescription_checker():
         st.markdown("#### 📷 Upload Prescription Image")
         uploaded_file = st.file_uploader("Upload prescription image", type=["jpg", "jpeg", "png"])
         if uploaded_file is not None:
-            with open("temp_image.png", "wb") as f:
-                f.write(uploaded_file.getbuffer())
-
-            # Run OCR
-            raw_text = extract_text_from_image("temp_image.png")
-            st.text_area("Extracted OCR Text", raw_text, height=150)
-
-            # Parse OCR results into structured prescriptions
-            parsed_meds = parse_prescription(raw_text)
-            st.session_state.prescription_data['prescriptions'] = [
-                {"medication": med["name"], "dosage": f"{med['dosage']}{med['unit']}", "frequency": "", "duration": ""}
-                for med in parsed_meds
-            ]
-
-            st.success("✅ Prescription data extracted from image! Now you can validate.")
+            ocr_upload(uploaded_file)
         # --- End image upload feature ---
     
     with col2:
@@ -572,104 +575,50 @@ def prescription_checker():
         else:
             display_validation_results()
 
-def validate_prescription_data(
-    diagnosis: str,
-    patient_info: Dict[str, str],
-    prescriptions: List[Dict[str, str]]
-) -> Dict:
-    """
-    Validates prescription data.
-    
-    Args:
-        diagnosis: str, medical diagnosis
-        patient_info: dict with 'age', 'weight', 'allergies', 'conditions'
-        prescriptions: list of dicts with 'medication', 'dosage', 'frequency', 'duration'
-    
-    Returns:
-        dict with overall status, item-level messages, and recommendations
-    """
-    result = {
-        'overall': 'approved',
-        'items': [],
-        'recommendations': [
-            'Verify patient allergies before dispensing',
-            'Monitor patient for adverse reactions',
-            'Ensure proper patient education on medication usage',
-            'Schedule appropriate follow-up appointments'
-        ]
-    }
-
-    age = patient_info.get('age', '')
-    allergies = patient_info.get('allergies', '').lower()
-    diagnosis_lower = diagnosis.lower()
-
-    for i, prescription in enumerate(prescriptions):
-        med = prescription.get('medication', '').strip()
-        dose = prescription.get('dosage', '').strip()
-        freq = prescription.get('frequency', '').strip()
-        issues = []
-        status = 'approved'
-
-        if not med:
-            issues.append("Medication name is required")
-            status = 'rejected'
-
-        if not dose:
-            issues.append("Dosage is required")
-            status = 'rejected'
-
-        # Allergy check example
-        if 'penicillin' in med.lower() and 'penicillin' in allergies:
-            issues.append("ALLERGY ALERT: Patient is allergic to penicillin")
-            status = 'rejected'
-
-        # Age check example
-        if age.isdigit() and int(age) < 16 and 'aspirin' in med.lower():
-            issues.append("AGE WARNING: Aspirin not recommended for patients under 16")
-            if status == 'approved':
-                status = 'warning'
-
-        # Frequency check example
-        if 'ibuprofen' in med.lower() and '4 times' in freq.lower():
-            issues.append("DOSAGE WARNING: High frequency for ibuprofen, monitor for GI effects")
-            if status == 'approved':
-                status = 'warning'
-
-        # Diagnosis matching example
-        if 'infection' in diagnosis_lower and not any(x in med.lower() for x in ['antibiotic', 'amoxicillin', 'penicillin']):
-            issues.append("INFO: Consider antibiotic for bacterial infection")
-            if status == 'approved':
-                status = 'warning'
-
-        if not issues:
-            issues.append("Prescription appears appropriate for the given diagnosis")
-
-        result['items'].append({
-            'medication': med or f"Medication {i + 1}",
-            'status': status,
-            'message': '. '.join(issues)
-        })
-
-    # Determine overall status
-    if any(item['status'] == 'rejected' for item in result['items']):
-        result['overall'] = 'rejected'
-    elif any(item['status'] == 'warning' for item in result['items']):
-        result['overall'] = 'warning'
-
-    return result
-
-
-# Quick test
-if __name__ == "__main__":
-    patient = {'age': '15', 'weight': '50', 'allergies': 'Penicillin', 'conditions': ''}
-    prescriptions = [
-        {'medication': 'Amoxicillin', 'dosage': '500mg', 'frequency': 'twice daily', 'duration': '7 days'},
-        {'medication': 'Aspirin', 'dosage': '100mg', 'frequency': 'once daily', 'duration': '5 days'}
-    ]
-    diagnosis = 'Bacterial infection'
-    res = validate_prescription_data(diagnosis, patient, prescriptions)
-    print(res)
+def ocr_upload(uploaded_file):
+    """OCR an upload in the background, then fill the medications in from it once."""
+    jobs = job_service()
+    runner = jobs.get_job_runner()
+    ocr = st.session_state.ocr
+    if ocr is None or ocr['file_id'] != uploaded_file.file_id:
+        job_id = jobs.submit_ocr(uploaded_file.getvalue(), st.session_state.session_id)
+        ocr = st.session_state.ocr = {'file_id': uploaded_file.file_id, 'job_id': job_id, 'result': None, 'error': None}
+        job = runner.get(job_id)
+        if job is not None:  # another session's submit() may already have pruned it
+            job.wait(JOB_QUICK_WAIT)
+
+    if ocr['result'] is None and ocr['error'] is None:
+        job = runner.get(ocr['job_id'])
+        if job is None:
+            ocr['error'] = "The OCR job expired. Please upload the image again."
+        elif not job.done:
+            job_progress(job.id)
+            return
+        elif job.error:
+            ocr['error'] = job.error
+        else:
+            ocr['result'] = job.result
+            # Parse OCR results into structured prescriptions; the form above is already
+            # drawn, so rerun to show them
+            st.session_state.prescription_data['prescriptions'] = [
+                {"medication": med["name"], "dosage": f"{med['dosage']}{med['unit']}", "frequency": "", "duration": ""}
+                for med in job.result['medications']
+            ]
+            st.rerun()
 
+    if ocr['error']:
+        st.error(f"Couldn't read the image: {ocr['error']}")
+        return
+    st.text_area("Extracted OCR Text", ocr['result']['text'], height=150)
+    st.success("✅ Prescription data extracted from image! Now you can validate.")
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(job_id: str):
+    # Only this fragment reruns while the job works; the whole page reruns when it ends
+    job = job_service().get_job_runner().get(job_id)
+    if job is None or job.done:
+        st.rerun()
+    st.progress(job.progress, text=job.message)
 
 def display_validation_results():
     result = st.session_state.validation_result
@@ -693,6 +642,19 @@ def display_validation_results():
         else:
             st.error(f"❌ **{item['medication']}**\n\n{item['message']}")
     
+    # Drug-drug interactions
+    if result.get('interactions'):
+        st.markdown("**Drug Interactions:**")
+        for found in result['interactions']:
+            pair = " + ".join(found['medications'])
+            text = f"**{pair}** ({found['severity']})\n\n{found['description']}"
+            if found['severity'] == 'contraindicated':
+                st.error(f"❌ {text}")
+            elif found['severity'] in ('major', 'moderate'):
+                st.warning(f"⚠️ {text}")
+            else:
+                st.info(f"ℹ️ {text}")
+    
     # Recommendations
     st.markdown("**General Recommendations:**")
     for rec in result['recommendations']:
@@ -701,7 +663,13 @@ def display_validation_results():
 def main():
     load_css()
     init_session_state()
-    
+    try:
+        render()
+    finally:
+        # Also on st.rerun(), which ends the run with an exception
+        save_session_state()
+
+def render():
     # Apply theme
     theme_class = "theme-dark" if st.session_state.dark_mode else "theme-light"
     st.markdown(f'<div class="{theme_class}">', unsafe_allow_html=True)
@@ -0,0 +1,128 @@
+"""
+Throughput and latency of the JSON API under concurrent load.
+
+Starts api.py in-process on a free port (or targets --url), then keeps --concurrency
+client threads sending requests back to back for --duration seconds per level. Payloads
+are the synthetic prescriptions of benchmarks.scaling; /ocr needs --image. Reports, per
+concurrency level, completed requests per second, latency percentiles of the successful
+ones and how many were refused with 429 or timed out with 504.
+
+Usage (from the repo root):
+    python -m benchmarks.api_load --endpoint validate --concurrency 1 4 16 64 --workers 4
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+from werkzeug.serving import make_server
+
+import api
+from benchmarks.scaling import DIAGNOSES, patient, prescription_items, prescription_text
+
+logging.getLogger("werkzeug").setLevel(logging.ERROR)  # one access-log line per request otherwise
+
+
+def payloads(endpoint: str, rng: random.Random, image: str = None) -> Callable[[], Tuple[bytes, str]]:
+    """Request body factory for an endpoint, as (body, content type)."""
+    if endpoint == "parse":
+        texts = [prescription_text(rng, rng.randint(1, 6)) for _ in range(500)]
+        return lambda: (json.dumps({"text": rng.choice(texts)}).encode(), "application/json")
+    if endpoint == "validate":
+        bodies = [{"prescriptions": prescription_items(rng, rng.randint(1, 6)), "patient_info": patient(rng),
+                   "diagnosis": rng.choice(DIAGNOSES)} for _ in range(500)]
+        return lambda: (json.dumps(rng.choice(bodies)).encode(), "application/json")
+    if endpoint == "ocr":
+        if not image:
+            raise SystemExit("--image is required for the ocr endpoint")
+        with open(image, "rb") as f:
+            data = f.read()
+        return lambda: (data, "application/octet-stream")
+    raise SystemExit(f"unsupported endpoint: {endpoint}")
+
+
+def client(url: str, make_body, stop: float, latencies: List[float], statuses: Counter, lock: threading.Lock):
+    while time.perf_counter() < stop:
+        body, content_type = make_body()
+        req = urllib.request.Request(url, data=body, headers={"Content-Type": content_type})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=api.API_TIMEOUT + 10) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except OSError:
+            status = "connection error"
+        elapsed = (time.perf_counter() - start) * 1e3
+        with lock:
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(elapsed)
+        if status == 429:
+            time.sleep(0.01)  # a real client would honour Retry-After; don't spin
+
+
+def run_level(url: str, make_body, concurrency: int, duration: float) -> Dict:
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    stop = time.perf_counter() + duration
+    threads = [threading.Thread(target=client, args=(url, make_body, stop, latencies, statuses, lock))
+               for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    ms = np.array(latencies) if latencies else np.array([np.nan])
+    return {"ok_per_sec": len(latencies) / elapsed, "p50_ms": np.percentile(ms, 50), "p95_ms": np.percentile(ms, 95),
+            "p99_ms": np.percentile(ms, 99), "statuses": statuses}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", choices=["parse", "validate", "ocr"], default="validate")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--workers", type=int, default=api.API_WORKERS, help="pool size of the in-process server")
+    parser.add_argument("--queue", type=int, default=None, help="admission queue of the in-process server")
+    parser.add_argument("--url", default=None, help="base URL of a running server instead of starting one")
+    parser.add_argument("--image", default=None, help="image file for the ocr endpoint")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = None
+    base = args.url
+    if base is None:
+        pool = api.configure_worker_pool(args.workers, args.queue if args.queue is not None else 4 * args.workers)
+        server = make_server("127.0.0.1", 0, api.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        print(f"Server: {pool.workers} workers, {pool.capacity} admitted jobs", file=sys.stderr)
+    url = f"{base.rstrip('/')}/{args.endpoint}"
+    make_body = payloads(args.endpoint, random.Random(args.seed), args.image)
+
+    run_level(url, make_body, 1, min(args.duration, 2.0))  # warm the workers' knowledge base
+    print(f"{'clients':>8}{'ok/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}   other statuses", file=sys.stderr)
+    for concurrency in args.concurrency:
+        r = run_level(url, make_body, concurrency, args.duration)
+        other = ", ".join(f"{status}: {n}" for status, n in sorted(r["statuses"].items(), key=str) if status != 200)
+        print(f"{concurrency:>8}{r['ok_per_sec']:>10.1f}{r['p50_ms']:>7.1f} ms{r['p95_ms']:>7.1f} ms"
+              f"{r['p99_ms']:>7.1f} ms   {other or '-'}", file=sys.stderr)
+
+    if server is not None:
+        server.shutdown()
+        api.get_worker_pool().shutdown()
+    print(f"✅ Load test of /{args.endpoint} finished", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
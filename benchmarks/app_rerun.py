@@ -0,0 +1,115 @@
+"""
+Rerun latency of the Streamlit app against a budget.
+
+Drives app.py headlessly with streamlit.testing.v1.AppTest. Each interaction (a widget
+change or button click) is timed from the change to the end of the rerun it triggers,
+which is what a user waits for before the page updates. The first run, the first
+validation and the first chat message (which load the drug and symptom knowledge bases)
+are reported once; every other interaction is repeated on a freshly rendered app and its
+p95 compared with RERUN_BUDGET_MS. Exits with status 1 when anything is over budget.
+tests/test_app_rerun.py asserts the same budgets on fewer samples in the test suite;
+this script is for profiling.
+
+Usage (from the repo root):
+    python -m benchmarks.app_rerun --repeat 20
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+APP_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+RUN_TIMEOUT = 60  # seconds; the first run imports the app's dependencies
+COLD_BUDGET_MS = {"first render": 1000, "first validation": 1000, "first chat message": 1000}
+RERUN_BUDGET_MS = {"edit diagnosis": 150, "edit patient age": 150, "add medication": 200,
+                   "toggle theme": 200, "validate": 250, "send chat message": 200,
+                   "chat with 2,000 messages": 200}
+LONG_TRANSCRIPT = [("user" if i % 2 else "bot", f"Message {i}: headache and **fever** for 2 days", 1_700_000_000 + i)
+                   for i in range(2000)]
+
+
+# AppTest runs the script outside a server session, which Streamlit warns about on every run
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+    lambda record: "missing ScriptRunContext" not in record.getMessage())
+
+
+def button(at: AppTest, label: str):
+    return next(b for b in at.button if b.label == label)
+
+
+def send(at: AppTest, text: str) -> AppTest:
+    at.text_area(key="symptom_input").input(text)
+    return button(at, "Send").click()
+
+
+def send_in_long_chat(at: AppTest, text: str) -> AppTest:
+    at.session_state["messages"] = list(LONG_TRANSCRIPT)
+    return send(at, text)
+
+
+INTERACTIONS = {
+    "edit diagnosis": lambda at: at.text_area[0].input("Community-acquired pneumonia"),
+    "edit patient age": lambda at: at.text_input[0].input("42"),
+    "add medication": lambda at: button(at, "+ Add Medication").click(),
+    "toggle theme": lambda at: button(at, "🌙").click(),
+    "validate": lambda at: button(at, "Validate Prescription").click(),
+    "send chat message": lambda at: send(at, "Headache and fever for two days"),
+    "chat with 2,000 messages": lambda at: send_in_long_chat(at, "Also a sore throat"),
+}
+
+
+def render() -> AppTest:
+    at = AppTest.from_file(APP_FILE, default_timeout=RUN_TIMEOUT)
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"{APP_FILE} raised: {at.exception[0].message}")
+    return at
+
+
+def timed(at: AppTest, interaction) -> float:
+    """Milliseconds from the widget change to the end of the rerun."""
+    start = time.perf_counter()
+    interaction(at).run()
+    elapsed = (time.perf_counter() - start) * 1e3
+    if at.exception:
+        raise RuntimeError(f"{APP_FILE} raised: {at.exception[0].message}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="timed repetitions of each interaction")
+    args = parser.parse_args()
+
+    over = []
+    start = time.perf_counter()
+    at = render()
+    cold = {"first render": (time.perf_counter() - start) * 1e3,
+            "first validation": timed(at, INTERACTIONS["validate"]),
+            "first chat message": timed(at, INTERACTIONS["send chat message"])}
+    for name, ms in cold.items():
+        print(f"{name:<26}{ms:>10.1f} ms{'':>12}budget {COLD_BUDGET_MS[name]:>6} ms", file=sys.stderr)
+        if ms > COLD_BUDGET_MS[name]:
+            over.append(f"{name}: {ms:.0f} ms > {COLD_BUDGET_MS[name]} ms")
+
+    for name, interaction in INTERACTIONS.items():
+        ms = np.array([timed(render(), interaction) for _ in range(args.repeat)])
+        p50, p95 = np.percentile(ms, 50), np.percentile(ms, 95)
+        print(f"{name:<26}{p50:>10.1f} ms p50{p95:>8.1f} ms p95  budget {RERUN_BUDGET_MS[name]:>6} ms",
+              file=sys.stderr)
+        if p95 > RERUN_BUDGET_MS[name]:
+            over.append(f"{name}: p95 {p95:.0f} ms > {RERUN_BUDGET_MS[name]} ms")
+
+    for failure in over:
+        print(f"❌ {failure}", file=sys.stderr)
+    if over:
+        sys.exit(1)
+    print(f"✅ {len(cold) + len(INTERACTIONS)} measurements within budget", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Fuzzy lookup latency of the drug lexicon as the name list grows.
+
+data/drug_names.txt is a seed list of a few hundred generics; a production list (a
+national formulary, brand names included) runs to tens of thousands. This pads the
+shipped names with synthetic pronounceable ones up to each --size and times lookups of
+misspelled real names (one or two random edits, as OCR makes them), with the memo
+bypassed so every lookup does the work. Also reports how often the misspelling
+resolves back to the intended name.
+
+Usage (from the repo root):
+    python -m benchmarks.lexicon_lookup --size 1000 10000 50000
+"""
+import argparse
+import random
+import string
+import time
+from typing import Iterable, List
+
+from drug_lexicon import DRUG_NAMES_FILE, DrugLexicon, allowed_distance, normalize
+
+SYLLABLES = ["ba", "ce", "di", "fo", "ga", "lo", "mi", "na", "pra", "ro", "sta", "ti", "vo", "xa", "zo",
+             "mab", "nib", "pril", "sartan", "olol", "azole", "cillin", "mycin", "statin", "tide", "vir"]
+
+
+def seed_names(path: str = DRUG_NAMES_FILE) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def synthetic_names(n: int, rng: random.Random, exclude: Iterable[str] = ()) -> List[str]:
+    taken = {normalize(name) for name in exclude}
+    names = []
+    while len(names) < n:
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5)))
+        if name not in taken:
+            taken.add(name)
+            names.append(name.capitalize())
+    return names
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    word = normalize(name).replace(" ", "")
+    for _ in range(rng.randint(1, allowed_distance(word) or 1)):
+        i = rng.randrange(len(word))
+        op = rng.choice(("substitute", "delete", "insert", "swap"))
+        if op == "substitute":
+            word = word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+        elif op == "delete" and len(word) > 1:
+            word = word[:i] + word[i + 1:]
+        elif op == "insert":
+            word = word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+        elif i + 1 < len(word):
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, nargs="+", default=[1000, 10_000, 50_000], help="total names in the lexicon")
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    seed = seed_names()
+    queries = [(name, misspell(name, rng)) for name in (rng.choice(seed) for _ in range(args.queries))]
+    print(f"{'names':>8}{'build':>10}{'lookup':>12}{'resolved':>10}")
+    for size in [len(seed)] + args.size:
+        names = seed + synthetic_names(max(size - len(seed), 0), rng, seed)
+        start = time.perf_counter()
+        lexicon = DrugLexicon(names)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        hits = [lexicon._lookup(query) for _, query in queries]  # bypass the memo
+        elapsed = time.perf_counter() - start
+        resolved = sum(hit is not None and hit[0] == name for (name, _), hit in zip(queries, hits)) / len(queries)
+        print(f"{len(lexicon.names):>8}{build:>9.2f}s{elapsed / len(queries) * 1e6:>9.1f} us{resolved:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+OCR time and parse accuracy with and without ocr_utils.preprocess_for_ocr.
+
+By default a synthetic sample set of phone-photo-like prescriptions (large, colored,
+skewed, noisy) is generated with known medications. A real sample set can be used
+instead: a directory of images plus labels.json mapping file name -> medication names.
+
+Usage (from the repo root):
+    python -m benchmarks.ocr_preprocess --samples 10
+    python -m benchmarks.ocr_preprocess --sample-dir path/to/prescriptions
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from ocr_engine import get_pool
+from ocr_utils import parse_prescription, preprocess_for_ocr
+
+MEDICATIONS = ["Paracetamol", "Ibuprofen", "Amoxicillin", "Metformin", "Omeprazole",
+               "Atorvastatin", "Cetirizine", "Azithromycin", "Amlodipine", "Losartan"]
+FREQUENCIES = ["once daily", "twice daily", "three times a day", "at night"]
+
+
+def synthetic_samples(n, seed=0, size=(3024, 4032)):
+    """Yield (image, expected medication names) resembling phone photos of a prescription."""
+    rng = random.Random(seed)
+    try:
+        font = ImageFont.load_default(size=size[0] // 30)
+    except TypeError:  # Pillow < 10.1 has no scalable default font
+        font = ImageFont.load_default()
+
+    for _ in range(n):
+        meds = rng.sample(MEDICATIONS, rng.randint(2, 5))
+        page = Image.new("RGB", size, (rng.randint(215, 245), rng.randint(205, 235), rng.randint(180, 220)))
+        draw = ImageDraw.Draw(page)
+        line_height = size[1] // 14
+        y = line_height * 2
+        draw.text((size[0] // 10, y), "Rx", fill=(20, 20, 60), font=font)
+        for med in meds:
+            y += line_height
+            line = f"{med} {rng.choice([100, 250, 500])} mg {rng.choice(FREQUENCIES)}"
+            draw.text((size[0] // 10, y), line, fill=(20, 20, 60), font=font)
+
+        page = page.rotate(rng.uniform(-6, 6), resample=Image.BICUBIC, fillcolor=(90, 80, 70))
+        noise = np.random.default_rng(rng.randint(0, 2 ** 31)).normal(0, 12, (size[1], size[0], 1))
+        page = Image.fromarray(np.clip(np.asarray(page, dtype=np.float64) + noise, 0, 255).astype(np.uint8))
+        yield page.filter(ImageFilter.GaussianBlur(1.5)), meds
+
+
+def directory_samples(sample_dir):
+    with open(os.path.join(sample_dir, "labels.json")) as f:
+        labels = json.load(f)
+    for name, meds in labels.items():
+        with Image.open(os.path.join(sample_dir, name)) as img:
+            img.load()
+            yield img, meds
+
+
+def parse_accuracy(text, expected):
+    found = {m["name"].lower() for m in parse_prescription(text)}
+    return sum(m.lower() in found for m in expected) / len(expected)
+
+
+def run(samples):
+    pool = get_pool()
+    rows = {"raw": [], "preprocessed": []}
+    for image, expected in samples:
+        start = time.perf_counter()
+        text = pool.recognize(image)
+        rows["raw"].append((0.0, time.perf_counter() - start, parse_accuracy(text, expected)))
+
+        start = time.perf_counter()
+        prepared = preprocess_for_ocr(image)
+        prep_time = time.perf_counter() - start
+        start = time.perf_counter()
+        text = pool.recognize(prepared)
+        rows["preprocessed"].append((prep_time, time.perf_counter() - start, parse_accuracy(text, expected)))
+
+    print(f"OCR backend: {pool.backend}, {len(rows['raw'])} sample(s)\n")
+    print(f"{'pipeline':<14}{'prep s/img':>12}{'ocr s/img':>12}{'total s/img':>13}{'parse acc':>11}")
+    for name, values in rows.items():
+        prep, ocr, acc = (np.mean(col) for col in zip(*values))
+        print(f"{name:<14}{prep:>12.3f}{ocr:>12.3f}{prep + ocr:>13.3f}{acc:>11.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=10, help="number of synthetic samples")
+    parser.add_argument("--sample-dir", help="directory with images and labels.json")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run(directory_samples(args.sample_dir) if args.sample_dir else synthetic_samples(args.samples, args.seed))
@@ -0,0 +1,87 @@
+"""
+Throughput of the single-pass prescription grammar against the two regex parsers it
+replaced (kept here verbatim as the baseline).
+
+Usage (from the repo root):
+    python -m benchmarks.parser_throughput --lines 100000
+"""
+import argparse
+import random
+import re
+import time
+
+from prescription_parser import parse_many, parse_prescription_text
+
+MEDS = ["Paracetamol", "Ibuprofen", "Amoxicillin", "Metformin", "Omeprazole", "Insulin glargine",
+        "Salbutamol", "Atorvastatin", "Cetirizine", "Folic acid"]
+STRENGTHS = ["500mg", "200 mg", "250mg", "1 g", "100 mcg", "10 units", "5 ml", "1%"]
+FREQUENCIES = ["once daily", "twice a day", "3 times a day", "every 8 hours", "bd", "at night"]
+DURATIONS = ["for 5 days", "for 7 days", "for 2 weeks", "for 1 month", ""]
+ROUTES = ["", "orally", "po", "inhaled", "sc"]
+
+
+def legacy_parse_prescription_text(text):
+    items = text.split(";")
+    prescriptions = []
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        match = re.match(r"(?P<medication>[a-zA-Z\s]+)\s(?P<dosage>\d+mg)\s(?P<frequency>.+?)\sfor\s(?P<duration>.+)", item)
+        if match:
+            prescriptions.append(match.groupdict())
+        else:
+            prescriptions.append({"medication": item, "dosage": "", "frequency": "", "duration": ""})
+    return prescriptions
+
+
+def legacy_ocr_parse(text):
+    medicines = []
+    pattern = re.compile(r"([A-Za-z]+)\s*(\d+)\s*(mg|ml|g)?", re.IGNORECASE)
+    for line in text.splitlines():
+        match = pattern.search(line)
+        if match:
+            name, dosage, unit = match.groups()
+            medicines.append({"name": name.capitalize(), "dosage": int(dosage), "unit": unit if unit else "mg"})
+    return medicines
+
+
+def generate_lines(n, items_per_line=2, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(n):
+        items = [
+            " ".join(filter(None, [rng.choice(MEDS), rng.choice(STRENGTHS), rng.choice(ROUTES),
+                                   rng.choice(FREQUENCIES), rng.choice(DURATIONS)]))
+            for _ in range(items_per_line)
+        ]
+        lines.append("; ".join(items))
+    return lines
+
+
+def measure(name, fn, lines):
+    start = time.perf_counter()
+    fn(lines)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<36}{len(lines) / elapsed:>14,.0f} lines/sec{elapsed / len(lines) * 1e6:>10.1f} us/line")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--items", type=int, default=2, help="prescription items per line")
+    args = parser.parse_args()
+
+    lines = generate_lines(args.lines, args.items)
+    # Tag every item so no two are alike and parse_many's memo never hits
+    unique = ["; ".join(f"{item} #{i}" for item in line.split("; ")) for i, line in enumerate(lines)]
+
+    measure("legacy parse_prescription_text", lambda ls: [legacy_parse_prescription_text(l) for l in ls], lines)
+    measure("legacy ocr_utils.parse_prescription", lambda ls: [legacy_ocr_parse(l) for l in ls], lines)
+    measure("parse_prescription_text", lambda ls: [parse_prescription_text(l) for l in ls], lines)
+    measure("parse_many (all items distinct)", parse_many, unique)
+    measure("parse_many (realistic repeats)", parse_many, lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Latency and scaling of validation and parsing, checked against a saved baseline.
+
+Each case sweeps one dimension on synthetic input and records, per size, ops/sec and
+per-call latency percentiles, then fits the log-log slope of median latency against the
+size (1.0 = linear, 2.0 = quadratic). Slopes don't depend on the machine, so they are
+what the baseline check enforces: a case fails when its slope exceeds the baseline's by
+more than SLOPE_TOLERANCE. Absolute latencies are reported against the baseline but
+only warn, since they move with the hardware.
+
+    meds_per_prescription   validate_prescription_data, 1..16 items per call
+    rule_set_size           validate_prescription_data under 10..10,000 rules
+    batch_size              bulk_validate.validate_chunk, 10..10,000 records per chunk
+    text_items              parse_prescription_text, 1..64 items per text
+    ocr_lines               ocr_utils.parse_prescription, 1..64 lines of noisy OCR text
+    condition_count         SymptomEngine.rank over 100..20,000 synthetic conditions
+    question_conditions     SymptomEngine.next_question over 100..20,000 synthetic conditions
+
+Usage (from the repo root):
+    python -m benchmarks.scaling                 # run and compare with the baseline
+    python -m benchmarks.scaling --save          # run and overwrite the baseline
+    python -m benchmarks.scaling --case rule_set_size --min-time 1
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+import rules
+from bulk_validate import to_columns, validate_chunk
+from drug_hierarchy import HIERARCHY_FILE, get_drug_hierarchy
+from ocr_utils import parse_prescription
+from prescription_parser import parse_prescription_text
+from symptom_engine import CONDITIONS_FILE, SymptomEngine
+from validator import validate_prescription_data
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "scaling.json")
+SLOPE_TOLERANCE = 0.25
+LATENCY_TOLERANCE = 0.5  # warn when a median is 50% slower than the baseline's
+MIN_CALLS = 5
+
+with open(HIERARCHY_FILE, encoding="utf-8") as _f:
+    DRUGS = sorted(json.load(_f)["drugs"])
+DOSAGES = ["5 mg", "50 mg", "250 mg", "500 mg", "1 g", "100 mcg", "2 tablets"]
+FREQUENCIES = ["once daily", "twice daily", "3 times a day", "every 4 hours", "at night"]
+DURATIONS = ["for 5 days", "for 7 days", "for 2 weeks", "for 1 month"]
+ALLERGIES = ["", "", "penicillin", "nsaids", "sulfa", "cephalosporins"]
+CONDITIONS = ["", "", "asthma", "ckd", "pregnancy", "peptic ulcer"]
+with open(CONDITIONS_FILE, encoding="utf-8") as _f:
+    SYMPTOMS = json.load(_f)["symptoms"]
+COMPLAINTS = ["fever and a bad cough, no runny nose", "headache and nausea, light hurts my eyes",
+              "stomach pain and diarrhoea since yesterday", "itchy rash and I feel tired", "sore throat, swollen glands"]
+DIAGNOSES = ["bacterial infection", "pain", "hypertension", "type 2 diabetes", "asthma exacerbation"]
+
+
+# Synthetic inputs
+
+def prescription_items(rng: random.Random, n: int) -> List[Dict]:
+    return [{"medication": rng.choice(DRUGS).title(), "dosage": rng.choice(DOSAGES),
+             "frequency": rng.choice(FREQUENCIES), "duration": rng.choice(DURATIONS)} for _ in range(n)]
+
+
+def patient(rng: random.Random) -> Dict:
+    return {"age": rng.choice(["", 6, 14, 35, 72]), "weight": rng.choice(["", 22, 70]),
+            "allergies": rng.choice(ALLERGIES), "conditions": rng.choice(CONDITIONS)}
+
+
+def prescription_text(rng: random.Random, n: int) -> str:
+    return "; ".join(" ".join([p["medication"], p["dosage"], p["frequency"], p["duration"]])
+                     for p in prescription_items(rng, n))
+
+
+def ocr_text(rng: random.Random, n: int) -> str:
+    """Lines of OCR-like text: misspelt drug names, stray headers and signatures."""
+    lines = []
+    for p in prescription_items(rng, n):
+        name = p["medication"]
+        if rng.random() < 0.3 and len(name) > 4:
+            i = rng.randrange(1, len(name) - 1)
+            name = name[:i] + rng.choice("rnil1") + name[i + 1:]
+        lines.append(rng.choice([f"{name} {p['dosage']} {p['frequency']}", "Dr. A. Smith MBBS", "Rx"]))
+    return "\n".join(lines)
+
+
+def synthetic_rules(rng: random.Random, n: int) -> List[Dict]:
+    """n rules on real drugs and classes, each also requiring one of 1,000 synthetic conditions."""
+    classes = sorted({c for d in DRUGS for c in get_drug_hierarchy().classes_of(d)})
+    specs = []
+    for i in range(n):
+        trigger = {"drug": [rng.choice(DRUGS)]} if rng.random() < 0.7 else {"drug_class": [rng.choice(classes)]}
+        specs.append({"id": f"synthetic-{i}", "status": "warning", "message": "Synthetic rule {medication}",
+                      "when": {**trigger, "condition": [f"condition {rng.randrange(1000)}"]}})
+    return specs
+
+
+def dispensing_rows(rng: random.Random, n: int) -> List[Dict]:
+    rows = []
+    while len(rows) < n:
+        person = patient(rng)
+        diagnosis = rng.choice(DIAGNOSES)
+        for p in prescription_items(rng, rng.randint(1, 4)):
+            rows.append({"prescription_id": str(len(rows)), "diagnosis": diagnosis, **person, **p})
+    return rows[:n]
+
+
+def synthetic_conditions(rng: random.Random, n: int) -> List[Dict]:
+    """n conditions, each with 4..12 of the real symptoms at random likelihoods."""
+    names = [s["name"] for s in SYMPTOMS]
+    return [{"name": f"condition {i}", "prevalence": rng.uniform(0.1, 10),
+             "symptoms": {s: round(rng.uniform(0.1, 0.95), 2) for s in rng.sample(names, rng.randint(4, 12))}}
+            for i in range(n)]
+
+
+# Cases: each builds its inputs for one size and returns the call to time (given a call counter)
+
+def case_meds_per_prescription(rng, size):
+    calls = [(prescription_items(rng, size), patient(rng), rng.choice(DIAGNOSES)) for _ in range(200)]
+    return lambda i: validate_prescription_data(*calls[i % len(calls)])
+
+
+def case_rule_set_size(rng, size):
+    # Installed as the process-wide engine; run_case puts the original back
+    engine = rules.get_rule_engine()
+    extra = [rules.Rule(spec) for spec in synthetic_rules(rng, size)]
+    rules._engine = rules.RuleEngine(engine.rules + extra, engine.hierarchy, engine.version)
+    calls = [(prescription_items(rng, 3), patient(rng), rng.choice(DIAGNOSES)) for _ in range(200)]
+    return lambda i: validate_prescription_data(*calls[i % len(calls)])
+
+
+def case_batch_size(rng, size):
+    chunk = to_columns(dispensing_rows(rng, size), 0)
+    return lambda i: validate_chunk(chunk)
+
+
+def case_text_items(rng, size):
+    texts = [prescription_text(rng, size) for _ in range(200)]
+    return lambda i: parse_prescription_text(texts[i % len(texts)])
+
+
+def case_ocr_lines(rng, size):
+    texts = [ocr_text(rng, size) for _ in range(200)]
+    return lambda i: parse_prescription(texts[i % len(texts)])
+
+
+def case_condition_count(rng, size):
+    engine = SymptomEngine(SYMPTOMS, synthetic_conditions(rng, size))
+    statements = [[rng.choice(COMPLAINTS), rng.choice(COMPLAINTS)] for _ in range(200)]
+    return lambda i: engine.rank(statements[i % len(statements)])
+
+
+def case_question_conditions(rng, size):
+    engine = SymptomEngine(SYMPTOMS, synthetic_conditions(rng, size))
+    statements = [[rng.choice(COMPLAINTS)] for _ in range(200)]
+    return lambda i: engine.next_question(statements[i % len(statements)])
+
+
+CASES = {
+    "meds_per_prescription": (case_meds_per_prescription, [1, 2, 4, 8, 16]),
+    "rule_set_size": (case_rule_set_size, [10, 100, 1000, 10000]),
+    "batch_size": (case_batch_size, [10, 100, 1000, 10000]),
+    "text_items": (case_text_items, [1, 4, 16, 64]),
+    "ocr_lines": (case_ocr_lines, [1, 4, 16, 64]),
+    "condition_count": (case_condition_count, [100, 1000, 5000, 20000]),
+    "question_conditions": (case_question_conditions, [100, 1000, 5000, 20000]),
+}
+
+
+def measure(call: Callable[[int], object], min_time: float) -> Dict:
+    """ops/sec and latency percentiles (ms) of call, after one warm-up call."""
+    call(0)
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < MIN_CALLS or time.perf_counter() - start < min_time:
+        t = time.perf_counter()
+        call(len(latencies) + 1)
+        latencies.append(time.perf_counter() - t)
+    ms = np.array(latencies) * 1e3
+    return {
+        "ops_per_sec": round(len(ms) / (ms.sum() / 1e3), 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p90_ms": round(float(np.percentile(ms, 90)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "calls": len(ms),
+    }
+
+
+def run_case(name: str, min_time: float, seed: int = 0) -> Dict:
+    make, sizes = CASES[name]
+    points = {}
+    for size in sizes:
+        engine = rules.get_rule_engine()
+        try:
+            points[size] = measure(make(random.Random(seed), size), min_time)
+        finally:
+            rules._engine = engine
+        p = points[size]
+        print(f"{name:<24}{size:>8}{p['ops_per_sec']:>14,.0f} ops/s{p['p50_ms']:>10.3f}{p['p90_ms']:>10.3f}"
+              f"{p['p99_ms']:>10.3f} ms", file=sys.stderr)
+    slope = float(np.polyfit(np.log(sizes), np.log([points[s]["p50_ms"] for s in sizes]), 1)[0])
+    print(f"{name:<24}{'slope':>8}{slope:>14.2f}", file=sys.stderr)
+    return {"slope": round(slope, 3), "points": {str(s): p for s, p in points.items()}}
+
+
+def compare(results: Dict, baseline: Dict) -> List[str]:
+    """Failures (slope regressions); latency regressions are printed as warnings only."""
+    failures = []
+    for name, result in results.items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            continue
+        if result["slope"] > base["slope"] + SLOPE_TOLERANCE:
+            failures.append(f"{name}: slope {result['slope']:.2f} vs baseline {base['slope']:.2f}")
+        for size, point in result["points"].items():
+            base_point = base["points"].get(size)
+            if base_point and point["p50_ms"] > base_point["p50_ms"] * (1 + LATENCY_TOLERANCE):
+                print(f"⚠️ {name} at {size}: p50 {point['p50_ms']:.3f} ms vs baseline {base_point['p50_ms']:.3f} ms",
+                      file=sys.stderr)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="run only these cases")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds spent measuring each size")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="overwrite the baseline with this run")
+    args = parser.parse_args()
+
+    print(f"{'case':<24}{'size':>8}{'throughput':>20}{'p50':>10}{'p90':>10}{'p99':>10}", file=sys.stderr)
+    results = {name: run_case(name, args.min_time) for name in args.case or CASES}
+
+    if args.save:
+        if args.case and os.path.exists(args.baseline):
+            # Re-recording some cases keeps the others' baselines
+            with open(args.baseline) as f:
+                results = {**json.load(f)["cases"], **results}
+        baseline = {"machine": {"python": platform.python_version(), "numpy": np.__version__,
+                                "platform": platform.platform(), "cpus": os.cpu_count()},
+                    "cases": results}
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"✅ Baseline saved -> {args.baseline}", file=sys.stderr)
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save to record one", file=sys.stderr)
+        return
+    with open(args.baseline) as f:
+        failures = compare(results, json.load(f))
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+    print(f"✅ Scaling within {SLOPE_TOLERANCE} of the baseline for {len(results)} cases", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
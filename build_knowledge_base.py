@@ -0,0 +1,52 @@
+"""
+Compile the drug knowledge base into memory-mappable arrays.
+
+Reads the hierarchy, interaction and dose-limit source files once and writes each
+component's arrays plus manifest.json to KNOWLEDGE_BASE_DIR (data/compiled by default).
+After that, get_drug_hierarchy(), get_interaction_table() and get_dose_limits() open the
+compiled copy with mmap instead of parsing, until a source file changes; rerun this then.
+
+Usage:
+    python build_knowledge_base.py [-o data/compiled]
+"""
+import argparse
+import sys
+import time
+
+from dose_check import DOSE_LIMITS_FILE, DoseLimits
+from drug_hierarchy import HIERARCHY_FILE, DrugHierarchy
+from interactions import INTERACTIONS_FILE, InteractionTable
+from knowledge_base import KNOWLEDGE_BASE_DIR, flatten, write_component
+
+
+def build(directory: str = KNOWLEDGE_BASE_DIR) -> dict:
+    """Compile every component into directory; returns {component: bytes written}."""
+    hierarchy = DrugHierarchy.from_file()
+    table = InteractionTable.from_csv(hierarchy=hierarchy)
+    limits = DoseLimits.from_csv()
+    components = [
+        ("hierarchy", hierarchy.arrays, HIERARCHY_FILE, {"version": hierarchy.version}),
+        ("interactions", table.arrays, INTERACTIONS_FILE, {}),
+        ("dose_limits", limits.arrays, DOSE_LIMITS_FILE, {}),
+    ]
+    sizes = {}
+    for name, arrays, source, meta in components:
+        write_component(name, arrays, [source], meta, directory)
+        sizes[name] = sum(a.nbytes for a in flatten(arrays).values())
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the drug knowledge base for memory-mapped loading")
+    parser.add_argument("-o", "--output", default=KNOWLEDGE_BASE_DIR, help="directory for the compiled arrays")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sizes = build(args.output)
+    elapsed = time.perf_counter() - start
+    summary = ", ".join(f"{name} {size / 1024:,.0f} KB" for name, size in sizes.items())
+    print(f"✅ Compiled in {elapsed:.2f}s: {summary} -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
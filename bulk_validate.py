@@ -0,0 +1,199 @@
+"""
+Bulk re-validation of dispensing records.
+
+Input has one prescription item per row (CSV, JSONL or Parquet) with the columns in
+COLUMNS; consecutive rows sharing a prescription_id form one prescription. Rows are
+read in chunks that never split a prescription, normalized into columns and validated
+across a process pool: dose limits for a whole chunk at once, rules per item and
+interactions per prescription. Results are written as chunks finish, with at most
+workers * 2 chunks in flight, so memory stays flat for any input size.
+
+Usage:
+    python bulk_validate.py dispensing.parquet -o audit.jsonl --workers 8
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from dose_check import float_column, get_dose_limits
+from interactions import get_interaction_table
+from rules import get_rule_engine
+from validator import assess_item, interactions_by_item
+
+try:
+    import pyarrow.parquet as pq  # only needed for Parquet input
+except ImportError:
+    pq = None
+
+COLUMNS = ["prescription_id", "age", "weight", "allergies", "conditions", "diagnosis",
+           "medication", "dosage", "frequency", "duration"]
+NUMERIC_COLUMNS = {"age", "weight"}
+CHUNK_SIZE = 5000
+OUTPUT_FIELDS = ["row", "prescription_id", "medication", "status", "message", "dose_mg", "daily_mg", "mg_per_kg_day"]
+
+
+def read_rows(path: str) -> Iterator[Dict]:
+    """Stream input rows as dicts, whatever the file format."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+    elif ext in (".jsonl", ".ndjson"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif ext == ".parquet":
+        if pq is None:
+            raise ImportError("pyarrow is required for Parquet input: pip install pyarrow")
+        parquet = pq.ParquetFile(path)
+        columns = [c for c in COLUMNS if c in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=CHUNK_SIZE, columns=columns):
+            yield from batch.to_pylist()
+    else:
+        raise ValueError(f"Unsupported input format: {path} (expected .csv, .jsonl or .parquet)")
+
+
+def to_columns(rows: List[Dict], start: int) -> Dict:
+    """Normalize rows into one list (or float array) per column."""
+    chunk = {"start": start}
+    for name in COLUMNS:
+        values = [row.get(name) for row in rows]
+        if name in NUMERIC_COLUMNS:
+            chunk[name] = float_column(["" if v is None else v for v in values])
+        else:
+            chunk[name] = ["" if v is None else str(v) for v in values]
+    return chunk
+
+
+def read_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict]:
+    """Columnar chunks of about chunk_size rows, never splitting a prescription."""
+    rows = []
+    start = 0
+    last_id = None
+    for n, row in enumerate(read_rows(path)):
+        prescription_id = str(row.get("prescription_id") or "")
+        if len(rows) >= chunk_size and (not prescription_id or prescription_id != last_id):
+            yield to_columns(rows, start)
+            rows, start = [], n
+        rows.append(row)
+        last_id = prescription_id
+    if rows:
+        yield to_columns(rows, start)
+
+
+def _prescriptions(ids: List[str]) -> Iterator[Tuple[int, int]]:
+    """(start, end) of each run of rows with the same prescription_id; rows without one stand alone."""
+    start = 0
+    for i in range(1, len(ids) + 1):
+        if i == len(ids) or not ids[i] or ids[i] != ids[start]:
+            yield start, i
+            start = i
+
+
+def _init_worker():
+    # Load the rule set, interaction table and dose limits once per worker, not per chunk
+    get_rule_engine()
+    get_interaction_table()
+    get_dose_limits()
+
+
+def validate_chunk(chunk: Dict) -> List[Dict]:
+    """Validate one columnar chunk; runs inside a worker process."""
+    engine = get_rule_engine()
+    table = get_interaction_table()
+    doses = get_dose_limits().check_columns(chunk["medication"], chunk["dosage"], chunk["frequency"],
+                                            chunk["age"], chunk["weight"])
+    patients = {}
+    results = []
+    for lo, hi in _prescriptions(chunk["prescription_id"]):
+        age = chunk["age"][lo]
+        patient_info = {
+            "age": "" if np.isnan(age) else age,
+            "allergies": chunk["allergies"][lo],
+            "conditions": chunk["conditions"][lo],
+        }
+        key = (patient_info["age"], patient_info["allergies"], patient_info["conditions"], chunk["diagnosis"][lo])
+        if key not in patients:
+            patients[key] = engine.patient_facts(patient_info, chunk["diagnosis"][lo])
+
+        items = [{name: chunk[name][i] for name in ("medication", "dosage", "frequency", "duration")}
+                 for i in range(lo, hi)]
+        by_item = interactions_by_item(table.check(items))
+        for k, p in enumerate(items):
+            dose = doses[lo + k]
+            status, issues = assess_item(p, engine.check(p, patients[key]), dose, by_item.get(k, []))
+            results.append({
+                "row": chunk["start"] + lo + k,
+                "prescription_id": chunk["prescription_id"][lo + k],
+                "medication": p["medication"],
+                "status": status,
+                "message": ". ".join(issues),
+                "dose_mg": dose["dose_mg"] if dose else None,
+                "daily_mg": dose["daily_mg"] if dose else None,
+                "mg_per_kg_day": dose["mg_per_kg_day"] if dose else None,
+            })
+    return results
+
+
+def validate_file(path: str, workers: int = None, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Dict]]:
+    """Yield the results of each chunk in completion order (each result carries its input row)."""
+    chunks = read_chunks(path, chunk_size)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = set()
+        while True:
+            for chunk in chunks:
+                pending.add(pool.submit(validate_chunk, chunk))
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk validation of dispensing records")
+    parser.add_argument("input", help="CSV, JSONL or Parquet file, one prescription item per row")
+    parser.add_argument("-o", "--output", required=True, help=".jsonl or .csv file, written incrementally")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    as_csv = args.output.lower().endswith(".csv")
+    start = time.perf_counter()
+    n_records = 0
+    statuses = Counter()
+    with open(args.output, "w", newline="", encoding="utf-8") as out:
+        writer = csv.DictWriter(out, fieldnames=OUTPUT_FIELDS) if as_csv else None
+        if writer:
+            writer.writeheader()
+        for results in validate_file(args.input, args.workers, args.chunk_size):
+            for record in results:
+                if writer:
+                    writer.writerow(record)
+                else:
+                    out.write(json.dumps(record) + "\n")
+                statuses[record["status"]] += 1
+            n_records += len(results)
+            elapsed = time.perf_counter() - start
+            print(f"\r{n_records} records, {n_records / elapsed:,.0f} records/sec", end="", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    summary = ", ".join(f"{count} {status}" for status, count in statuses.most_common())
+    print(f"\n✅ {n_records} records in {elapsed:.1f}s ({n_records / max(elapsed, 1e-9):,.0f} records/sec): "
+          f"{summary} -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
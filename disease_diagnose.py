@@ -1,12 +1,12 @@
 import torch
 import torch.nn as nn
 from torch.utils.data import Dataset, DataLoader
-from torchvision import models, transforms
 from transformers import AutoTokenizer, AutoModel
 from PIL import Image
 import os
 import pandas as pd
 import gradio as gr
+from skin_classifier.feature_extractor import CLASS_NAMES as skin_classes, FEATURE_DIM, get_feature_extractor, preprocess
 
 # Define the classes
 classes = [
@@ -51,12 +51,8 @@ class SkinDiseaseDataset(Dataset):
         return image_tensor, text_tokens, torch.tensor(label)
 
 # --- 2. Set up Models and a custom collate function ---
-# Image preprocessing
-img_transforms = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-])
+# Image preprocessing (shared with the standalone skin classifier)
+img_transforms = preprocess
 
 # Custom collate function to handle variable-length text tensors
 def custom_collate_fn(batch):
@@ -79,9 +75,9 @@ def custom_collate_fn(batch):
     
     return images, padded_texts, labels
 
-# Image model
-resnet = models.resnet50(pretrained=True)
-resnet.fc = nn.Identity()
+# Image model: the ResNet-50 backbone is shared with skin_classifier, so one
+# forward pass per image feeds both the 7-class head and the multimodal head
+feature_extractor = get_feature_extractor()
 
 # Text model
 tokenizer = AutoTokenizer.from_pretrained("bert-base-uncased")
@@ -100,9 +96,8 @@ class MultimodalClassifier(nn.Module):
         x = torch.cat([text_emb, image_emb], dim=1)
         return self.fc(x)
 
-classifier = MultimodalClassifier(image_dim=2048)
+classifier = MultimodalClassifier(image_dim=FEATURE_DIM)
 classifier = classifier.to(device)
-resnet = resnet.to(device)
 bert_model = bert_model.to(device)
 
 # --- 3. Training Loop ---
@@ -121,10 +116,10 @@ def train_model(epochs=10):
     dataset = SkinDiseaseDataset(df, dummy_img_dir, tokenizer, img_transforms)
     dataloader = DataLoader(dataset, batch_size=32, shuffle=True, collate_fn=custom_collate_fn)
 
-    optimizer = torch.optim.Adam(list(resnet.parameters()) + list(classifier.parameters()) + list(bert_model.parameters()), lr=1e-4)
+    # The shared backbone stays frozen; only the text model and fusion head are trained
+    optimizer = torch.optim.Adam(list(classifier.parameters()) + list(bert_model.parameters()), lr=1e-4)
     criterion = nn.CrossEntropyLoss()
 
-    resnet.train()
     bert_model.train()
     classifier.train()
 
@@ -136,7 +131,7 @@ def train_model(epochs=10):
             
             optimizer.zero_grad()
             
-            image_features = resnet(images)
+            image_features = feature_extractor.encode(images)
             text_outputs = bert_model(**texts)
             text_features = text_outputs.last_hidden_state.mean(dim=1)
             
@@ -148,27 +143,30 @@ def train_model(epochs=10):
             
         print(f"Epoch {epoch+1}/{epochs}, Loss: {loss.item():.4f}")
 
-    torch.save(resnet.state_dict(), 'trained_resnet_model.pth')
     torch.save(classifier.state_dict(), 'trained_classifier.pth')
     print("Training complete. Models saved.")
 
 # --- 4. Inference Function for Gradio ---
 def diagnose(image, text_symptoms):
-    if not os.path.exists('trained_resnet_model.pth') or not os.path.exists('trained_classifier.pth'):
+    if not os.path.exists('trained_classifier.pth'):
         return "Model not trained. Please run the training code first."
 
-    resnet.load_state_dict(torch.load('trained_resnet_model.pth'))
     classifier.load_state_dict(torch.load('trained_classifier.pth'))
     
-    resnet.eval()
     bert_model.eval()
     classifier.eval()
 
-    image_emb = torch.zeros(1, 2048).to(device)
+    image_emb = torch.zeros(1, FEATURE_DIM).to(device)
+    skin_result = ""
     if image is not None:
-        img_t = img_transforms(image.convert("RGB")).unsqueeze(0).to(device)
-        with torch.no_grad():
-            image_emb = resnet(img_t)
+        # Single backbone pass; the features feed both heads
+        image_emb = feature_extractor.features([image]).to(device)
+        if feature_extractor.skin_head_trained:
+            skin_probs = feature_extractor.skin_probabilities(image_emb)[0]
+            skin_idx = torch.argmax(skin_probs).item()
+            skin_result = f"\nImage classifier: {skin_classes[skin_idx]}, Confidence: {skin_probs[skin_idx].item():.2f}"
+        else:
+            skin_result = "\nImage classifier: unavailable (no trained weights; set SKIN_MODEL_PATH)"
 
     text_emb = torch.zeros(1, 768).to(device)
     if text_symptoms:
@@ -185,7 +183,7 @@ def diagnose(image, text_symptoms):
     top_idx = torch.argmax(probs).item()
     confidence = probs[top_idx].item()
     
-    return f"Predicted condition: {classes[top_idx]}, Confidence: {confidence:.2f}"
+    return f"Predicted condition: {classes[top_idx]}, Confidence: {confidence:.2f}{skin_result}"
 
 # --- 5. Gradio Interface ---
 iface = gr.Interface(
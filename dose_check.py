@@ -0,0 +1,215 @@
+"""
+Dose-range checks against data/dose_limits.csv.
+
+Limits are per drug and age band, optionally split into weight bands, with per-dose and
+per-day maxima in mg and in mg/kg. Checking works on whole batches: dosage and frequency
+text is parsed to numbers, each record's band is found with two searchsorted calls (age
+band, then weight band within it) and every limit is compared as one NumPy expression.
+The sorted band arrays are all the object holds, so build_knowledge_base.py can compile
+them for memory-mapped loading.
+"""
+import csv
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from drug_hierarchy import DrugHierarchy, get_drug_hierarchy
+from drug_lexicon import normalize
+from knowledge_base import StringTable, flatten, group, open_component
+from prescription_parser import parse_item
+from rules import DATA_DIR, resolve_medication
+
+DOSE_LIMITS_FILE = os.path.join(DATA_DIR, "dose_limits.csv")
+MG_PER_UNIT = {"mg": 1.0, "g": 1000.0, "mcg": 0.001, None: 1.0}  # a bare number is taken as mg
+ADULT_AGE = 18.0  # assumed, with a warning, when no age is given
+AGE_SPAN = 1024.0  # larger than any age, so drug * AGE_SPAN + age orders by drug then age
+WEIGHT_SPAN = 1024.0
+BAND_COLUMNS = ["age_min", "age_max", "weight_min", "weight_max"]
+LIMITS = ["max_dose_mg", "max_daily_mg", "max_dose_mg_per_kg", "max_daily_mg_per_kg"]
+
+
+def _number(value) -> float:
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return np.nan
+
+
+def float_column(values: Sequence) -> np.ndarray:
+    """Numbers (or numeric strings) as a float64 array, NaN where blank or not a number."""
+    if isinstance(values, np.ndarray) and values.dtype.kind == "f":
+        return values.astype(np.float64, copy=True)
+    return np.array([_number(v) for v in values], dtype=np.float64)
+
+
+def parse_dose(dosage: str, frequency: str) -> Tuple[float, float]:
+    """(mg per dose, doses per day) from free text; NaN where not stated or not a mass."""
+    parsed = parse_item(f"{dosage} {frequency}")
+    per_unit = MG_PER_UNIT.get(parsed["unit"])
+    dose = parsed["strength"] * per_unit if parsed["strength"] is not None and per_unit else np.nan
+    per_day = parsed["doses_per_day"] if parsed["doses_per_day"] is not None else np.nan
+    return dose, per_day
+
+
+class DoseLimits:
+    def __init__(self, arrays: Dict[str, np.ndarray], hierarchy: DrugHierarchy = None):
+        """arrays: as built by from_rows (or a memory-mapped compiled copy)."""
+        self.arrays = arrays
+        self.hierarchy = hierarchy or get_drug_hierarchy()  # resolves medication names like the rules do
+        self.drugs = StringTable.from_arrays(group(arrays, "drugs"))  # drug id -> name
+        for name in BAND_COLUMNS + LIMITS:
+            setattr(self, name, arrays[name])
+        self._row_band = arrays["row_band"]
+        self._row_key = arrays["row_key"]
+        self._band_key = arrays["band_key"]
+        self._band_drug = arrays["band_drug"]
+        self._band_age_max = arrays["band_age_max"]
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict], hierarchy: DrugHierarchy = None) -> "DoseLimits":
+        ids: Dict[str, int] = {}
+        drug = np.array([ids.setdefault(normalize(r["drug"]), len(ids)) for r in rows], dtype=np.int64)
+        col = {name: np.array([_number(r.get(name, "")) for r in rows], dtype=np.float64)
+               for name in BAND_COLUMNS + LIMITS}
+        col["age_min"] = np.nan_to_num(col["age_min"], nan=0.0)
+        col["age_max"] = np.nan_to_num(col["age_max"], nan=np.inf)
+        col["weight_min"] = np.nan_to_num(col["weight_min"], nan=0.0)
+        col["weight_max"] = np.nan_to_num(col["weight_max"], nan=np.inf)
+
+        order = np.lexsort((col["weight_min"], col["age_min"], drug))
+        drug = drug[order]
+        arrays = {name: values[order] for name, values in col.items()}
+
+        # Age bands are the distinct (drug, age_min) runs; rows are weight bands within them
+        band_key = drug * AGE_SPAN + arrays["age_min"]
+        first = np.ones(len(drug), dtype=bool)
+        first[1:] = band_key[1:] != band_key[:-1]
+        row_band = np.cumsum(first) - 1
+        arrays.update({
+            "drugs": StringTable.build(list(ids)),
+            "row_band": row_band,
+            "row_key": row_band * WEIGHT_SPAN + arrays["weight_min"],
+            "band_key": band_key[first],
+            "band_drug": drug[first],
+            "band_age_max": arrays["age_max"][first],
+        })
+        return cls(flatten(arrays), hierarchy)
+
+    @classmethod
+    def from_csv(cls, path: str = DOSE_LIMITS_FILE, hierarchy: DrugHierarchy = None) -> "DoseLimits":
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls.from_rows(list(csv.DictReader(f)), hierarchy)
+
+    def drug_id(self, medication: str) -> int:
+        """Id of the longest drug name in the medication (after resolve_medication), or -1."""
+        known = [d for d in resolve_medication(medication, self.hierarchy).drugs if d in self.drugs]
+        return self.drugs.index(max(known, key=len)) if known else -1
+
+    def lookup(self, drug_ids: np.ndarray, ages: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Limit row for each (drug, age, weight), or -1 where no band applies."""
+        band = np.searchsorted(self._band_key, drug_ids * AGE_SPAN + ages, side="right") - 1
+        band = np.maximum(band, 0)
+        ok = (drug_ids >= 0) & (self._band_drug[band] == drug_ids) & (ages < self._band_age_max[band])
+
+        # Unknown weight falls in the lowest weight band, which has the tightest limits
+        w = np.nan_to_num(weights, nan=0.0)
+        row = np.searchsorted(self._row_key, band * WEIGHT_SPAN + w, side="right") - 1
+        row = np.maximum(row, 0)
+        ok &= (self._row_band[row] == band) & (w < self.weight_max[row])
+        return np.where(ok, row, -1)
+
+    def check(self, records: List[Dict]) -> List[Optional[Dict]]:
+        """Check a batch of record dicts (medication, dosage, frequency, age, weight); see check_columns."""
+        return self.check_columns(*([r.get(name, "") for r in records]
+                                    for name in ("medication", "dosage", "frequency", "age", "weight")))
+
+    def check_columns(self, medications: Sequence[str], dosages: Sequence[str], frequencies: Sequence[str],
+                      ages: Sequence, weights: Sequence) -> List[Optional[Dict]]:
+        """
+        Check a batch given as columns. Returns, per record, None when no limits apply,
+        otherwise the computed dose_mg, daily_mg and mg_per_kg_day (None when unknown),
+        the messages for every limit exceeded and warnings for what couldn't be checked:
+        mg/kg limits when no weight is given, and any age band when no age is (adult
+        limits are used).
+        """
+        n = len(medications)
+        drug_ids = np.array([self.drug_id(m) for m in medications], dtype=np.int64)
+        ages = float_column(ages)
+        no_age = np.isnan(ages)
+        ages[no_age] = ADULT_AGE
+        weights = float_column(weights)
+        weights[weights <= 0] = np.nan
+
+        # Batches repeat the same dosage/frequency strings, so each is parsed once
+        parsed = {}
+        dose = np.empty(n)
+        per_day = np.empty(n)
+        for i, key in enumerate(zip(dosages, frequencies)):
+            if key not in parsed:
+                parsed[key] = parse_dose(*key)
+            dose[i], per_day[i] = parsed[key]
+
+        rows = self.lookup(drug_ids, ages, weights)
+        found = (rows >= 0) & ~np.isnan(dose)
+        r = np.maximum(rows, 0)
+        daily = dose * per_day
+        values = {
+            "max_dose_mg": dose,
+            "max_daily_mg": daily,
+            "max_dose_mg_per_kg": dose / weights,
+            "max_daily_mg_per_kg": daily / weights,
+        }
+        with np.errstate(invalid="ignore"):
+            exceeded = {name: found & (values[name] > getattr(self, name)[r]) for name in LIMITS}
+        # Without a weight the lowest weight band's mg limits still apply, but mg/kg can't be computed
+        no_weight = found & np.isnan(weights)
+
+        results = []
+        for i in range(n):
+            if not found[i]:
+                results.append(None)
+                continue
+            per_kg_day = values["max_daily_mg_per_kg"][i]
+            per_kg_note = f" ({per_kg_day:.1f} mg/kg/day)" if not np.isnan(per_kg_day) else ""
+            messages = []
+            if exceeded["max_dose_mg"][i]:
+                messages.append(f"DOSE ALERT: {dose[i]:g} mg per dose exceeds the {self.max_dose_mg[r[i]]:g} mg maximum")
+            if exceeded["max_daily_mg"][i]:
+                messages.append(f"DOSE ALERT: {daily[i]:g} mg/day{per_kg_note} exceeds the "
+                                f"{self.max_daily_mg[r[i]]:g} mg/day maximum")
+            if exceeded["max_dose_mg_per_kg"][i]:
+                messages.append(f"DOSE ALERT: {values['max_dose_mg_per_kg'][i]:.1f} mg/kg per dose exceeds the "
+                                f"{self.max_dose_mg_per_kg[r[i]]:g} mg/kg maximum")
+            if exceeded["max_daily_mg_per_kg"][i]:
+                messages.append(f"DOSE ALERT: {per_kg_day:.1f} mg/kg/day exceeds the "
+                                f"{self.max_daily_mg_per_kg[r[i]]:g} mg/kg/day maximum")
+            warnings = []
+            if no_weight[i]:
+                per_kg = [f"{limit[r[i]]:g} {unit}" for limit, unit in ((self.max_dose_mg_per_kg, "mg/kg per dose"),
+                                                                        (self.max_daily_mg_per_kg, "mg/kg/day"))
+                          if not np.isnan(limit[r[i]])]
+                if per_kg:
+                    warnings.append(f"DOSE WARNING: Patient weight needed to check the {' and '.join(per_kg)} limit")
+            if no_age[i]:
+                warnings.append(f"DOSE WARNING: No patient age given, checked against limits for age {ADULT_AGE:g}+")
+            results.append({
+                "dose_mg": float(dose[i]),
+                "daily_mg": None if np.isnan(daily[i]) else float(daily[i]),
+                "mg_per_kg_day": None if np.isnan(per_kg_day) else round(float(per_kg_day), 2),
+                "messages": messages,
+                "warnings": warnings,
+            })
+        return results
+
+
+_limits = None
+
+
+def get_dose_limits() -> DoseLimits:
+    """Process-wide dose limits: the compiled copy when current, else DOSE_LIMITS_FILE."""
+    global _limits
+    if _limits is None:
+        compiled = open_component("dose_limits", [DOSE_LIMITS_FILE])
+        _limits = DoseLimits(compiled[0]) if compiled else DoseLimits.from_csv()
+    return _limits
@@ -0,0 +1,201 @@
+"""
+ATC-style drug-class hierarchy.
+
+data/atc_hierarchy.json lists classes by ATC code, with names and aliases, and the class
+codes each drug belongs to. A class's parent is the longest other code that prefixes it
+(J01CA -> J01C -> J01 -> J). Every class and every drug gets one bit, and each drug's
+closure (its own bit OR all of its ancestors' bits) is computed once at load, so "does
+this drug fall under anything the patient is allergic to" is a single AND of two ints.
+Masks are stored as rows of uint64 words next to string tables of names, which
+build_knowledge_base.py compiles for memory-mapped loading (knowledge_base.py).
+
+synonyms map other names for a drug (regional spellings, combination and brand names:
+"cephalexin", "co-amoxiclav") to its entry in drugs; a synonym resolves to the same bit
+and closure as the drug itself, and canonical() gives the drug's own name back.
+
+cross_reactivity pairs [A, B] mean an allergy to anything under A should raise a
+warning for drugs under B (penicillins and first-generation cephalosporins, say).
+"""
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from drug_lexicon import normalize
+from knowledge_base import LOOKUP_MEMO_SIZE, StringTable, flatten, group, open_component
+
+HIERARCHY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "atc_hierarchy.json")
+
+
+def _bits(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _words(masks: List[int], n_bits: int) -> np.ndarray:
+    """Bit masks as rows of little-endian uint64 words."""
+    width = max(1, (n_bits + 63) // 64)
+    packed = b"".join(m.to_bytes(width * 8, "little") for m in masks)
+    return np.frombuffer(packed, dtype="<u8").reshape(len(masks), width).copy()
+
+
+def _mask(words: np.ndarray) -> int:
+    return int.from_bytes(words.tobytes(), "little")
+
+
+class DrugHierarchy:
+    """
+    The hierarchy as flat arrays (string tables plus bit-mask rows), so the same object
+    works over freshly built arrays or a memory-mapped compiled copy; see from_spec.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], version=None):
+        self.arrays = arrays
+        self.version = version
+        self.labels = StringTable.from_arrays(group(arrays, "labels"))  # bit -> display name
+        self.names = StringTable.from_arrays(group(arrays, "names"))  # every class/drug name and alias
+        self.drugs = StringTable.from_arrays(group(arrays, "drugs"))
+        self._name_masks = arrays["name_masks"]  # name -> every bit it names
+        self._drug_closures = arrays["drug_closures"]  # drug -> its bit OR all ancestors' bits
+        self._bit_closures = arrays["bit_closures"]  # bit -> closure of that class or drug
+        self._class_offsets = arrays["class_offsets"]  # drug -> slice of class_ids
+        self._class_ids = arrays["class_ids"]  # names of every class above each drug
+        # (source bit mask, target bit mask, source label)
+        self._cross = [(1 << int(s), 1 << int(t), self.labels[int(s)]) for s, t in arrays["cross"]]
+        self._classes_memo: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_spec(cls, classes: List[Dict], drugs: Dict[str, List[str]], cross_reactivity: List[List[str]] = (),
+                  version=None, synonyms: Dict[str, str] = None) -> "DrugHierarchy":
+        labels: List[str] = []
+        names: List[List[str]] = []
+        closure: List[int] = []
+        name_bits: Dict[str, int] = {}
+
+        def add(name: str, aliases: List[str]) -> int:
+            bit = len(labels)
+            normalized = [normalize(n) for n in [name] + list(aliases)]
+            labels.append(normalized[0])
+            names.append(normalized)
+            closure.append(1 << bit)
+            for n in normalized:
+                name_bits[n] = name_bits.get(n, 0) | (1 << bit)
+            return bit
+
+        # Sorted codes put each parent before its children
+        class_closure: Dict[str, int] = {}
+        for spec in sorted(classes, key=lambda c: c["code"]):
+            code = spec["code"]
+            parent = max((c for c in class_closure if code.startswith(c)), key=len, default=None)
+            bit = add(spec["name"], spec.get("aliases", []))
+            closure[bit] |= class_closure.get(parent, 0)
+            class_closure[code] = closure[bit]
+
+        synonyms = {normalize(s): normalize(d) for s, d in (synonyms or {}).items()}
+        unknown = set(synonyms.values()) - {normalize(d) for d in drugs}
+        if unknown:
+            raise ValueError(f"Synonyms for unknown drug(s) {sorted(unknown)}")
+        drug_bits: Dict[str, int] = {}
+        for drug, codes in drugs.items():
+            bit = add(drug, [s for s, d in synonyms.items() if d == normalize(drug)])
+            for code in codes:
+                closure[bit] |= class_closure[code]
+            drug_bits[normalize(drug)] = bit
+        for synonym, drug in synonyms.items():
+            drug_bits.setdefault(synonym, drug_bits[drug])
+
+        name_list = list(name_bits)
+        name_id = {n: i for i, n in enumerate(name_list)}
+        class_offsets, class_ids = [0], []
+        for bit in drug_bits.values():
+            ancestors = closure[bit] & ~(1 << bit)
+            class_ids += [name_id[n] for n in sorted({n for b in _bits(ancestors) for n in names[b]})]
+            class_offsets.append(len(class_ids))
+
+        cross = [[class_closure[source].bit_length() - 1, class_closure[target].bit_length() - 1]
+                 for source, target in cross_reactivity]
+        n_bits = len(labels)
+        arrays = {
+            "labels": StringTable.build(labels),
+            "names": StringTable.build(name_list),
+            "name_masks": _words(list(name_bits.values()), n_bits),
+            "drugs": StringTable.build(list(drug_bits)),
+            "drug_closures": _words([closure[b] for b in drug_bits.values()], n_bits),
+            "bit_closures": _words(closure, n_bits),
+            "class_offsets": np.array(class_offsets, dtype=np.int32),
+            "class_ids": np.array(class_ids, dtype=np.int32),
+            "cross": np.array(cross, dtype=np.int32).reshape(-1, 2),
+        }
+        return cls(flatten(arrays), version)
+
+    @classmethod
+    def from_file(cls, path: str = HIERARCHY_FILE) -> "DrugHierarchy":
+        with open(path, encoding="utf-8") as f:
+            spec = json.load(f)
+        return cls.from_spec(spec["classes"], spec["drugs"], spec.get("cross_reactivity", []), spec.get("version"),
+                             spec.get("synonyms"))
+
+    def closure(self, terms: Iterable[str]) -> int:
+        """Closure of every drug named among the terms (0 if none is known)."""
+        mask = 0
+        for term in terms:
+            i = self.drugs.index(term)
+            if i >= 0:
+                mask |= _mask(self._drug_closures[i])
+        return mask
+
+    def canonical(self, term: str) -> Optional[str]:
+        """The drug's own name for a drug name or synonym ("cephalexin" -> "cefalexin"), else None."""
+        i = self.drugs.index(term)
+        # A drug's own bit is the highest in its closure: drugs come after every class
+        return self.label(_mask(self._drug_closures[i])) if i >= 0 else None
+
+    def mask(self, terms: Iterable[str]) -> int:
+        """Bits of every class or drug named among the terms, e.g. a patient's allergies."""
+        mask = 0
+        for term in terms:
+            i = self.names.index(term)
+            if i >= 0:
+                mask |= _mask(self._name_masks[i])
+        return mask
+
+    def classes_of(self, drug: str) -> List[str]:
+        """Names (and aliases) of every class above a drug; empty for anything else."""
+        if drug in self._classes_memo:
+            return self._classes_memo[drug]
+        if len(self._classes_memo) >= LOOKUP_MEMO_SIZE:
+            self._classes_memo.clear()
+        i = self.drugs.index(drug)
+        ids = self._class_ids[self._class_offsets[i]:self._class_offsets[i + 1]] if i >= 0 else ()
+        self._classes_memo[drug] = classes = [self.names[j] for j in ids]
+        return classes
+
+    def label(self, mask: int) -> str:
+        """Name of the most specific class or drug in mask (drugs and subclasses get higher bits)."""
+        return self.labels[mask.bit_length() - 1]
+
+    def cross_reactions(self, allergy_bits: int) -> List[Tuple[int, str]]:
+        """(target mask, source label) for each cross-reactivity pair these allergies trigger."""
+        allergy_closure = 0
+        for bit in _bits(allergy_bits):
+            allergy_closure |= _mask(self._bit_closures[bit])
+        return [(target, label) for source, target, label in self._cross if allergy_closure & source]
+
+
+_hierarchy = None
+
+
+def get_drug_hierarchy() -> DrugHierarchy:
+    """Process-wide hierarchy: the compiled copy when current, else HIERARCHY_FILE."""
+    global _hierarchy
+    if _hierarchy is None:
+        compiled = open_component("hierarchy", [HIERARCHY_FILE])
+        if compiled:
+            arrays, meta = compiled
+            _hierarchy = DrugHierarchy(arrays, meta.get("version"))
+        else:
+            _hierarchy = DrugHierarchy.from_file()
+    return _hierarchy
@@ -0,0 +1,198 @@
+"""
+Drug-name lexicon for cleaning up OCR output.
+
+Single tokens are corrected with a symmetric-delete index (SymSpell): every name's
+prefix is indexed under all its deletions up to MAX_DISTANCE, so a lookup only
+generates deletions of the query and verifies the few candidates that share one,
+instead of computing edit distance against the whole list. Multi-word names are
+found with an Aho-Corasick automaton in a single pass over the text.
+"""
+import os
+import re
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+DRUG_NAMES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "drug_names.txt")
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7  # only prefixes are indexed; keeps the index small for long names
+LOOKUP_MEMO_SIZE = 10000
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse everything except letters and digits to single spaces."""
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def allowed_distance(token: str) -> int:
+    # Short tokens ("tab", "od") would match far too much with any edits allowed
+    if len(token) <= 4:
+        return 0
+    return 1 if len(token) <= 7 else MAX_DISTANCE
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, giving up (returning limit + 1) once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def _deletes(word: str, distance: int) -> set:
+    results = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        results |= frontier
+    return results
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton: every whole-word occurrence of many phrases in one pass."""
+
+    def __init__(self, phrases: List[str]):
+        """phrases: normalized text; matches report each phrase by its index in this list."""
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for idx, phrase in enumerate(phrases):
+            state = 0
+            for ch in phrase:
+                if ch not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][ch] = len(self._goto) - 1
+                state = self._goto[state][ch]
+            self._output[state].append((len(phrase), idx))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, int]]:
+        """(start, end, phrase index) of every match in already-normalized text."""
+        matches = []
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for length, idx in self._output[state]:
+                start = pos - length + 1
+                end = pos + 1
+                # Only whole words: "aspirin" must not match inside "aspirinx"
+                if (start == 0 or text[start - 1] == " ") and (end == len(text) or text[end] == " "):
+                    matches.append((start, end, idx))
+        return matches
+
+
+class DrugLexicon:
+    def __init__(self, names: List[str]):
+        self.names = []
+        self._by_key = {}
+        for name in names:
+            key = normalize(name)
+            if key and key not in self._by_key:
+                self._by_key[key] = len(self.names)
+                self.names.append(name)
+
+        # Symmetric-delete index over whole names with spaces removed, so OCR splits
+        # ("Paraceta mol") and merges ("FolicAcid") both land on the right name
+        self._deletes: Dict[str, List[int]] = {}
+        self._compact = [key.replace(" ", "") for key in self._by_key]
+        for idx, word in enumerate(self._compact):
+            for variant in _deletes(word[:PREFIX_LENGTH], MAX_DISTANCE):
+                self._deletes.setdefault(variant, []).append(idx)
+
+        self._matcher = PhraseMatcher(list(self._by_key))
+        self._memo = {}
+
+    @classmethod
+    def from_file(cls, path: str = DRUG_NAMES_FILE) -> "DrugLexicon":
+        with open(path, encoding="utf-8") as f:
+            return cls([line.strip() for line in f if line.strip() and not line.startswith("#")])
+
+    def lookup(self, token: str) -> Optional[Tuple[str, int]]:
+        """Closest drug name to an OCR token (spaces ignored) as (name, distance), or None."""
+        # OCR output repeats the same tokens constantly, so results are memoized
+        if token in self._memo:
+            return self._memo[token]
+        if len(self._memo) >= LOOKUP_MEMO_SIZE:
+            self._memo.clear()
+        self._memo[token] = result = self._lookup(token)
+        return result
+
+    def _lookup(self, token: str) -> Optional[Tuple[str, int]]:
+        word = normalize(token).replace(" ", "")
+        limit = allowed_distance(word)
+        if not word:
+            return None
+        exact = self._by_key.get(normalize(token))
+        if exact is not None:
+            return self.names[exact], 0
+
+        best, best_distance = None, limit + 1
+        seen = set()
+        for variant in _deletes(word[:PREFIX_LENGTH], limit):
+            for idx in self._deletes.get(variant, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                d = edit_distance(word, self._compact[idx], min(limit, best_distance))
+                if d < best_distance or (d == best_distance and best is not None and idx < best):
+                    best, best_distance = idx, d
+        return (self.names[best], best_distance) if best is not None else None
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """Exact (start, end, name) matches of whole drug names in normalized text."""
+        return [(start, end, self.names[idx]) for start, end, idx in self._matcher.find_all(normalize(text))]
+
+    def match_name(self, words: str) -> Optional[str]:
+        """
+        Canonical drug name for the words OCR put before a dose, or None.
+        Tries an exact phrase match first, then fuzzy lookups of the whole run,
+        single words and adjacent word pairs (to undo OCR splits).
+        """
+        phrases = self.find_all(words)
+        if phrases:
+            return max(phrases, key=lambda m: m[1] - m[0])[2]
+
+        tokens = normalize(words).split()
+        candidates = [" ".join(tokens)] + tokens + [a + b for a, b in zip(tokens, tokens[1:])]
+        best = None
+        for candidate in candidates:
+            hit = self.lookup(candidate)
+            if hit and (best is None or hit[1] < best[1]):
+                best = hit
+        return best[0] if best else None
+
+
+_lexicon = None
+
+
+def get_lexicon() -> DrugLexicon:
+    """Process-wide lexicon loaded from DRUG_NAMES_FILE on first use."""
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = DrugLexicon.from_file()
+    return _lexicon
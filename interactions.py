@@ -0,0 +1,147 @@
+"""
+Drug-drug interaction checks over a whole prescription list.
+
+data/interactions.csv lists pairs of drugs or drug classes ("class:nsaid") with a
+severity. Names are interned to small integer ids and each canonical (low id, high id)
+pair is packed into one uint64 key, stored in an open-addressing hash table made of two
+numpy arrays. A million pairs take roughly 30 MB, and checking a prescription list is
+one vectorized probe over every cross-item pair of drug and class ids; nothing scans
+the table. The table is nothing but those arrays and two string tables, so
+build_knowledge_base.py can compile it and processes memory-map it instead of parsing CSV.
+"""
+import csv
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from drug_hierarchy import DrugHierarchy, get_drug_hierarchy
+from drug_lexicon import normalize
+from knowledge_base import PairIndex, StringTable, flatten, group, open_component
+from rules import DATA_DIR, resolve_medication
+
+INTERACTIONS_FILE = os.path.join(DATA_DIR, "interactions.csv")
+SEVERITIES = ["minor", "moderate", "major", "contraindicated"]  # least to most severe
+SEVERITY_STATUS = {"minor": "approved", "moderate": "warning", "major": "warning", "contraindicated": "rejected"}
+CLASS_PREFIX = "class:"
+
+
+def pair_keys(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Order-independent uint64 keys for id pairs (ids start at 1; 0 marks an empty slot)."""
+    a = a.astype(np.uint64)
+    b = b.astype(np.uint64)
+    return (np.minimum(a, b) << np.uint64(32)) | np.maximum(a, b)
+
+
+def _key(name: str) -> str:
+    name = name.strip().lower()
+    if name.startswith(CLASS_PREFIX):
+        return CLASS_PREFIX + normalize(name[len(CLASS_PREFIX):])
+    return normalize(name)
+
+
+class InteractionTable:
+    def __init__(self, arrays: Dict[str, np.ndarray], hierarchy: DrugHierarchy):
+        """arrays: as built by from_pairs (or a memory-mapped compiled copy); hierarchy supplies drug classes."""
+        self.arrays = arrays
+        self.hierarchy = hierarchy
+        self.names = StringTable.from_arrays(group(arrays, "names"))  # id -> name; id 0 is reserved
+        self.descriptions = StringTable.from_arrays(group(arrays, "descriptions"))
+        self.severity = arrays["severity"]
+        self.description_ids = arrays["description_ids"]
+        self.index = PairIndex.from_arrays(arrays["index.slots"], arrays["index.rows"])
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[tuple], hierarchy: DrugHierarchy) -> "InteractionTable":
+        """pairs: (name_a, name_b, severity, description) rows; class names carry CLASS_PREFIX."""
+        ids: Dict[str, int] = {"": 0}  # id 0 is reserved for empty hash slots
+        descriptions: Dict[str, int] = {}
+        a, b, severity, description = [], [], [], []
+        for name_a, name_b, sev, text in pairs:
+            a.append(ids.setdefault(_key(name_a), len(ids)))
+            b.append(ids.setdefault(_key(name_b), len(ids)))
+            severity.append(SEVERITIES.index(sev.strip().lower()))
+            description.append(descriptions.setdefault(text, len(descriptions)))
+
+        keys = pair_keys(np.array(a, dtype=np.int64), np.array(b, dtype=np.int64))
+        severity = np.array(severity, dtype=np.int8)
+        # A pair listed twice keeps its most severe entry
+        order = np.lexsort((-severity, keys))
+        keys = keys[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        keep = order[first]
+
+        arrays = {
+            "names": StringTable.build(list(ids)),
+            "descriptions": StringTable.build(list(descriptions)),
+            "severity": severity[keep],
+            "description_ids": np.array(description, dtype=np.int32)[keep],
+            "index": PairIndex(keys[first]),
+        }
+        return cls(flatten(arrays), hierarchy)
+
+    @classmethod
+    def from_csv(cls, path: str = INTERACTIONS_FILE, hierarchy: DrugHierarchy = None) -> "InteractionTable":
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)  # header
+            return cls.from_pairs(((r[0], r[1], r[2], r[3]) for r in reader if r), hierarchy or get_drug_hierarchy())
+
+    def item_ids(self, medication: str) -> List[int]:
+        """Ids of the drug names in a medication string and of their classes."""
+        words = resolve_medication(medication, self.hierarchy).drugs
+        classes = {CLASS_PREFIX + c for d in words for c in self.hierarchy.classes_of(d)}
+        ids = [self.names.index(d) for d in words] + [self.names.index(c) for c in classes]
+        return [i for i in ids if i > 0]
+
+    def check(self, prescriptions: List[Dict]) -> List[Dict]:
+        """
+        Interactions between items of one prescription list, most severe first.
+        Each entry names the two items (by index and medication), the severity and
+        the table entry that matched; a pair of items is reported once.
+        """
+        ids = [self.item_ids(p.get("medication", "")) for p in prescriptions]
+        owner_a, owner_b, id_a, id_b = [], [], [], []
+        for i in range(len(ids)):
+            for j in range(i + 1, len(ids)):
+                for x in ids[i]:
+                    for y in ids[j]:
+                        owner_a.append(i)
+                        owner_b.append(j)
+                        id_a.append(x)
+                        id_b.append(y)
+        if not id_a:
+            return []
+
+        rows = self.index.lookup(pair_keys(np.array(id_a), np.array(id_b))).tolist()
+        best = {}
+        for n in (n for n, row in enumerate(rows) if row >= 0):
+            pair = (owner_a[n], owner_b[n])
+            row = rows[n]
+            if pair not in best or self.severity[row] > self.severity[best[pair][0]]:
+                best[pair] = (row, id_a[n], id_b[n])
+
+        found = []
+        for (i, j), (row, x, y) in best.items():
+            found.append({
+                "items": (i, j),
+                "medications": (prescriptions[i].get("medication", ""), prescriptions[j].get("medication", "")),
+                "severity": SEVERITIES[self.severity[row]],
+                "description": self.descriptions[self.description_ids[row]],
+                "matched": (self.names[x], self.names[y]),
+            })
+        found.sort(key=lambda f: -SEVERITIES.index(f["severity"]))
+        return found
+
+
+_table: Optional[InteractionTable] = None
+
+
+def get_interaction_table() -> InteractionTable:
+    """Process-wide interaction table: the compiled copy when current, else INTERACTIONS_FILE."""
+    global _table
+    if _table is None:
+        compiled = open_component("interactions", [INTERACTIONS_FILE])
+        _table = InteractionTable(compiled[0], get_drug_hierarchy()) if compiled else InteractionTable.from_csv()
+    return _table
@@ -0,0 +1,213 @@
+"""
+Background jobs for OCR and model inference, shared by every Streamlit session.
+
+A session submits a job and gets its id back at once; the page shows progress by polling
+the job and picks the result up on a later rerun, so the script never blocks on
+tesseract or a model. Jobs are keyed by their input: submitting one identical to a job
+still queued or running (the same image uploaded twice, or by two sessions) returns that
+job instead of starting another. At most JOBS_MAX_RUNNING jobs run at once across all
+sessions and one session holds at most JOBS_PER_SESSION of those slots; queued jobs start
+round-robin across sessions, so one user's slow uploads wait their turn rather than
+starving everyone else. Finished jobs are kept JOB_TTL seconds for their sessions to
+collect.
+
+Job functions take their inputs plus a progress(fraction, message) callback.
+"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+JOBS_MAX_RUNNING = int(os.environ.get("JOBS_MAX_RUNNING", os.cpu_count() or 1))
+JOBS_PER_SESSION = 1
+JOB_TTL = 600  # seconds a finished job stays collectable
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def _no_progress(fraction: float, message: str):
+    pass
+
+
+class Job:
+    def __init__(self, key: str, fn: Callable, args: tuple, session: str):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.session = session
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Waiting for a free worker"
+        self.result = None
+        self.error = None
+        self.finished = None
+        self._fn, self._args = fn, args
+        self._done = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job ends or timeout passes; True if it ended."""
+        return self._done.wait(timeout)
+
+    def report(self, fraction: float, message: str):
+        self.progress, self.message = fraction, message
+
+
+class JobRunner:
+    """Thread pool behind a fair, deduplicating queue of jobs."""
+
+    def __init__(self, max_running: int = JOBS_MAX_RUNNING, per_session: int = JOBS_PER_SESSION,
+                 ttl: float = JOB_TTL):
+        self.max_running = max_running
+        self.per_session = per_session
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_running, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._in_flight: Dict[str, Job] = {}  # key -> queued or running job
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()  # session -> queued jobs, in turn order
+        self._running: Dict[str, int] = {}  # session -> running jobs
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, fn: Callable, *args, session: str = "") -> str:
+        """Queue fn(*args, progress=...) unless a job with this key is in flight; returns the job id."""
+        with self._lock:
+            self._prune()
+            job = self._in_flight.get(key)
+            if job is None:
+                job = Job(key, fn, args, session)
+                self._jobs[job.id] = job
+                self._in_flight[key] = job
+                self._queues.setdefault(session, deque()).append(job)
+                self._dispatch()
+            return job.id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job, or None once it has expired (or never existed)."""
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"running": sum(self._running.values()), "queued": sum(len(q) for q in self._queues.values()),
+                    "kept": len(self._jobs)}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _dispatch(self):
+        # Called with the lock held
+        while sum(self._running.values()) < self.max_running:
+            job = self._next()
+            if job is None:
+                return
+            job.status, job.message = RUNNING, "Starting"
+            self._running[job.session] = self._running.get(job.session, 0) + 1
+            self._executor.submit(self._run, job)
+
+    def _next(self) -> Optional[Job]:
+        # The first session in turn order with a free slot goes, then moves to the back
+        for session in list(self._queues):
+            if self._running.get(session, 0) < self.per_session:
+                queue = self._queues.pop(session)
+                job = queue.popleft()
+                if queue:
+                    self._queues[session] = queue
+                return job
+        return None
+
+    def _run(self, job: Job):
+        try:
+            result = job._fn(*job._args, progress=job.report)
+        except Exception as e:
+            job.error, job.status = f"{type(e).__name__}: {e}", FAILED
+        else:
+            job.result, job.progress, job.status = result, 1.0, DONE
+        finally:
+            job._args = ()  # uploads can be large; the result is all that's kept
+            with self._lock:
+                job.finished = time.monotonic()
+                del self._in_flight[job.key]
+                self._running[job.session] -= 1
+                if not self._running[job.session]:
+                    del self._running[job.session]
+                self._dispatch()
+            job._done.set()
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.ttl
+        for job_id in [i for i, job in self._jobs.items() if job.finished is not None and job.finished < cutoff]:
+            del self._jobs[job_id]
+
+
+# Job functions; module-level, so api.py can also run them in its worker processes
+
+def ocr_job(data: bytes, progress: Callable = _no_progress) -> Dict:
+    """OCR text and parsed medications for an uploaded image, through the OCR cache."""
+    import ocr_utils
+    from ocr_cache import get_ocr_cache
+    from ocr_engine import get_pool
+
+    def run():
+        progress(0.1, "Reading the image")
+        img = ocr_utils.preprocess_for_ocr(ocr_utils.load_image(data))
+        progress(0.3, "Recognizing text")
+        text = get_pool().recognize(img)
+        progress(0.9, "Finding medications")
+        return {"text": text, "medications": ocr_utils.parse_prescription(text)}
+    return get_ocr_cache().get_or_compute(data, run)
+
+
+def diagnose_job(data: bytes, symptoms: str, progress: Callable = _no_progress) -> str:
+    """Multimodal skin diagnosis for an optional image and a symptom description."""
+    progress(0.1, "Loading the diagnosis model")
+    # torch and transformers load on first use, in whichever thread or process runs this
+    from disease_diagnose import diagnose
+    from ocr_utils import load_image
+    progress(0.5, "Analysing")
+    return diagnose(load_image(data).convert("RGB") if data else None, symptoms)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Process-wide job runner, started on first use."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+    return _runner
+
+
+def submit_ocr(data: bytes, session: str = "") -> str:
+    return get_job_runner().submit("ocr:" + hashlib.sha256(data).hexdigest(), ocr_job, data, session=session)
+
+
+def submit_diagnosis(data: bytes, symptoms: str, session: str = "") -> str:
+    key = hashlib.sha256(data + b"\0" + symptoms.encode()).hexdigest()
+    return get_job_runner().submit("diagnose:" + key, diagnose_job, data, symptoms, session=session)
+
+
+# Example quick test
+if __name__ == "__main__":
+    def slow(label, seconds, progress=_no_progress):
+        progress(0.5, "Sleeping")
+        time.sleep(seconds)
+        return label
+
+    runner = JobRunner(max_running=2, per_session=1)
+    start = time.monotonic()
+    ids = [runner.submit(f"a{i}", slow, f"a{i}", 0.2, session="a") for i in range(4)]  # one busy session
+    ids += [runner.submit("b0", slow, "b0", 0.2, session="b"), runner.submit("b0", slow, "dup", 0.2, session="c")]
+    for job_id in ids:
+        job = runner.get(job_id)
+        job.wait()
+        print(f"{job.result:<4} finished at {job.finished - start:.1f}s")
+    print("Deduplicated:", ids[-1] == ids[-2], runner.stats())
+    runner.shutdown()
@@ -0,0 +1,233 @@
+"""
+Compiled, memory-mapped storage for the drug knowledge base.
+
+build_knowledge_base.py compiles the hierarchy, interaction table and dose limits into
+a directory of .npy arrays plus manifest.json. Strings live in string tables (one UTF-8
+blob, an offsets array and a hash index), everything else in fixed-width arrays. Loading
+opens each array with mmap_mode="r", so startup does no parsing and every process that
+opens the same files shares the same pages. A component is only used while its source
+files are unchanged; otherwise callers fall back to the JSON/CSV sources.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+KNOWLEDGE_BASE_DIR = os.environ.get("KNOWLEDGE_BASE_DIR", os.path.join(DATA_DIR, "compiled"))
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+LOAD_FACTOR = 0.5
+SCALAR_LOOKUP_MAX = 256  # below this, per-key probing beats numpy's per-call overhead
+LOOKUP_MEMO_SIZE = 10000
+
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15  # Fibonacci hashing
+
+
+def hash64(text: str) -> int:
+    """Stable 64-bit hash of a string (never 0, which marks an empty slot)."""
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little") or 1
+
+
+class PairIndex:
+    """Open-addressing (linear probing) hash table from uint64 keys to row numbers."""
+
+    def __init__(self, keys: np.ndarray, load_factor: float = LOAD_FACTOR):
+        bits = max(4, int(np.ceil(np.log2(max(len(keys), 1) / load_factor))))
+        slots = np.zeros(1 << bits, dtype=np.uint64)
+        rows = np.full(1 << bits, -1, dtype=np.int32)
+        mask = np.int64((1 << bits) - 1)
+
+        # Insert every key at once: each round, the first key claiming a free slot takes it
+        # and everything else moves one slot along
+        pending = np.arange(len(keys))
+        slot = self._home(keys, bits)
+        while len(pending):
+            free = slots[slot] == 0
+            claimed, first = np.unique(slot[free], return_index=True)
+            winners = pending[free][first]
+            slots[claimed] = keys[winners]
+            rows[claimed] = winners
+            placed = np.zeros(len(pending), dtype=bool)
+            placed[np.flatnonzero(free)[first]] = True
+            pending = pending[~placed]
+            slot = (slot[~placed] + 1) & mask
+        self._set(slots, rows)
+
+    @classmethod
+    def from_arrays(cls, slots: np.ndarray, rows: np.ndarray) -> "PairIndex":
+        index = cls.__new__(cls)
+        index._set(slots, rows)
+        return index
+
+    def _set(self, slots: np.ndarray, rows: np.ndarray):
+        self.slots = slots
+        self.rows = rows
+        self._bits = len(slots).bit_length() - 1
+        self._mask = np.int64(len(slots) - 1)
+
+    @staticmethod
+    def _home(keys: np.ndarray, bits: int) -> np.ndarray:
+        return ((keys * np.uint64(_HASH_MULTIPLIER)) >> np.uint64(64 - bits)).astype(np.int64)
+
+    def lookup(self, keys: np.ndarray) -> np.ndarray:
+        """Row number for each key, or -1 where the key is absent."""
+        if len(keys) <= SCALAR_LOOKUP_MAX:
+            return np.array([self.get(int(k)) for k in keys], dtype=np.int32)
+        result = np.full(len(keys), -1, dtype=np.int32)
+        active = np.arange(len(keys))
+        slot = self._home(keys, self._bits)
+        while len(active):
+            found = self.slots[slot]
+            hit = found == keys[active]
+            result[active[hit]] = self.rows[slot[hit]]
+            more = ~hit & (found != 0)
+            active = active[more]
+            slot = (slot[more] + 1) & self._mask
+        return result
+
+    def get(self, key: int) -> int:
+        """Row number for one key, or -1."""
+        mask = (1 << self._bits) - 1
+        slot = ((key * _HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> (64 - self._bits)
+        while True:
+            found = int(self.slots[slot])
+            if found == key:
+                return int(self.rows[slot])
+            if found == 0:
+                return -1
+            slot = (slot + 1) & mask
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"slots": self.slots, "rows": self.rows}
+
+    @property
+    def nbytes(self) -> int:
+        return self.slots.nbytes + self.rows.nbytes
+
+
+class StringTable:
+    """Immutable list of strings: one UTF-8 blob, an offsets array and a hash index for lookups."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray, index: PairIndex):
+        self.blob = blob
+        self.offsets = offsets
+        self._index = index
+        self._memo: Dict[str, int] = {}
+
+    @classmethod
+    def build(cls, strings: List[str]) -> "StringTable":
+        encoded = [s.encode() for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(e) for e in encoded])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8).copy()
+        index = PairIndex(np.array([hash64(s) for s in strings], dtype=np.uint64))
+        return cls(blob, offsets, index)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "StringTable":
+        return cls(arrays["blob"], arrays["offsets"], PairIndex.from_arrays(arrays["slots"], arrays["rows"]))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"blob": self.blob, "offsets": self.offsets, **self._index.arrays()}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode()
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def index(self, text: str) -> int:
+        """Position of text in the table, or -1."""
+        # Medication and allergy terms repeat constantly, so results are memoized
+        if text in self._memo:
+            return self._memo[text]
+        if len(self._memo) >= LOOKUP_MEMO_SIZE:
+            self._memo.clear()
+        i = self._index.get(hash64(text))
+        self._memo[text] = i = i if i >= 0 and self[i] == text else -1
+        return i
+
+    def __contains__(self, text: str) -> bool:
+        return self.index(text) >= 0
+
+
+def flatten(arrays: Dict[str, object], prefix: str = "") -> Dict[str, np.ndarray]:
+    """Nested {name: array | StringTable | PairIndex | dict} as flat {"a.b": array}."""
+    flat = {}
+    for name, value in arrays.items():
+        key = f"{prefix}{name}"
+        if isinstance(value, (StringTable, PairIndex)):
+            value = value.arrays()
+        if isinstance(value, dict):
+            flat.update(flatten(value, key + "."))
+        else:
+            flat[key] = np.asarray(value)
+    return flat
+
+
+def group(flat: Dict[str, np.ndarray], prefix: str) -> Dict[str, np.ndarray]:
+    """The arrays stored under prefix (as written by flatten), with the prefix removed."""
+    return {name[len(prefix) + 1:]: value for name, value in flat.items() if name.startswith(prefix + ".")}
+
+
+def source_stamps(paths: Iterable[str]) -> Dict[str, List[int]]:
+    return {os.path.basename(p): [os.stat(p).st_size, os.stat(p).st_mtime_ns] for p in paths}
+
+
+def write_component(name: str, arrays: Dict[str, object], sources: List[str], meta: Dict = None,
+                    directory: str = KNOWLEDGE_BASE_DIR):
+    """Save a component's arrays and record it in the manifest (written last)."""
+    os.makedirs(directory, exist_ok=True)
+    flat = flatten(arrays)
+    for key, array in flat.items():
+        # Replace rather than overwrite, so processes still mapping the old file are unaffected
+        path = os.path.join(directory, f"{name}.{key}.npy")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+    manifest = read_manifest(directory) or {"format": FORMAT_VERSION, "components": {}}
+    manifest["components"][name] = {
+        "arrays": {key: [str(a.dtype), list(a.shape)] for key, a in flat.items()},
+        "sources": source_stamps(sources),
+        "meta": meta or {},
+    }
+    tmp_path = os.path.join(directory, f"{MANIFEST}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST))
+
+
+def read_manifest(directory: str = KNOWLEDGE_BASE_DIR) -> Optional[Dict]:
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return manifest if manifest.get("format") == FORMAT_VERSION else None
+
+
+def open_component(name: str, sources: List[str], directory: str = KNOWLEDGE_BASE_DIR):
+    """
+    (arrays, meta) for a compiled component, memory-mapped, or None when it was never
+    built or its source files changed since.
+    """
+    manifest = read_manifest(directory)
+    entry = (manifest or {}).get("components", {}).get(name)
+    if entry is None:
+        return None
+    try:
+        if entry["sources"] != source_stamps(sources):
+            return None
+        arrays = {key: np.load(os.path.join(directory, f"{name}.{key}.npy"), mmap_mode="r")
+                  for key in entry["arrays"]}
+    except FileNotFoundError:
+        return None
+    return arrays, entry["meta"]
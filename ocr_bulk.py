@@ -0,0 +1,197 @@
+"""
+Bulk OCR ingestion for batches of scanned prescriptions and multi-page PDFs.
+
+Pages are fanned out across a process pool (one OCR engine per worker), results are
+yielded as soon as each page finishes, and documents are reassembled in page order. A
+page that fails (corrupt file, OCR error, crashed worker) yields a record with an
+"error" field instead of aborting the batch.
+
+Usage:
+    python ocr_bulk.py scans/ batch.pdf -o medications.jsonl --workers 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Tuple
+
+import ocr_engine
+from ocr_utils import extract_text_from_image, parse_prescription
+
+try:
+    import fitz  # PyMuPDF, only needed for PDFs
+except ImportError:
+    fitz = None
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp"}
+PDF_DPI = 300
+
+
+def list_pages(paths: Iterable[str]) -> List[Tuple[str, int, int]]:
+    """Expand files and directories into (document, page_index, page_count) tasks."""
+    documents = []
+    for path in paths:
+        if os.path.isdir(path):
+            documents.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS | {".pdf"}
+            ))
+        else:
+            documents.append(path)
+
+    pages = []
+    for doc in documents:
+        try:
+            count = _pdf_page_count(doc) if doc.lower().endswith(".pdf") else 1
+        except ImportError:
+            raise
+        except Exception:
+            count = 1  # unreadable PDF: its one task fails in the worker and is reported there
+        pages.extend((doc, i, count) for i in range(count))
+    return pages
+
+
+def _pdf_page_count(path: str) -> int:
+    if fitz is None:
+        raise ImportError("PyMuPDF is required for PDF input: pip install pymupdf")
+    with fitz.open(path) as pdf:
+        return pdf.page_count
+
+
+def _init_worker():
+    # Parallelism comes from the process pool, so each worker needs only one engine
+    ocr_engine.configure_pool(size=1)
+
+
+def ocr_page(document: str, page: int, pages: int, dpi: int = PDF_DPI) -> Dict:
+    """OCR and parse one page; runs inside a worker process."""
+    start = time.perf_counter()
+    # Errors come back as records: not every exception pickles back to the parent
+    # (tesseract's don't), and one that fails to unpickle breaks the whole pool
+    try:
+        if document.lower().endswith(".pdf"):
+            with fitz.open(document) as pdf:
+                pixmap = pdf[page].get_pixmap(dpi=dpi)
+                source = pixmap.tobytes("png")
+        else:
+            source = document
+        text = extract_text_from_image(source)
+    except Exception as e:
+        return page_error((document, page, pages), e)
+    return {
+        "document": document,
+        "page": page,
+        "pages": pages,
+        "text": text,
+        "medications": parse_prescription(text),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def ingest_pages(paths: Iterable[str], workers: int = None, dpi: int = PDF_DPI) -> Iterator[Dict]:
+    """
+    Yield one result per page in completion order.
+    At most workers * 2 pages are in flight, so memory stays flat for any batch size.
+    """
+    tasks = iter(list_pages(paths))
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    pending = {}  # future -> (task, pool it was submitted to)
+    try:
+        while True:
+            for task in tasks:
+                pending[pool.submit(ocr_page, *task, dpi)] = (task, pool)
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                task, owner = pending.pop(future)
+                try:
+                    record = future.result()
+                except Exception as e:
+                    record = page_error(task, e)
+                    broken |= isinstance(e, BrokenProcessPool) and owner is pool
+                yield record
+            if broken:
+                # A worker died (e.g. killed for memory); the rest of the batch gets a new pool
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def page_error(task: Tuple[str, int, int], error: Exception) -> Dict:
+    document, page, pages = task
+    return {"document": document, "page": page, "pages": pages, "text": "", "medications": [],
+            "error": f"{type(error).__name__}: {error}", "seconds": None}
+
+
+async def aingest_pages(paths: Iterable[str], workers: int = None, dpi: int = PDF_DPI) -> AsyncIterator[Dict]:
+    """Async-iterator form of ingest_pages for asyncio callers."""
+    loop = asyncio.get_running_loop()
+    results = ingest_pages(paths, workers, dpi)
+    done = object()
+    while True:
+        result = await loop.run_in_executor(None, next, results, done)
+        if result is done:
+            return
+        yield result
+
+
+def ingest_documents(paths: Iterable[str], workers: int = None, dpi: int = PDF_DPI) -> Iterator[Dict]:
+    """Yield each document once all of its pages are done, with pages in order."""
+    partial = {}
+    for result in ingest_pages(paths, workers, dpi):
+        pages = partial.setdefault(result["document"], {})
+        pages[result["page"]] = result
+        if len(pages) == result["pages"]:
+            ordered = [pages[i] for i in range(result["pages"])]
+            del partial[result["document"]]
+            record = {
+                "document": result["document"],
+                "pages": len(ordered),
+                "text": "\n".join(p["text"] for p in ordered),
+                "medications": [m for p in ordered for m in p["medications"]],
+            }
+            errors = [{"page": p["page"], "error": p["error"]} for p in ordered if "error" in p]
+            if errors:
+                record["errors"] = errors
+            yield record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk OCR of prescription images and PDFs to JSONL")
+    parser.add_argument("inputs", nargs="+", help="image files, PDFs or directories")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file, written incrementally")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--dpi", type=int, default=PDF_DPI, help="PDF rasterization DPI")
+    parser.add_argument("--per-page", action="store_true", help="write one line per page instead of per document")
+    args = parser.parse_args()
+
+    results = (ingest_pages if args.per_page else ingest_documents)(args.inputs, args.workers, args.dpi)
+    start = time.perf_counter()
+    n_pages = n_failed = 0
+    with open(args.output, "w") as out:
+        for record in results:
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            n_pages += 1 if args.per_page else record["pages"]
+            n_failed += ("error" in record) if args.per_page else len(record.get("errors", ()))
+            elapsed = time.perf_counter() - start
+            print(f"\r{n_pages} pages, {n_pages / elapsed:.2f} pages/sec", end="", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    failed = f", {n_failed} failed (see \"error\" fields)" if n_failed else ""
+    print(f"\n✅ {n_pages} pages in {elapsed:.1f}s ({n_pages / max(elapsed, 1e-9):.2f} pages/sec){failed} -> {args.output}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Cache of OCR results keyed by image content.
+
+Entries hold the OCR text and the medications parsed from it. Keys combine a SHA-256
+of the uploaded bytes with the OCR engine version, the preprocessing settings and a hash
+of the parsing code and drug lexicon, so a new engine, pipeline or parser never serves
+stale results. The memory tier is an LRU bounded
+by total size; an optional on-disk tier (one JSON file per entry) survives restarts
+and is shared by every process pointed at the same directory.
+"""
+import functools
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import drug_lexicon
+import ocr_utils
+import prescription_parser
+from ocr_engine import engine_version
+from ocr_utils import PREPROCESS_SETTINGS
+
+OCR_CACHE_DIR = os.environ.get("OCR_CACHE_DIR")  # unset = memory only
+OCR_CACHE_MAX_BYTES = 16 * 1024 * 1024
+# Everything that turns OCR text into the cached medications
+PARSER_FILES = (ocr_utils.__file__, prescription_parser.__file__, drug_lexicon.__file__,
+                drug_lexicon.DRUG_NAMES_FILE)
+
+
+@functools.lru_cache(maxsize=None)
+def pipeline_version() -> str:
+    """Identifies the engine, preprocessing and parser that produced a cached result."""
+    h = hashlib.sha256(f"{engine_version()}|{json.dumps(PREPROCESS_SETTINGS, sort_keys=True)}".encode())
+    for path in PARSER_FILES:
+        with open(path, "rb") as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()[:16]
+
+
+def content_key(data) -> str:
+    """Cache key for raw image bytes (bytes, bytearray or memoryview)."""
+    return f"{hashlib.sha256(data).hexdigest()}-{pipeline_version()}"
+
+
+class OCRCache:
+    def __init__(self, max_bytes: int = OCR_CACHE_MAX_BYTES, disk_dir: Optional[str] = OCR_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()  # key -> (entry, size)
+        self._size = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, entry: Dict):
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def get_or_compute(self, data, compute: Callable[[], Dict]) -> Dict:
+        """Return the cached entry for these image bytes, running compute() only on a miss."""
+        key = content_key(data)
+        entry = self.get(key)
+        if entry is None:
+            entry = compute()
+            self.put(key, entry)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remember(self, key: str, entry: Dict):
+        size = len(json.dumps(entry))
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (entry, size)
+            self._size += size
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                self._size -= self._entries.popitem(last=False)[1][1]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Dict]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_disk(self, key: str, entry: Dict):
+        if not self.disk_dir:
+            return
+        # Write then rename so concurrent readers never see a partial file
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(key))
+
+
+_cache = None
+
+
+def get_ocr_cache() -> OCRCache:
+    """Process-wide OCR cache."""
+    global _cache
+    if _cache is None:
+        _cache = OCRCache()
+    return _cache
@@ -0,0 +1,131 @@
+"""
+Pool of long-lived OCR engines.
+
+With tesserocr installed each worker keeps its own in-process Tesseract API, so
+language data is loaded once per engine instead of once per image. Without it the
+pool falls back to pytesseract (one tesseract process per call) but still bounds
+how many recognitions run at once.
+"""
+import functools
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+import pytesseract
+
+# If tesseract is not in PATH (pytesseract fallback), set it explicitly:
+# pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+
+class OCREnginePool:
+    """Fixed set of worker threads, each owning one OCR engine, fed by a bounded queue."""
+
+    def __init__(self, size=None, max_queue=64, lang="eng"):
+        self.size = size or os.cpu_count() or 1
+        self.lang = lang
+        self._tasks = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        for i in range(self.size):
+            thread = threading.Thread(target=self._worker, name=f"ocr-engine-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    @property
+    def backend(self) -> str:
+        return "tesserocr" if tesserocr is not None else "pytesseract"
+
+    def submit(self, image, timeout=None) -> Future:
+        """
+        Queue a PIL image for recognition and return a Future with its text.
+        Blocks (up to timeout) while the queue is full, so callers feel back-pressure
+        instead of piling up unbounded work.
+        """
+        future = Future()
+        self._tasks.put((image, future), timeout=timeout)
+        return future
+
+    def recognize(self, image) -> str:
+        return self.submit(image).result()
+
+    def map(self, images):
+        """Recognize several images concurrently, returning texts in input order."""
+        futures = [self.submit(image) for image in images]
+        return [f.result() for f in futures]
+
+    def shutdown(self):
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _worker(self):
+        # tesserocr releases the GIL while recognizing, so engines run in parallel
+        engine, startup_error = None, None
+        try:
+            engine = tesserocr.PyTessBaseAPI(lang=self.lang) if tesserocr is not None else None
+        except Exception as e:
+            # e.g. missing traineddata: keep taking tasks and fail each one with the cause,
+            # so callers get an error instead of waiting forever on a dead thread
+            startup_error = RuntimeError(f"OCR engine failed to start ({self.lang}): {e}")
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                image, future = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if startup_error is not None:
+                    future.set_exception(startup_error)
+                    continue
+                try:
+                    future.set_result(self._recognize(engine, image))
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            if engine is not None:
+                engine.End()
+
+    def _recognize(self, engine, image) -> str:
+        if engine is None:
+            return pytesseract.image_to_string(image, lang=self.lang)
+        engine.SetImage(image)
+        return engine.GetUTF8Text()
+
+
+@functools.lru_cache(maxsize=None)
+def engine_version() -> str:
+    """Backend and Tesseract version, e.g. 'tesserocr-5.3.0'."""
+    if tesserocr is not None:
+        return f"tesserocr-{tesserocr.tesseract_version().split()[1]}"
+    return f"pytesseract-{pytesseract.get_tesseract_version()}"
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> OCREnginePool:
+    """Process-wide engine pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OCREnginePool()
+    return _pool
+
+
+def configure_pool(size=None, max_queue=64, lang="eng") -> OCREnginePool:
+    """Replace the process-wide pool, e.g. with a single engine inside a worker process."""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, OCREnginePool(size=size, max_queue=max_queue, lang=lang)
+    if old is not None:
+        old.shutdown()
+    return _pool
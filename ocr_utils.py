@@ -1,35 +1,186 @@
-import pytesseract
-from PIL import Image
-import re
+from PIL import Image, ImageOps
+from typing import BinaryIO, Union
+import io
+import os
+import numpy as np
+from scipy import ndimage
+from ocr_engine import get_pool
+from drug_lexicon import get_lexicon
+from prescription_parser import parse_item
 
-# If tesseract is not in PATH, set it explicitly:
-# pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+# Preprocessing settings (also identify which pipeline produced a given OCR result)
+PREPROCESS_SETTINGS = {
+    "target_dpi": 300,
+    "max_skew_degrees": 10.0,
+    "skew_step_degrees": 0.5,
+    "sauvola_k": 0.2,
+    "crop_margin": 20,
+}
+PAGE_WIDTH_INCHES = 8.27  # A4; used to estimate DPI when the photo has no usable metadata
 
-def extract_text_from_image(image_path: str) -> str:
-    """Extract raw text from a prescription image using OCR."""
-    img = Image.open(image_path)
-    text = pytesseract.image_to_string(img)
+ImageSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO, Image.Image]
+
+def extract_text_from_image(source: ImageSource, preprocess: bool = True) -> str:
+    """
+    Extract raw text from a prescription image using the shared OCR engine pool.
+    source may be a path, raw image bytes/buffer (e.g. uploaded_file.getbuffer()),
+    a binary file object or a PIL image, so OCR can run without touching disk.
+    """
+    img = load_image(source)
+    if preprocess:
+        img = preprocess_for_ocr(img)
+    text = get_pool().recognize(img)
     return text
 
+def load_image(source: ImageSource) -> Image.Image:
+    """Open and decode an image from any ImageSource."""
+    if isinstance(source, Image.Image):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = _BufferReader(source)
+    img = Image.open(source)
+    img.load()  # decode now, while the caller's buffer is still alive
+    return img
+
+class _BufferReader(io.RawIOBase):
+    """Seekable read-only file over a buffer, so PIL decodes it without a copy of the whole upload."""
+
+    def __init__(self, buf):
+        self._view = memoryview(buf).cast("B")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+def preprocess_for_ocr(img: Image.Image, settings: dict = PREPROCESS_SETTINGS) -> Image.Image:
+    """
+    Grayscale -> downscale to target DPI -> deskew -> adaptive binarization -> crop to text.
+    Returns a black-on-white 'L' image that tesseract recognizes much faster than the raw photo.
+    """
+    gray = ImageOps.exif_transpose(img).convert("L")
+    gray = _downscale_to_dpi(gray, settings["target_dpi"])
+
+    angle = estimate_skew(np.asarray(gray), settings["max_skew_degrees"], settings["skew_step_degrees"])
+    if angle:
+        gray = gray.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+
+    binary = sauvola_binarize(np.asarray(gray, dtype=np.float64), k=settings["sauvola_k"])
+    return Image.fromarray(_crop_to_text(binary, settings["crop_margin"]))
+
+def _downscale_to_dpi(gray: Image.Image, target_dpi: int) -> Image.Image:
+    # Phone photos usually claim 72 dpi, so only trust scanner-like metadata
+    dpi = gray.info.get("dpi", (0, 0))[0]
+    if not dpi or dpi < 150:
+        dpi = min(gray.size) / PAGE_WIDTH_INCHES
+    scale = target_dpi / dpi
+    if scale >= 1:
+        return gray
+    size = (max(1, round(gray.width * scale)), max(1, round(gray.height * scale)))
+    return gray.resize(size, Image.LANCZOS, reducing_gap=2.0)
+
+def sauvola_binarize(gray: np.ndarray, window: int = None, k: float = 0.2, r: float = 128.0) -> np.ndarray:
+    """Sauvola thresholding with integral images; returns uint8 with text 0 and background 255."""
+    if window is None:
+        window = max(15, min(gray.shape) // 40) | 1
+    mean = _box_mean(gray, window)
+    sq_mean = _box_mean(gray * gray, window)
+    std = np.sqrt(np.maximum(sq_mean - mean * mean, 0))
+    threshold = mean * (1 + k * (std / r - 1))
+    return np.where(gray > threshold, 255, 0).astype(np.uint8)
+
+def _box_mean(a: np.ndarray, window: int) -> np.ndarray:
+    # Mean over a window x window box centred on each pixel, from one integral image
+    pad = window // 2
+    padded = np.pad(a, pad, mode="edge")
+    integral = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1))
+    integral[1:, 1:] = padded.cumsum(0).cumsum(1)
+    h, w = a.shape
+    total = (integral[window:window + h, window:window + w] - integral[:h, window:window + w]
+             - integral[window:window + h, :w] + integral[:h, :w])
+    return total / (window * window)
+
+def estimate_skew(gray: np.ndarray, max_angle: float = 10.0, step: float = 0.5) -> float:
+    """
+    Rotation (degrees, PIL convention) that makes text lines horizontal.
+    Ink pixels are projected onto rows for every candidate angle at once and the angle
+    with the sharpest row profile wins.
+    """
+    # Work on a ~1000px thumbnail; skew does not need full resolution
+    stride = max(1, max(gray.shape) // 1000)
+    small = gray[::stride, ::stride].astype(np.float64)
+    ys, xs = np.nonzero(sauvola_binarize(small) == 0)
+    if ys.size < 100:
+        return 0.0
+    sample = max(1, ys.size // 100_000)
+    ys, xs = ys[::sample], xs[::sample]
+
+    angles = np.deg2rad(np.arange(-max_angle, max_angle + step / 2, step))
+    rows = np.rint(ys[None, :] * np.cos(angles)[:, None] + xs[None, :] * np.sin(angles)[:, None]).astype(np.int64)
+    rows -= rows.min()
+    n_bins = int(rows.max()) + 1
+    flat = rows + np.arange(len(angles))[:, None] * n_bins
+    profiles = np.bincount(flat.ravel(), minlength=len(angles) * n_bins).reshape(len(angles), n_bins)
+    scores = (np.diff(profiles, axis=1).astype(np.float64) ** 2).sum(axis=1)
+    # Text tilted by +a degrees needs a rotation of -a to level it
+    return -float(np.rad2deg(angles[np.argmax(scores)]))
+
+def _crop_to_text(binary: np.ndarray, margin: int, min_ink: float = 0.005) -> np.ndarray:
+    # Keep the bounding box of rows/columns that contain a meaningful amount of ink.
+    # Ink touching the image border (table edges, rotation fill, shadows) is not text.
+    ink = binary == 0
+    labels, _ = ndimage.label(ink)
+    border = np.unique(np.concatenate([labels[0], labels[-1], labels[:, 0], labels[:, -1]]))
+    ink &= ~np.isin(labels, border[border > 0])
+    rows = np.flatnonzero(ink.mean(axis=1) > min_ink)
+    cols = np.flatnonzero(ink.mean(axis=0) > min_ink)
+    if rows.size == 0 or cols.size == 0:
+        return binary
+    top, bottom = max(rows[0] - margin, 0), min(rows[-1] + margin + 1, binary.shape[0])
+    left, right = max(cols[0] - margin, 0), min(cols[-1] + margin + 1, binary.shape[1])
+    return binary[top:bottom, left:right]
+
 def parse_prescription(text: str):
     """
     Extract medicines and dosages from OCR text.
-    Very basic regex parser for hackathon MVP.
+    Each line goes through the same tokenizer as prescription_parser.parse_item.
     Example OCR line: "Paracetamol 500 mg"
     Returns: list of dicts [{name, dosage, unit}]
     """
     medicines = []
-    pattern = re.compile(r"([A-Za-z]+)\s*(\d+)\s*(mg|ml|g)?", re.IGNORECASE)
+    lexicon = get_lexicon()
 
     for line in text.splitlines():
-        match = pattern.search(line)
-        if match:
-            name, dosage, unit = match.groups()
-            medicines.append({
-                "name": name.capitalize(),
-                "dosage": int(dosage),
-                "unit": unit if unit else "mg"  
-            })
+        parsed = parse_item(line)
+        if parsed["strength"] is None or not parsed["medication"]:
+            continue
+        # Snap noisy OCR words ("Paracetarnol", "Amoxi cillin") to a known drug name
+        name = lexicon.match_name(parsed["medication"]) or parsed["medication"].split()[-1].capitalize()
+        strength = parsed["strength"]
+        medicines.append({
+            "name": name,
+            "dosage": int(strength) if strength.is_integer() else strength,
+            "unit": parsed["unit"] or "mg"
+        })
     return medicines
 
 # Example quick test
@@ -1,25 +1,170 @@
 import re
-from typing import List, Dict
+from typing import Dict, Iterable, List, Optional
+
+_FREQUENCY = r"""
+    (?P<times>\d+|one|two|three|four|five|six)\s*(?:x|times)\s*(?:a|per|/)?\s*(?:day|daily|d)\b
+  | every\s+(?P<every>\d+)\s*(?:h|hrs?|hours?)\b
+  | q(?P<qh>\d+)h\b
+  | (?:once|twice|thrice)(?:\s+(?:a|per)\s+(?:day|week)|\s+(?:daily|weekly))?\b
+  | (?:od|qd|bd|bid|tds|tid|qds|qid|hs|nocte|mane|daily|weekly)\b
+  | (?:at\s+night|at\s+bedtime|every\s+morning|in\s+the\s+morning)\b
+"""
+_ROUTE = r"""
+    orally|oral|by\s+mouth|po|iv|intravenous(?:ly)?|im|intramuscular(?:ly)?|sc|subcut|subcutaneous(?:ly)?
+  | topical(?:ly)?|inhaled|sublingual(?:ly)?|sl|rectal(?:ly)?|pr
+"""
+# Words that end a medication name ("Salbutamol inhaled ...", "Aspirin daily ...")
+_NAME_STOP = r"(?:once|twice|thrice|od|qd|bd|bid|tds|tid|qds|qid|hs|nocte|mane|daily|weekly|at|every|in|for|q\d+h|" \
+             + _ROUTE + r")\b"
+
+# The whole item grammar in one compiled pattern, so each item is a single match:
+# optional dose-form words, the medication name, then any mix of strength (or liquid
+# concentration, "250mg/5ml"), frequency, duration and route in any order. Unrecognized
+# words are skipped by the catch-all.
+ITEM_RE = re.compile(rf"""
+    \s*(?:(?:tabs?|tablets?|caps?|capsules?|syrup|inj|injection|take|rx)\b\.?\s*)*
+    (?P<name>[a-z][a-z\-]*(?:\s+(?!{_NAME_STOP})[a-z][a-z\-]*)*)?
+    (?:
+        (?P<concentration>(?P<conc_amount>\d+(?:\.\d+)?)\s*(?P<conc_unit>mcg|µg|ug|mg|g|iu|units?)
+            \s*/\s*(?P<per_amount>\d+(?:\.\d+)?)?\s*ml(?![a-z]))
+      | (?P<strength>(?P<amount>\d+(?:\.\d+)?)\s*(?P<unit>mcg|µg|ug|mg|g|ml|iu|units?|%)(?![a-z]))
+      | (?P<frequency>{_FREQUENCY})
+      | (?P<duration>(?:for\s+)?(?P<dur_n>\d+)\s*(?P<dur_unit>days?|weeks?|wks?|months?|d|w)\b)
+      | (?P<route>(?:{_ROUTE})\b)
+      | (?P<number>\d+(?:\.\d+)?)
+      | [^\s\d]\S*
+      | \s+
+    )*
+""", re.IGNORECASE | re.VERBOSE)
+
+UNITS = {"mcg": "mcg", "µg": "mcg", "ug": "mcg", "mg": "mg", "g": "g", "ml": "ml",
+         "iu": "IU", "unit": "IU", "units": "IU", "%": "%"}
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6}
+DOSES_PER_DAY = {
+    "od": 1, "qd": 1, "daily": 1, "once": 1, "hs": 1, "nocte": 1, "mane": 1, "at night": 1,
+    "at bedtime": 1, "every morning": 1, "in the morning": 1,
+    "bd": 2, "bid": 2, "twice": 2, "tds": 3, "tid": 3, "thrice": 3, "qds": 4, "qid": 4,
+    "weekly": 1 / 7,
+}
+ROUTES = {"orally": "oral", "by mouth": "oral", "po": "oral", "intravenous": "iv", "intravenously": "iv",
+          "intramuscular": "im", "intramuscularly": "im", "subcut": "sc", "subcutaneous": "sc",
+          "subcutaneously": "sc", "topically": "topical", "sublingually": "sublingual", "sl": "sublingual",
+          "rectally": "rectal", "pr": "rectal"}
+DAYS_PER_UNIT = {"d": 1, "day": 1, "w": 7, "wk": 7, "week": 7, "month": 30}
+_ITEM_SEPARATOR = re.compile(r"[;\n]")
+PARSE_MANY_MEMO_SIZE = 100_000
+
+
+def parse_item(item: str) -> Dict:
+    """
+    Parse one prescription item, e.g. "Paracetamol 500mg orally twice a day for 7 days".
+    Returns the display fields (medication, dosage, frequency, duration) plus normalized
+    strength/unit, doses_per_day, route and duration_days (None when not stated).
+    A liquid concentration ("250mg/5ml 5ml") gives the strength of the volume taken per
+    dose, or of the concentration's own volume when no dose volume is written. Otherwise,
+    if a field appears more than once in the item, the last occurrence is used.
+    """
+    g = ITEM_RE.match(item).groupdict()
+    parsed = {
+        "medication": " ".join((g["name"] or "").split()), "dosage": "", "frequency": "", "duration": "",
+        "strength": None, "unit": None, "doses_per_day": None, "route": None, "duration_days": None,
+    }
+
+    if g["concentration"]:
+        per_ml = float(g["conc_amount"]) / float(g["per_amount"] or 1)
+        parsed["strength"] = float(g["conc_amount"])
+        parsed["unit"] = UNITS[g["conc_unit"].lower()]
+        parsed["dosage"] = "".join(g["concentration"].split())
+        if g["strength"]:
+            if g["unit"].lower() == "ml":
+                parsed["strength"] = per_ml * float(g["amount"])
+            else:  # the dose itself is written out ("250mg/5ml 500mg")
+                parsed["strength"] = float(g["amount"])
+                parsed["unit"] = UNITS[g["unit"].lower()]
+            parsed["dosage"] += " " + "".join(g["strength"].split())
+    elif g["strength"]:
+        parsed["strength"] = float(g["amount"])
+        parsed["unit"] = UNITS[g["unit"].lower()]
+        parsed["dosage"] = "".join(g["strength"].split())
+    elif g["number"]:
+        # No unit written anywhere ("Paracetamol 500"): take the bare number as the strength
+        parsed["strength"] = float(g["number"])
+        parsed["dosage"] = g["number"]
+
+    if g["frequency"]:
+        parsed["frequency"] = " ".join(g["frequency"].split())
+        parsed["doses_per_day"] = _doses_per_day(g)
+
+    if g["duration"]:
+        words = g["duration"].split()
+        parsed["duration"] = " ".join(words[1:] if words[0].lower() == "for" else words)
+        parsed["duration_days"] = float(g["dur_n"]) * DAYS_PER_UNIT[g["dur_unit"].lower().rstrip("s")]
+
+    if g["route"]:
+        route = " ".join(g["route"].lower().split())
+        parsed["route"] = ROUTES.get(route, route)
+
+    return parsed
+
+
+def _doses_per_day(g: Dict) -> Optional[float]:
+    if g["times"]:
+        times = g["times"].lower()
+        return float(NUMBER_WORDS.get(times) or times)
+    hours = g["every"] or g["qh"]
+    if hours:
+        return 24 / float(hours) if float(hours) else None
+    text = " ".join(g["frequency"].lower().split())
+    first = text.split()[0]
+    per_week = "week" in text
+    base = DOSES_PER_DAY.get(text, DOSES_PER_DAY.get(first))
+    if base is None:
+        return None
+    return base / 7 if per_week and first != "weekly" else float(base)
+
 
 def parse_prescription_text(text: str) -> List[Dict[str, str]]:
     """
     Converts free-text prescription into structured list of dictionaries.
     Example input: "Paracetamol 500mg twice a day for 7 days; Ibuprofen 200mg once daily for 5 days"
     """
-    items = text.split(";")  # split multiple prescriptions
     prescriptions = []
-    
-    for item in items:
+
+    for item in _ITEM_SEPARATOR.split(text):  # split multiple prescriptions
         item = item.strip()
-        if not item:
-            continue
-        
-        # crude regex parsing
-        match = re.match(r"(?P<medication>[a-zA-Z\s]+)\s(?P<dosage>\d+mg)\s(?P<frequency>.+?)\sfor\s(?P<duration>.+)", item)
-        if match:
-            prescriptions.append(match.groupdict())
-        else:
-            # fallback: store as medication only
-            prescriptions.append({"medication": item, "dosage": "", "frequency": "", "duration": ""})
-    
+        if item:
+            prescriptions.append(_parse_or_fallback(item))
+
     return prescriptions
+
+
+def _parse_or_fallback(item: str) -> Dict:
+    parsed = parse_item(item)
+    if not parsed["dosage"]:
+        # fallback: store as medication only
+        parsed["medication"] = item
+    return parsed
+
+
+def parse_many(texts: Iterable[str]) -> List[List[Dict]]:
+    """
+    Bulk form of parse_prescription_text for large batches of free-text lines.
+    Dispensing records repeat the same items constantly, so each distinct item is
+    parsed once per call.
+    """
+    seen = {}
+    results = []
+    for text in texts:
+        items = []
+        for item in _ITEM_SEPARATOR.split(text):
+            item = item.strip()
+            if not item:
+                continue
+            parsed = seen.get(item)
+            if parsed is None:
+                if len(seen) >= PARSE_MANY_MEMO_SIZE:
+                    seen.clear()
+                parsed = seen[item] = _parse_or_fallback(item)
+            items.append(dict(parsed))
+        results.append(items)
+    return results
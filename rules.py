@@ -0,0 +1,262 @@
+"""
+Declarative prescription rules.
+
+Rules live in data/rules.json. Each rule has a status ("warning" or "rejected"), a
+message and a "when" clause whose conditions must all hold:
+
+    drug, drug_class, not_drug_class      medication names / classes (any of)
+    diagnosis, allergy, condition         terms found in the diagnosis or patient info
+    age_below, age_at_least               patient age bounds
+    min_doses_per_day                     parsed from the frequency text
+    allergic_to_drug                      an allergy names the drug or any class above it
+    cross_reactive_allergy                an allergy cross-reacts with the drug's class
+    unknown_drug                          the medication names no drug in the hierarchy
+    corrected_drug                        the name only matched after snapping to the lexicon
+
+At load time each rule is indexed under its most selective trigger (a drug, a class,
+a diagnosis term or a patient attribute), so a prescription only evaluates the rules
+whose trigger it actually contains and the cost stays flat as the rule set grows.
+Drug classes come from the ATC hierarchy (drug_hierarchy.py). resolve_medication turns
+a medication name into drugs once for rules, interactions and dose checks alike: names
+are canonicalized through the hierarchy's synonyms, and a name it doesn't know at all is
+snapped to the closest entry of the drug lexicon (drug_lexicon.py) before being reported
+as unknown.
+"""
+import json
+import os
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from drug_hierarchy import DrugHierarchy, get_drug_hierarchy
+from drug_lexicon import get_lexicon, normalize
+from prescription_parser import parse_item
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+RULES_FILE = os.path.join(DATA_DIR, "rules.json")
+MAX_TERM_WORDS = 3  # longest multi-word term ("piperacillin tazobactam", "peptic ulcer")
+TERMS_CACHE_SIZE = 65536  # medication, allergy and diagnosis strings repeat constantly
+
+CONDITIONS = {"drug", "drug_class", "not_drug_class", "diagnosis", "allergy", "condition",
+              "age_below", "age_at_least", "min_doses_per_day", "allergic_to_drug", "cross_reactive_allergy",
+              "unknown_drug", "corrected_drug"}
+STATUSES = {"warning", "rejected"}
+
+
+@lru_cache(maxsize=TERMS_CACHE_SIZE)
+def terms(text: str) -> FrozenSet[str]:
+    """All 1..MAX_TERM_WORDS word phrases of the normalized text."""
+    words = normalize(text or "").split()
+    return frozenset(" ".join(words[i:i + n]) for n in range(1, MAX_TERM_WORDS + 1) for i in range(len(words) - n + 1))
+
+
+class Medication(NamedTuple):
+    drugs: FrozenSet[str]  # every phrase of the name, drug names in their canonical form
+    closure: int  # hierarchy closure of the drugs named; 0 if none is known
+    corrected: Optional[str]  # lexicon name the text was snapped to, when it had to be
+
+    @property
+    def unknown(self) -> bool:
+        return bool(self.drugs) and not self.closure
+
+
+@lru_cache(maxsize=TERMS_CACHE_SIZE)
+def resolve_medication(medication: str, hierarchy: DrugHierarchy) -> Medication:
+    """The drugs a medication name refers to, as every check should see them."""
+    found = terms(medication)
+    closure = hierarchy.closure(found)
+    corrected = None
+    if not closure and found:
+        # Misspelled or OCR-mangled ("Amoxicilin"): try the closest lexicon name
+        match = get_lexicon().match_name(medication)
+        if match and hierarchy.closure(terms(match)):
+            found, corrected = terms(match), match
+            closure = hierarchy.closure(found)
+    return Medication(frozenset(hierarchy.canonical(t) or t for t in found), closure, corrected)
+
+
+def _parse_age(age) -> Optional[float]:
+    try:
+        return float(str(age).strip())
+    except ValueError:
+        return None
+
+
+class Rule:
+    def __init__(self, spec: Dict):
+        self.id = spec["id"]
+        self.status = spec["status"]
+        self.message = spec["message"]
+        when = spec.get("when", {})
+        unknown = set(when) - CONDITIONS
+        if unknown or self.status not in STATUSES:
+            raise ValueError(f"Rule {self.id}: unknown condition(s) {sorted(unknown)} or status {self.status!r}")
+
+        self.drugs = {normalize(d) for d in when.get("drug", [])}
+        self.classes = {normalize(c) for c in when.get("drug_class", [])}
+        self.not_classes = {normalize(c) for c in when.get("not_drug_class", [])}
+        self.diagnosis = {normalize(t) for t in when.get("diagnosis", [])}
+        self.allergy = {normalize(t) for t in when.get("allergy", [])}
+        self.condition = {normalize(t) for t in when.get("condition", [])}
+        self.age_below = when.get("age_below")
+        self.age_at_least = when.get("age_at_least")
+        self.min_doses_per_day = when.get("min_doses_per_day")
+        self.allergic_to_drug = when.get("allergic_to_drug", False)
+        self.cross_reactive_allergy = when.get("cross_reactive_allergy", False)
+        self.unknown_drug = when.get("unknown_drug", False)
+        self.corrected_drug = when.get("corrected_drug", False)
+
+    def index_keys(self) -> List[Tuple[str, str]]:
+        """The keys this rule is filed under: its most selective condition."""
+        for kind, values in (("drug", self.drugs), ("class", self.classes), ("diagnosis", self.diagnosis),
+                             ("allergy", self.allergy), ("condition", self.condition)):
+            if values:
+                return [(kind, v) for v in values]
+        if self.allergic_to_drug or self.cross_reactive_allergy:
+            return [("patient", "allergies")]
+        if self.unknown_drug:
+            return [("item", "unknown")]
+        if self.corrected_drug:
+            return [("item", "corrected")]
+        if self.age_below is not None or self.age_at_least is not None:
+            return [("patient", "age")]
+        return [("any", "")]
+
+    def evaluate(self, item: "ItemFacts", patient: "PatientFacts") -> Optional[str]:
+        """The rule's message if every condition holds, else None."""
+        if self.drugs and not self.drugs & item.drugs:
+            return None
+        if self.classes and not self.classes & item.classes:
+            return None
+        if self.not_classes & item.classes:
+            return None
+        if self.diagnosis and not self.diagnosis & patient.diagnosis:
+            return None
+        if self.allergy and not self.allergy & patient.allergies:
+            return None
+        if self.condition and not self.condition & patient.conditions:
+            return None
+        if self.age_below is not None and (patient.age is None or patient.age >= self.age_below):
+            return None
+        if self.age_at_least is not None and (patient.age is None or patient.age < self.age_at_least):
+            return None
+        if self.unknown_drug and not item.unknown:
+            return None
+        if self.corrected_drug and item.corrected is None:
+            return None
+        if self.min_doses_per_day is not None:
+            doses = item.doses_per_day()
+            if doses is None or doses < self.min_doses_per_day:
+                return None
+        allergen = ""
+        if self.allergic_to_drug:
+            allergen = patient.allergen(item.closure)
+            if allergen is None:
+                return None
+        if self.cross_reactive_allergy:
+            allergen = patient.cross_reactive_allergen(item.closure)
+            if allergen is None:
+                return None
+        return self.message.format(allergen=allergen, medication=item.medication, drug=item.corrected or "")
+
+
+class PatientFacts:
+    """Diagnosis and patient terms, extracted once per validation call."""
+
+    def __init__(self, patient_info: Dict, diagnosis: str, hierarchy: DrugHierarchy):
+        self.diagnosis = terms(diagnosis)
+        self.allergies = terms(patient_info.get("allergies", ""))
+        self.conditions = terms(patient_info.get("conditions", ""))
+        self.age = _parse_age(patient_info.get("age", ""))
+        self.hierarchy = hierarchy
+        self.allergy_bits = hierarchy.mask(self.allergies)
+        self.cross_reactions = hierarchy.cross_reactions(self.allergy_bits)
+
+        self.keys = [("diagnosis", t) for t in self.diagnosis]
+        self.keys += [("allergy", t) for t in self.allergies]
+        self.keys += [("condition", t) for t in self.conditions]
+        if self.allergies:
+            self.keys.append(("patient", "allergies"))
+        if self.age is not None:
+            self.keys.append(("patient", "age"))
+
+    def allergen(self, closure: int) -> Optional[str]:
+        """The allergy (drug or class) a drug with this closure falls under, or None."""
+        hit = closure & self.allergy_bits
+        return self.hierarchy.label(hit) if hit else None
+
+    def cross_reactive_allergen(self, closure: int) -> Optional[str]:
+        """The allergy class a drug cross-reacts with, or None (direct allergies excluded)."""
+        if closure & self.allergy_bits:
+            return None
+        for target, source_label in self.cross_reactions:
+            if closure & target:
+                return source_label
+        return None
+
+
+class ItemFacts:
+    """Drug names and classes found in one prescription item."""
+
+    def __init__(self, prescription: Dict, hierarchy: DrugHierarchy):
+        self.medication = prescription.get("medication", "")
+        self.frequency = prescription.get("frequency", "")
+        resolved = resolve_medication(self.medication, hierarchy)
+        self.drugs = resolved.drugs
+        self.closure = resolved.closure
+        self.corrected = resolved.corrected
+        self.unknown = resolved.unknown
+        self.classes = {c for d in self.drugs for c in hierarchy.classes_of(d)}
+        self.keys = [("drug", d) for d in self.drugs] + [("class", c) for c in self.classes]
+        if self.unknown:
+            self.keys.append(("item", "unknown"))
+        if self.corrected is not None:
+            self.keys.append(("item", "corrected"))
+
+    def doses_per_day(self) -> Optional[float]:
+        return parse_item(self.frequency)["doses_per_day"] if self.frequency else None
+
+
+class RuleEngine:
+    def __init__(self, rules: List[Rule], hierarchy: DrugHierarchy, version=None):
+        self.rules = rules
+        self.version = version
+        self.hierarchy = hierarchy
+        self._index: Dict[Tuple[str, str], List[int]] = {}
+        for i, rule in enumerate(rules):
+            for key in rule.index_keys():
+                self._index.setdefault(key, []).append(i)
+        self._always = self._index.get(("any", ""), [])
+
+    @classmethod
+    def from_files(cls, rules_path: str = RULES_FILE, hierarchy: DrugHierarchy = None) -> "RuleEngine":
+        with open(rules_path, encoding="utf-8") as f:
+            spec = json.load(f)
+        return cls([Rule(r) for r in spec["rules"]], hierarchy or get_drug_hierarchy(), spec.get("version"))
+
+    def patient_facts(self, patient_info: Dict, diagnosis: str) -> PatientFacts:
+        return PatientFacts(patient_info, diagnosis, self.hierarchy)
+
+    def check(self, prescription: Dict, patient: PatientFacts) -> List[Tuple[str, str]]:
+        """(status, message) for every rule that fires on this prescription, in file order."""
+        item = ItemFacts(prescription, self.hierarchy)
+        candidates = set(self._always)
+        for key in patient.keys + item.keys:
+            candidates.update(self._index.get(key, ()))
+
+        fired = []
+        for i in sorted(candidates):
+            message = self.rules[i].evaluate(item, patient)
+            if message is not None:
+                fired.append((self.rules[i].status, message))
+        return fired
+
+
+_engine = None
+
+
+def get_rule_engine() -> RuleEngine:
+    """Process-wide rule engine loaded from RULES_FILE on first use."""
+    global _engine
+    if _engine is None:
+        _engine = RuleEngine.from_files()
+    return _engine
@@ -0,0 +1,182 @@
+"""
+Bounded store for per-session app state.
+
+Between reruns a session's consultation state (transcript, symptoms, prescription form,
+validation result) lives here rather than in st.session_state, as zlib-compressed JSON.
+Each session is capped at SESSION_MAX_MESSAGES messages and SESSION_MAX_BYTES of JSON:
+the oldest messages go first, then disposable results that can be recomputed. The
+memory tier is an LRU bounded by SESSION_MEMORY_BYTES in total; with SESSION_DB set,
+sessions pushed out of memory spill to SQLite and are read back on their next rerun,
+otherwise they are dropped. Sessions idle for SESSION_TTL seconds are evicted from both
+tiers, so memory per replica stays flat however many users come and go.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional
+
+SESSION_DB = os.environ.get("SESSION_DB")  # unset = memory only
+SESSION_TTL = float(os.environ.get("SESSION_TTL", 30 * 60))  # seconds idle before eviction
+SESSION_MEMORY_BYTES = 64 * 1024 * 1024
+SESSION_MAX_MESSAGES = 200
+SESSION_MAX_BYTES = 256 * 1024
+TRANSCRIPT_KEY = "messages"
+DISPOSABLE_KEYS = ("validation_result", "ocr")  # dropped, in order, if a session is still over the cap
+EVICT_INTERVAL = 60  # seconds between sweeps for idle sessions
+
+
+def encode(state: Dict, max_messages: int = SESSION_MAX_MESSAGES, max_bytes: int = SESSION_MAX_BYTES) -> bytes:
+    """Compressed JSON for a session's state, trimmed to the per-session caps."""
+    state = dict(state)
+    if TRANSCRIPT_KEY in state:
+        state[TRANSCRIPT_KEY] = state[TRANSCRIPT_KEY][-max_messages:]
+    if "answers" in state:
+        state["answers"] = list(state["answers"].items())  # JSON objects only have string keys
+    data = json.dumps(state, separators=(",", ":")).encode()
+    while len(data) > max_bytes and len(state.get(TRANSCRIPT_KEY, ())) > 1:
+        state[TRANSCRIPT_KEY] = state[TRANSCRIPT_KEY][len(state[TRANSCRIPT_KEY]) // 2:]
+        data = json.dumps(state, separators=(",", ":")).encode()
+    for key in DISPOSABLE_KEYS:
+        if len(data) <= max_bytes:
+            break
+        if state.pop(key, None) is not None:
+            data = json.dumps(state, separators=(",", ":")).encode()
+    return zlib.compress(data)
+
+
+def decode(blob: bytes) -> Dict:
+    state = json.loads(zlib.decompress(blob))
+    if TRANSCRIPT_KEY in state:
+        state[TRANSCRIPT_KEY] = [tuple(m) for m in state[TRANSCRIPT_KEY]]
+    if "answers" in state:
+        state["answers"] = dict((int(s), yes) for s, yes in state["answers"])
+    return state
+
+
+class SessionStore:
+    def __init__(self, path: Optional[str] = SESSION_DB, ttl: float = SESSION_TTL,
+                 max_memory_bytes: int = SESSION_MEMORY_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_bytes = max_memory_bytes
+        self._entries = OrderedDict()  # session id -> (blob, last seen)
+        self._size = 0
+        self._last_sweep = time.time()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, state BLOB, last_seen REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        """The session's saved state, or None if it's new or was evicted."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and now - entry[1] > self.ttl:
+                self._forget(session_id)
+                entry = None
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT state, last_seen FROM sessions WHERE id = ?", (session_id,)).fetchone()
+                if row is not None and now - row[1] <= self.ttl:
+                    entry = row
+                    self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                    self._remember(session_id, row[0], row[1])
+            if entry is not None:
+                self._entries.move_to_end(session_id)
+        return decode(entry[0]) if entry is not None else None
+
+    def put(self, session_id: str, state: Dict):
+        blob = encode(state)
+        with self._lock:
+            self._remember(session_id, blob, time.time())
+            if time.time() - self._last_sweep > EVICT_INTERVAL:
+                self._evict_idle()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._forget(session_id)
+
+    def evict_idle(self) -> int:
+        """Drop every session idle for longer than the TTL; returns how many left memory."""
+        with self._lock:
+            return self._evict_idle()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            spilled = self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] if self._db else 0
+            return {"sessions_in_memory": len(self._entries), "memory_bytes": self._size, "spilled": spilled}
+
+    def _remember(self, session_id: str, blob: bytes, last_seen: float):
+        # Called with the lock held
+        if session_id in self._entries:
+            self._size -= len(self._entries.pop(session_id)[0])
+        self._entries[session_id] = (blob, last_seen)
+        self._size += len(blob)
+        while self._size > self.max_memory_bytes and len(self._entries) > 1:
+            oldest, (old_blob, old_seen) = self._entries.popitem(last=False)
+            self._size -= len(old_blob)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (oldest, old_blob, old_seen))
+
+    def _forget(self, session_id: str):
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+        if self._db is not None:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def _evict_idle(self) -> int:
+        cutoff = time.time() - self.ttl
+        idle = [sid for sid, (_, seen) in self._entries.items() if seen < cutoff]
+        for sid in idle:
+            self._size -= len(self._entries.pop(sid)[0])
+        if self._db is not None:
+            self._db.execute("DELETE FROM sessions WHERE last_seen < ?", (cutoff,))
+        self._last_sweep = time.time()
+        return len(idle)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Process-wide store, configured from SESSION_DB and SESSION_TTL."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore()
+    return _store
+
+
+# Example quick test
+if __name__ == "__main__":
+    import random
+    import tempfile
+
+    rng = random.Random(0)
+    path = os.path.join(tempfile.mkdtemp(), "sessions.db")
+    store = SessionStore(path, ttl=3600, max_memory_bytes=1024 * 1024)
+    sentences = ["I have had a fever and a cough for three days", "Do you have a sore throat?", "yes, since Monday",
+                 "Based on your symptoms, here's my assessment: **Likely Condition:** Influenza"]
+    start = time.perf_counter()
+    for i in range(5000):
+        messages = [("bot" if j % 2 else "user", rng.choice(sentences), 1_700_000_000 + j)
+                    for j in range(rng.randint(5, 400))]
+        store.put(f"session-{i}", {"messages": messages, "answers": {3: True, 7: False}, "diagnosis_stage": "followup"})
+    elapsed = time.perf_counter() - start
+    print(f"5000 sessions in {elapsed:.2f}s ({elapsed / 5000 * 1e3:.2f} ms per save):", store.stats())
+    start = time.perf_counter()
+    state = store.get("session-0")  # long since spilled to SQLite
+    print(f"Spilled session read back in {(time.perf_counter() - start) * 1e3:.2f} ms:",
+          len(state["messages"]), "messages, answers", state["answers"])
+    store.ttl = 0
+    time.sleep(0.01)
+    print("Evicted", store.evict_idle(), "idle sessions:", store.stats())
@@ -0,0 +1,121 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import torch
+import torch.nn as nn
+from torchvision import models, transforms
+
+from skin_classifier.skin_classifier_model import BEST_MODEL_PATH, CATEGORIES, DEVICE, NUM_CLASSES
+
+FEATURE_DIM = 2048
+# ImageFolder orders class folders alphabetically, so the trained head does too
+CLASS_NAMES = sorted(CATEGORIES)
+
+# Same preprocessing as the classifier's validation/test transforms
+preprocess = transforms.Compose([
+    transforms.Resize((224, 224)),
+    transforms.ToTensor(),
+    transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+])
+
+
+class SharedFeatureExtractor:
+    """
+    Single ResNet-50 backbone shared by every image head.
+    The 7-class linear head from best_skin_model.pth is split off the backbone so the
+    pooled 2048-d features can also feed the MultimodalClassifier without a second pass.
+    """
+
+    def __init__(self, weights_path=BEST_MODEL_PATH, device=DEVICE, cache_size=64):
+        self.device = device
+        backbone = models.resnet50(weights=None)
+        backbone.fc = nn.Linear(backbone.fc.in_features, NUM_CLASSES)
+        self.weights_path = weights_path
+        # Without trained weights the backbone still gives usable ImageNet features for the
+        # multimodal head, but the 7-class head is random and must not be reported
+        self.skin_head_trained = os.path.exists(weights_path)
+        if self.skin_head_trained:
+            backbone.load_state_dict(torch.load(weights_path, map_location=device))
+        else:
+            print(f"⚠️ {weights_path} not found (set SKIN_MODEL_PATH); using ImageNet features, "
+                  f"skin classifier unavailable.")
+            pretrained = models.resnet50(weights=models.ResNet50_Weights.IMAGENET1K_V1)
+            pretrained.fc = backbone.fc
+            backbone = pretrained
+
+        self.skin_head = backbone.fc.to(device).eval()
+        backbone.fc = nn.Identity()
+        self.backbone = backbone.to(device).eval()
+        for p in list(self.backbone.parameters()) + list(self.skin_head.parameters()):
+            p.requires_grad_(False)
+
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    @torch.no_grad()
+    def encode(self, img_tensors):
+        """Backbone features for an already preprocessed (N, 3, 224, 224) batch."""
+        return self.backbone(img_tensors.to(self.device))
+
+    def features(self, images):
+        """
+        Backbone features for a list of PIL images, shape (N, 2048).
+        Features are cached by image content, so the same photo is only run
+        through the backbone once no matter how many heads consume it.
+        """
+        keys = [_image_key(img) for img in images]
+        found = {}
+        for k in keys:
+            if k in self._cache:
+                self._cache.move_to_end(k)
+                found[k] = self._cache[k]
+
+        missing = [i for i, k in enumerate(keys) if k not in found]
+        if missing:
+            batch = torch.stack([preprocess(images[i].convert("RGB")) for i in missing])
+            feats = self.encode(batch)
+            for i, f in zip(missing, feats):
+                found[keys[i]] = f
+                self._remember(keys[i], f)
+
+        return torch.stack([found[k] for k in keys])
+
+    def require_skin_head(self):
+        """Raise if the 7-class head has no trained weights, rather than report noise."""
+        if not self.skin_head_trained:
+            raise RuntimeError(f"Skin classifier weights not found at {self.weights_path}; set SKIN_MODEL_PATH")
+
+    @torch.no_grad()
+    def skin_probabilities(self, features):
+        """Softmax over CLASS_NAMES from the standalone classifier's linear head."""
+        self.require_skin_head()
+        return torch.softmax(self.skin_head(features.to(self.device)), dim=1)
+
+    def classify(self, image):
+        """Top-1 prediction of the standalone 7-class skin classifier."""
+        probs = self.skin_probabilities(self.features([image]))[0]
+        top_idx = torch.argmax(probs).item()
+        return CLASS_NAMES[top_idx], probs[top_idx].item()
+
+    def _remember(self, key, feature):
+        self._cache[key] = feature
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+def _image_key(image):
+    h = hashlib.sha1(image.tobytes())
+    h.update(f"{image.mode}{image.size}".encode())
+    return h.hexdigest()
+
+
+_extractor = None
+
+
+def get_feature_extractor():
+    """Process-wide extractor, loaded on first use."""
+    global _extractor
+    if _extractor is None:
+        _extractor = SharedFeatureExtractor()
+    return _extractor
@@ -0,0 +1,114 @@
+"""
+Batched (and optionally tiled) inference with best_skin_model.pth.
+
+Usage (from the repo root):
+    python -m skin_classifier.inference lesion1.jpg lesion2.jpg --tile
+    python -m skin_classifier.inference --benchmark --tile
+"""
+import argparse
+import time
+
+import torch
+from PIL import Image
+
+from skin_classifier.feature_extractor import CLASS_NAMES, get_feature_extractor, preprocess
+
+TILE_SIZE = 448      # crop size in source pixels; each crop is resized to 224x224
+TILE_OVERLAP = 0.25
+MAX_BATCH = 32       # views per backbone call
+
+
+def tile_boxes(width, height, tile_size=TILE_SIZE, overlap=TILE_OVERLAP):
+    """Overlapping (left, top, right, bottom) crops covering the whole image."""
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size + 1, stride))
+        if positions[-1] != length - tile_size:
+            positions.append(length - tile_size)
+        return positions
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def _views(image, tile, tile_size, overlap):
+    # The whole image is always one view; large images add their tiles
+    views = [image]
+    if tile and max(image.size) > tile_size:
+        views.extend(image.crop(box) for box in tile_boxes(*image.size, tile_size, overlap))
+    return views
+
+
+def predict(images, tile=False, tile_size=TILE_SIZE, overlap=TILE_OVERLAP, batch_size=MAX_BATCH):
+    """
+    Per-class probabilities for a batch of images (PIL images or file paths).
+    With tile=True, images larger than tile_size are also evaluated as overlapping
+    crops; all views of all images go through the backbone together and each
+    image's logits are averaged over its views.
+    Returns: list of {class_name: probability}
+    """
+    if not images:
+        return []
+    extractor = get_feature_extractor()
+    extractor.require_skin_head()
+    images = [Image.open(img).convert("RGB") if isinstance(img, str) else img.convert("RGB") for img in images]
+
+    tensors, owners = [], []
+    for i, image in enumerate(images):
+        for view in _views(image, tile, tile_size, overlap):
+            tensors.append(preprocess(view))
+            owners.append(i)
+
+    logits = []
+    with torch.no_grad():
+        for start in range(0, len(tensors), batch_size):
+            batch = torch.stack(tensors[start:start + batch_size])
+            logits.append(extractor.skin_head(extractor.encode(batch)).cpu())
+    logits = torch.cat(logits)
+
+    owners = torch.tensor(owners)
+    summed = torch.zeros(len(images), logits.shape[1]).index_add_(0, owners, logits)
+    counts = torch.bincount(owners, minlength=len(images)).unsqueeze(1)
+    probs = torch.softmax(summed / counts, dim=1)
+
+    return [dict(zip(CLASS_NAMES, row.tolist())) for row in probs]
+
+
+def benchmark(n_images=32, size=(1024, 768), tile=False, repeats=3):
+    """Measure predict() throughput in images/sec on synthetic images."""
+    extractor = get_feature_extractor()
+    images = [Image.effect_noise(size, 64).convert("RGB") for _ in range(n_images)]
+    predict(images[:2], tile=tile)  # warm-up
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(images, tile=tile)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    views = len(_views(images[0], tile, TILE_SIZE, TILE_OVERLAP))
+    print(f"[INFO] {n_images} images {size[0]}x{size[1]} on {extractor.device} "
+          f"(threads={torch.get_num_threads()}, tile={tile}, {views} view(s)/image): "
+          f"{n_images / best:.2f} images/sec, {best / n_images * 1000:.1f} ms/image")
+    return n_images / best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Skin lesion classification with best_skin_model.pth")
+    parser.add_argument("images", nargs="*")
+    parser.add_argument("--tile", action="store_true", help="also evaluate overlapping crops of large images")
+    parser.add_argument("--benchmark", action="store_true", help="measure throughput on synthetic images")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(tile=args.tile)
+    for path, probs in zip(args.images, predict(args.images, tile=args.tile) if args.images else []):
+        top = max(probs, key=probs.get)
+        print(f"{path}: {top} ({probs[top]:.2f})")
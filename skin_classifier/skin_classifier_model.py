@@ -25,7 +25,9 @@ METADATA_FILE = "/Users/sriram/Downloads/archive/HAM10000_metadata.csv"
 SUBSET_DIR = "/Users/sriram/Medi/skin_classifier/subset_images"
 SUBSET_META_FILE = "/Users/sriram/Medi/skin_classifier/subset_metadata.csv"
 BALANCED_DIR = "/Users/sriram/Medi/skin_classifier/balanced_skin_data"
-BEST_MODEL_PATH = "/Users/sriram/Medi/skin_classifier/best_skin_model.pth"
+# Trained weights: written by training, read by inference; SKIN_MODEL_PATH overrides
+BEST_MODEL_PATH = os.environ.get(
+    "SKIN_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "best_skin_model.pth"))
 
 CATEGORIES = [
     "Actinic Keratoses",
@@ -131,43 +133,45 @@ def create_balanced_dataset(subset_dir, balanced_dir, categories, images_per_cla
 # -----------------------------
 # STEP 3: DATALOADERS
 # -----------------------------
-def get_dataloaders(data_dir, batch_size):
-    # Training transforms with aggressive augmentation
-    train_tfms = transforms.Compose([
+def get_train_transforms(aug_strength=1.0):
+    # Training transforms with aggressive augmentation.
+    # aug_strength scales every augmentation magnitude (1.0 = defaults, 0.0 = none)
+    s = aug_strength
+    return transforms.Compose([
         transforms.Resize((256, 256)),
-        transforms.RandomResizedCrop(224, scale=(0.8, 1.0)),
+        transforms.RandomResizedCrop(224, scale=(max(1.0 - 0.2 * s, 0.1), 1.0)),
         transforms.RandomHorizontalFlip(),
         transforms.RandomVerticalFlip(),
-        transforms.RandomRotation(15),
+        transforms.RandomRotation(15 * s),
         transforms.RandomAffine(
-            degrees=15,
-            scale=(0.9, 1.1),
-            translate=(0.1, 0.1)
+            degrees=15 * s,
+            scale=(max(1.0 - 0.1 * s, 0.1), 1.0 + 0.1 * s),
+            translate=(0.1 * s, 0.1 * s)
         ),
-        transforms.RandomPerspective(distortion_scale=0.2, p=0.5),
+        transforms.RandomPerspective(distortion_scale=0.2 * s, p=0.5),
         transforms.ColorJitter(
-            brightness=0.2,
-            contrast=0.2,
-            saturation=0.2,
-            hue=0.1
+            brightness=0.2 * s,
+            contrast=0.2 * s,
+            saturation=0.2 * s,
+            hue=min(0.1 * s, 0.5)
         ),
         transforms.ToTensor(),
         transforms.Normalize([0.485,0.456,0.406],[0.229,0.224,0.225]),
-        transforms.RandomErasing(p=0.3, scale=(0.02, 0.1), ratio=(0.3, 3.3))
+        transforms.RandomErasing(p=min(0.3 * s, 1.0), scale=(0.02, 0.1), ratio=(0.3, 3.3))
     ])
-    
+
+def get_eval_transforms():
     # Standard transforms for validation and testing (no augmentation)
-    test_val_tfms = transforms.Compose([
+    return transforms.Compose([
         transforms.Resize((224, 224)),
         transforms.ToTensor(),
         transforms.Normalize([0.485,0.456,0.406],[0.229,0.224,0.225]),
     ])
-    
-    train_dataset = datasets.ImageFolder(data_dir, transform=train_tfms)
-    test_val_dataset = datasets.ImageFolder(data_dir, transform=test_val_tfms)
-    
-    targets = np.array(train_dataset.targets)
-    indices = np.arange(len(train_dataset))
+
+def split_indices(targets):
+    # Stratified train/val/test split by class
+    targets = np.array(targets)
+    indices = np.arange(len(targets))
     
     class_indices = defaultdict(list)
     for i, target in enumerate(targets):
@@ -185,6 +189,14 @@ def get_dataloaders(data_dir, batch_size):
         val_indices.extend(class_indices[cls][train_count:train_count + val_count])
         test_indices.extend(class_indices[cls][train_count + val_count:])
     
+    return train_indices, val_indices, test_indices
+
+def get_dataloaders(data_dir, batch_size, aug_strength=1.0):
+    train_dataset = datasets.ImageFolder(data_dir, transform=get_train_transforms(aug_strength))
+    test_val_dataset = datasets.ImageFolder(data_dir, transform=get_eval_transforms())
+    
+    train_indices, val_indices, test_indices = split_indices(train_dataset.targets)
+    
     train_subset = Subset(train_dataset, train_indices)
     val_subset = Subset(test_val_dataset, val_indices)
     test_subset = Subset(test_val_dataset, test_indices)
@@ -206,40 +218,44 @@ def get_model(num_classes):
 # -----------------------------
 # STEP 5: TRAIN
 # -----------------------------
+def train_one_epoch(model, train_loader, criterion, optimizer):
+    model.train()
+    running_loss, correct, total = 0.0, 0, 0
+    for imgs, labels in train_loader:
+        imgs, labels = imgs.to(DEVICE), labels.to(DEVICE)
+        optimizer.zero_grad()
+        outputs = model(imgs)
+        loss = criterion(outputs, labels)
+        loss.backward()
+        optimizer.step()
+        running_loss += loss.item()
+        _, preds = torch.max(outputs, 1)
+        correct += (preds == labels).sum().item()
+        total += labels.size(0)
+    return running_loss / len(train_loader), correct / total
+
+def evaluate(model, val_loader):
+    model.eval()
+    val_correct, val_total = 0, 0
+    with torch.no_grad():
+        for imgs, labels in val_loader:
+            imgs, labels = imgs.to(DEVICE), labels.to(DEVICE)
+            outputs = model(imgs)
+            _, preds = torch.max(outputs, 1)
+            val_correct += (preds == labels).sum().item()
+            val_total += labels.size(0)
+    return val_correct / val_total
+
 def train_model(model, train_loader, val_loader, epochs, lr, best_model_path):
     criterion = nn.CrossEntropyLoss()
     optimizer = optim.Adam(model.parameters(), lr=lr)
     best_acc = 0.0
     
     for epoch in range(epochs):
-        model.train()
-        running_loss, correct, total = 0.0, 0, 0
-        for imgs, labels in train_loader:
-            imgs, labels = imgs.to(DEVICE), labels.to(DEVICE)
-            optimizer.zero_grad()
-            outputs = model(imgs)
-            loss = criterion(outputs, labels)
-            loss.backward()
-            optimizer.step()
-            running_loss += loss.item()
-            _, preds = torch.max(outputs, 1)
-            correct += (preds == labels).sum().item()
-            total += labels.size(0)
-        
-        train_acc = correct / total
-        avg_loss = running_loss / len(train_loader)
+        avg_loss, train_acc = train_one_epoch(model, train_loader, criterion, optimizer)
         
         # Validation
-        model.eval()
-        val_correct, val_total = 0, 0
-        with torch.no_grad():
-            for imgs, labels in val_loader:
-                imgs, labels = imgs.to(DEVICE), labels.to(DEVICE)
-                outputs = model(imgs)
-                _, preds = torch.max(outputs, 1)
-                val_correct += (preds == labels).sum().item()
-                val_total += labels.size(0)
-        val_acc = val_correct / val_total
+        val_acc = evaluate(model, val_loader)
         
         print(f"Epoch [{epoch+1}/{epochs}] | Loss: {avg_loss:.4f} | Train Acc: {train_acc:.3f} | Val Acc: {val_acc:.3f}")
         
@@ -0,0 +1,277 @@
+"""
+Hyperparameter sweep for the skin classifier.
+
+The balanced dataset is decoded and resized once into a memory-mapped cache that all
+trial processes share, trials run in a process pool, and underperforming trials are
+dropped with successive halving.
+
+Usage (from the repo root):
+    python -m skin_classifier.sweep --trials 27 --workers 4 --max-epochs 9 --eta 3
+"""
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from PIL import Image
+from torch.utils.data import DataLoader, Dataset
+from torchvision import datasets
+
+from skin_classifier.skin_classifier_model import (
+    BALANCED_DIR, BATCH_SIZE, EPOCHS, LR, NUM_CLASSES,
+    evaluate, get_eval_transforms, get_model, get_train_transforms, split_indices, train_one_epoch,
+)
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+SWEEP_DIR = os.environ.get("SKIN_SWEEP_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sweep"))
+CACHE_IMAGE_SIZE = 256  # matches the Resize((256, 256)) at the start of the train transforms
+
+SEARCH_SPACE = {
+    "lr": [3e-5, 1e-4, 3e-4, 1e-3],
+    "batch_size": [8, 16, 32],
+    "aug_strength": [0.0, 0.5, 1.0, 1.5],
+}
+
+# -----------------------------
+# STEP 1: SHARED PREPROCESSED CACHE
+# -----------------------------
+def build_cache(data_dir, cache_dir, size=CACHE_IMAGE_SIZE):
+    meta_path = os.path.join(cache_dir, "meta.json")
+    if os.path.exists(meta_path):
+        print(f"[INFO] Using existing preprocessed cache at {cache_dir}")
+        return cache_dir
+
+    os.makedirs(cache_dir, exist_ok=True)
+    folder = datasets.ImageFolder(data_dir)
+    images = np.lib.format.open_memmap(
+        os.path.join(cache_dir, "images.npy"), mode="w+", dtype=np.uint8,
+        shape=(len(folder.samples), size, size, 3)
+    )
+    for i, (path, _) in enumerate(folder.samples):
+        with Image.open(path) as img:
+            images[i] = np.asarray(img.convert("RGB").resize((size, size), Image.BILINEAR))
+    images.flush()
+    del images
+
+    np.save(os.path.join(cache_dir, "labels.npy"), np.array(folder.targets, dtype=np.int64))
+    # One split for the whole sweep so every trial is scored on the same validation images
+    train_idx, val_idx, test_idx = split_indices(folder.targets)
+    # meta.json is written last, so an interrupted build is redone on the next run
+    with open(meta_path, "w") as f:
+        json.dump({
+            "classes": folder.classes,
+            "train": [int(i) for i in train_idx],
+            "val": [int(i) for i in val_idx],
+            "test": [int(i) for i in test_idx],
+        }, f)
+
+    print(f"✅ Preprocessed cache created: {len(folder.samples)} images at {cache_dir}")
+    return cache_dir
+
+
+class CachedImageDataset(Dataset):
+    """Serves images from the memory-mapped cache; all trial processes share its pages."""
+
+    def __init__(self, cache_dir, indices, transform):
+        self.cache_dir = cache_dir
+        self.indices = indices
+        self.transform = transform
+        self.labels = np.load(os.path.join(cache_dir, "labels.npy"))
+        self._images = None
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, idx):
+        if self._images is None:
+            # Mapped lazily so the array is never pickled into worker processes
+            self._images = np.load(os.path.join(self.cache_dir, "images.npy"), mmap_mode="r")
+        i = self.indices[idx]
+        image = Image.fromarray(np.asarray(self._images[i]))
+        return self.transform(image), int(self.labels[i])
+
+# -----------------------------
+# STEP 2: TRIALS
+# -----------------------------
+def sample_configs(n_trials, seed=42):
+    # The first trial is always the current defaults so the sweep has a baseline
+    rng = random.Random(seed)
+    configs = [{"lr": LR, "batch_size": BATCH_SIZE, "aug_strength": 1.0}]
+    seen = {tuple(configs[0].values())}
+    max_unique = math.prod(len(v) for v in SEARCH_SPACE.values()) + 1
+    while len(configs) < min(n_trials, max_unique):
+        cfg = {k: rng.choice(v) for k, v in SEARCH_SPACE.items()}
+        if tuple(cfg.values()) not in seen:
+            seen.add(tuple(cfg.values()))
+            configs.append(cfg)
+    return configs
+
+
+def _apply_limits(limits):
+    torch.set_num_threads(limits["threads"])
+    if limits["mem_gb"]:
+        mem_bytes = int(limits["mem_gb"] * 1024 ** 3)
+        resource.setrlimit(resource.RLIMIT_AS, (mem_bytes, mem_bytes))
+
+
+def run_trial(trial_id, config, start_epoch, end_epoch, cache_dir, sweep_dir, limits):
+    """Train one trial from start_epoch to end_epoch, resuming from its checkpoint."""
+    # Each task gets a fresh worker process (max_tasks_per_child=1), so limits never leak
+    _apply_limits(limits)
+    started = time.time()
+    result = {"trial": trial_id, **config, "epochs": start_epoch, "val_acc": float("nan"), "status": "ok"}
+
+    try:
+        with open(os.path.join(cache_dir, "meta.json")) as f:
+            meta = json.load(f)
+        train_ds = CachedImageDataset(cache_dir, meta["train"], get_train_transforms(config["aug_strength"]))
+        val_ds = CachedImageDataset(cache_dir, meta["val"], get_eval_transforms())
+        train_loader = DataLoader(train_ds, batch_size=config["batch_size"], shuffle=True)
+        val_loader = DataLoader(val_ds, batch_size=64, shuffle=False)
+
+        model = get_model(NUM_CLASSES)
+        optimizer = optim.Adam(model.parameters(), lr=config["lr"])
+        criterion = nn.CrossEntropyLoss()
+
+        ckpt_path = os.path.join(sweep_dir, f"trial_{trial_id}.pth")
+        if start_epoch > 0:
+            ckpt = torch.load(ckpt_path, map_location="cpu")
+            model.load_state_dict(ckpt["model"])
+            optimizer.load_state_dict(ckpt["optimizer"])
+
+        for epoch in range(start_epoch, end_epoch):
+            if limits["timeout"] and time.time() - started > limits["timeout"]:
+                result["status"] = "timeout"
+                break
+            train_one_epoch(model, train_loader, criterion, optimizer)
+            result["epochs"] = epoch + 1
+
+        result["val_acc"] = evaluate(model, val_loader)
+        torch.save({"model": model.state_dict(), "optimizer": optimizer.state_dict()}, ckpt_path)
+    except MemoryError:
+        result["status"] = "oom"
+
+    result["seconds"] = time.time() - started
+    return result
+
+# -----------------------------
+# STEP 3: SUCCESSIVE HALVING
+# -----------------------------
+def successive_halving(configs, cache_dir, sweep_dir, workers, min_epochs, max_epochs, eta, limits):
+    alive = list(range(len(configs)))
+    results = {}
+    budget = min_epochs
+    rung = 0
+
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, max_tasks_per_child=1) as pool:
+        while alive:
+            budget = min(budget, max_epochs)
+            print(f"[INFO] Rung {rung}: {len(alive)} trial(s), training to {budget} epoch(s)")
+
+            futures = {}
+            for i in alive:
+                done = results[i]["epochs"] if i in results else 0
+                futures[pool.submit(run_trial, i, configs[i], done, budget, cache_dir, sweep_dir, limits)] = i
+
+            for fut in as_completed(futures):
+                i = futures[fut]
+                prev_seconds = results[i]["seconds"] if i in results else 0.0
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    res = {"trial": i, **configs[i], "epochs": results.get(i, {}).get("epochs", 0),
+                           "val_acc": float("nan"), "status": f"error: {e}", "seconds": 0.0}
+                res["seconds"] += prev_seconds
+                res["rung"] = rung
+                results[i] = res
+                print(f"Trial {i} | {configs[i]} | Epochs: {res['epochs']} | Val Acc: {res['val_acc']:.3f} | {res['status']}")
+
+            if budget >= max_epochs:
+                break
+
+            # Keep the top 1/eta of the trials that finished the rung
+            ranked = sorted((i for i in alive if results[i]["status"] == "ok"),
+                            key=lambda i: results[i]["val_acc"], reverse=True)
+            survivors = ranked[:max(1, len(alive) // eta)]
+            for i in set(alive) - set(survivors):
+                ckpt_path = os.path.join(sweep_dir, f"trial_{i}.pth")
+                if os.path.exists(ckpt_path):
+                    os.remove(ckpt_path)
+            alive = survivors
+            budget *= eta
+            rung += 1
+
+    return list(results.values())
+
+
+def results_table(results):
+    df = pd.DataFrame(results, columns=["trial", "lr", "batch_size", "aug_strength", "rung",
+                                        "epochs", "val_acc", "seconds", "status"])
+    return df.sort_values(["epochs", "val_acc"], ascending=False).reset_index(drop=True)
+
+# -----------------------------
+# MAIN
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter sweep for the skin classifier")
+    parser.add_argument("--data-dir", default=BALANCED_DIR)
+    parser.add_argument("--sweep-dir", default=SWEEP_DIR)
+    parser.add_argument("--trials", type=int, default=27)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 4))
+    parser.add_argument("--threads-per-trial", type=int, default=None,
+                        help="torch threads per trial (default: cpu_count // workers)")
+    parser.add_argument("--mem-gb", type=float, default=None, help="address-space limit per trial")
+    parser.add_argument("--trial-timeout", type=float, default=None,
+                        help="wall-clock minutes per trial per rung, checked between epochs")
+    parser.add_argument("--min-epochs", type=int, default=1)
+    parser.add_argument("--max-epochs", type=int, default=EPOCHS)
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data_dir):
+        print(f"[ERROR] Balanced dataset not found at {args.data_dir}. Run skin_classifier_model.py first.")
+        return
+
+    os.makedirs(args.sweep_dir, exist_ok=True)
+    cache_dir = build_cache(args.data_dir, os.path.join(args.sweep_dir, "cache"))
+    # Download the ImageNet weights once before the workers start
+    get_model(NUM_CLASSES)
+
+    limits = {
+        "threads": args.threads_per_trial or max(1, (os.cpu_count() or 1) // args.workers),
+        "mem_gb": args.mem_gb,
+        "timeout": args.trial_timeout * 60 if args.trial_timeout else None,
+    }
+    configs = sample_configs(args.trials, args.seed)
+
+    started = time.time()
+    results = successive_halving(configs, cache_dir, args.sweep_dir, args.workers,
+                                 args.min_epochs, args.max_epochs, args.eta, limits)
+    table = results_table(results)
+
+    print("\n[INFO] Sweep results:\n")
+    print(table.to_string(index=False))
+    table.to_csv(os.path.join(args.sweep_dir, "results.csv"), index=False)
+    best = table.iloc[0]
+    print(f"\n[INFO] Sweep finished in {(time.time() - started) / 60:.1f} min. "
+          f"Best: trial {best['trial']} (lr={best['lr']}, batch_size={best['batch_size']}, "
+          f"aug_strength={best['aug_strength']}) Val Acc: {best['val_acc']:.3f}, "
+          f"checkpoint {os.path.join(args.sweep_dir, 'trial_%d.pth' % best['trial'])}")
+
+
+if __name__ == "__main__":
+    main()
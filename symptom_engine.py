@@ -0,0 +1,254 @@
+"""
+Symptom-to-condition scoring for the diagnosis assistant.
+
+data/conditions.json lists symptoms (with aliases) and, per condition, a prevalence and
+the probability of each symptom given the condition; any symptom a condition doesn't list
+is taken to occur with background_rate. Free text is mapped to symptom ids with the same
+Aho-Corasick matcher the drug lexicon uses, splitting clauses and honouring negations
+("no fever"). Scoring is naive Bayes in log space: one sparse condition-by-symptom matrix
+holds the log-likelihood ratio of each symptom being present (first half of the columns)
+and absent (second half), so ranking every condition is a single sparse matrix-vector
+product plus the log priors. A temperature-scaled softmax turns the scores into
+probabilities; fit_temperature() calibrates it against labelled cases.
+
+Follow-up questions are chosen by expected information gain. Every symptom is a yes/no
+question; a dense condition-by-symptom array holds the probability of "yes" under each
+condition, and a second one the entropy of that answer. The gain of asking about a
+symptom is the mutual information between the answer and the condition,
+H(posterior @ likelihood) - posterior @ answer_entropy, so scoring every question is two
+matrix-vector products.
+"""
+import json
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from drug_lexicon import PhraseMatcher, normalize
+
+CONDITIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "conditions.json")
+TOP_K = 3
+NEGATIONS = {"no", "not", "without", "denies", "deny", "never", "nor", "neither", "don", "doesn", "didn",
+             "haven", "hasn", "isn", "aren", "none"}
+NEGATION_WINDOW = 4  # words before a symptom that a negation can reach
+CLAUSE_BREAKS = {"but", "however", "although", "though", "yet", "except", "and"}
+CONFIDENT_PROBABILITY = 0.8  # stop asking once the leading condition is this likely
+MAX_QUESTIONS = 6
+MIN_INFORMATION_GAIN = 0.02  # bits; below this no question is worth the patient's time
+YES = {"yes", "yeah", "yep", "yup", "y", "sure", "definitely", "correct", "i do", "i have", "i am", "a bit",
+       "a little", "sometimes"}
+NO = {"no", "nope", "nah", "n", "not really", "never", "i don t", "i haven t", "i m not", "none"}
+# Checked first: several open like a no ("i don t know", "no idea") but answer nothing
+UNSURE = {"i don t know", "don t know", "dont know", "i dunno", "dunno", "i m not sure", "not sure", "i m unsure",
+          "unsure", "no idea", "i have no idea", "maybe", "perhaps", "possibly", "i can t tell", "can t tell",
+          "i don t remember", "hard to say"}
+
+_CLAUSE = re.compile(r"[.;,!?\n]+")
+
+
+class SymptomEngine:
+    def __init__(self, symptoms: List[Dict], conditions: List[Dict], background_rate: float = 0.02,
+                 temperature: float = 1.0, version=None):
+        self.version = version
+        self.temperature = temperature
+        self.symptoms = [normalize(s["name"]) for s in symptoms]
+        self.questions = [s.get("question") or f"Do you have {s['name']}?" for s in symptoms]
+        ids = {name: i for i, name in enumerate(self.symptoms)}
+        phrases, self._phrase_symptom = [], []
+        for i, s in enumerate(symptoms):
+            for phrase in {normalize(p) for p in [s["name"]] + s.get("aliases", [])}:
+                phrases.append(phrase)
+                self._phrase_symptom.append(i)
+        self._matcher = PhraseMatcher(phrases)
+
+        self.conditions = conditions
+        n = len(self.symptoms)
+        rows, cols, values = [], [], []
+        self.likelihood = np.full((len(conditions), n), background_rate)
+        for c, condition in enumerate(conditions):
+            for name, p in condition["symptoms"].items():
+                s = ids[normalize(name)]
+                rows += [c, c]
+                cols += [s, n + s]
+                values += [np.log(p / background_rate), np.log((1 - p) / (1 - background_rate))]
+                self.likelihood[c, s] = p
+        # Columns [0, n) score a symptom being present, [n, 2n) it being denied
+        self.weights = sparse.csr_matrix((values, (rows, cols)), shape=(len(conditions), 2 * n))
+        prevalence = np.array([c.get("prevalence", 1.0) for c in conditions], dtype=np.float64)
+        self.log_prior = np.log(prevalence / prevalence.sum())
+        self.answer_entropy = _binary_entropy(self.likelihood)
+
+    @classmethod
+    def from_file(cls, path: str = CONDITIONS_FILE) -> "SymptomEngine":
+        with open(path, encoding="utf-8") as f:
+            spec = json.load(f)
+        return cls(spec["symptoms"], spec["conditions"], spec.get("background_rate", 0.02),
+                   spec.get("temperature", 1.0), spec.get("version"))
+
+    def extract(self, text: str) -> Tuple[List[int], List[int]]:
+        """(present, denied) symptom ids in free text; longest phrase wins where matches overlap."""
+        present, denied = set(), set()
+        for clause in _CLAUSE.split(text or ""):
+            clause = normalize(clause)
+            matches = sorted(self._matcher.find_all(clause), key=lambda m: (m[0], m[0] - m[1]))
+            end = 0
+            for start, stop, phrase in matches:
+                if start < end:
+                    continue
+                end = stop
+                symptom = self._phrase_symptom[phrase]
+                (denied if self._negated(clause[:start].split()) else present).add(symptom)
+        return sorted(present), sorted(denied - present)
+
+    @staticmethod
+    def _negated(before: List[str]) -> bool:
+        for word in reversed(before[-NEGATION_WINDOW:]):
+            if word in CLAUSE_BREAKS:
+                return False
+            if word in NEGATIONS:
+                return True
+        return False
+
+    def evidence(self, texts: Sequence[str], answers: Optional[Dict[int, bool]] = None) -> np.ndarray:
+        """
+        Evidence vector over the weight columns for everything the patient has said,
+        plus their yes/no answers to follow-up questions ({symptom id: answer}).
+        """
+        x = np.zeros(self.weights.shape[1])
+        present, denied = set(), set()
+        for text in texts:
+            p, d = self.extract(text)
+            present.update(p)
+            denied.update(d)
+        for s, yes in (answers or {}).items():
+            (present if yes else denied).add(s)
+        n = len(self.symptoms)
+        x[sorted(present)] = 1.0
+        x[[n + s for s in denied - present]] = 1.0
+        return x
+
+    def probabilities(self, x: np.ndarray) -> np.ndarray:
+        """Posterior over every condition for an evidence vector."""
+        scores = (self.log_prior + self.weights @ x) / self.temperature
+        scores -= scores.max()
+        p = np.exp(scores)
+        return p / p.sum()
+
+    def information_gain(self, p: np.ndarray) -> np.ndarray:
+        """Expected bits of information about the condition from asking about each symptom."""
+        return _binary_entropy(p @ self.likelihood) - p @ self.answer_entropy
+
+    def next_question(self, texts: Sequence[str], answers: Optional[Dict[int, bool]] = None) -> Optional[int]:
+        """
+        Symptom id to ask about next, or None when the assessment should be given: the
+        leading condition has reached CONFIDENT_PROBABILITY, MAX_QUESTIONS have been
+        answered, or no remaining question gains MIN_INFORMATION_GAIN.
+        """
+        answers = answers or {}
+        x = self.evidence(texts, answers)
+        p = self.probabilities(x)
+        if p.max() >= CONFIDENT_PROBABILITY or len(answers) >= MAX_QUESTIONS:
+            return None
+        gain = self.information_gain(p)
+        n = len(self.symptoms)
+        gain[(x[:n] + x[n:]) > 0] = -np.inf  # already reported, denied or answered
+        best = int(np.argmax(gain))
+        return best if gain[best] >= MIN_INFORMATION_GAIN else None
+
+    def rank(self, texts: Sequence[str], k: int = TOP_K, answers: Optional[Dict[int, bool]] = None) -> List[Dict]:
+        """
+        The k most probable conditions for the patient's statements and answers, each
+        with its probability and the reported symptoms that support it. Empty when no
+        known symptom is reported.
+        """
+        x = self.evidence(texts, answers)
+        n = len(self.symptoms)
+        if not x[:n].any():
+            return []
+        p = self.probabilities(x)
+        k = min(k, len(p))
+        top = np.argpartition(-p, k - 1)[:k]
+        top = top[np.argsort(-p[top])]
+        results = []
+        indptr, indices, data = self.weights.indptr, self.weights.indices, self.weights.data
+        for c in top:
+            row = slice(indptr[c], indptr[c + 1])
+            supporting = [self.symptoms[s] for s, w in zip(indices[row].tolist(), data[row].tolist())
+                          if s < n and x[s] and w > 0]
+            condition = self.conditions[c]
+            results.append({
+                "condition": condition["name"],
+                "probability": float(p[c]),
+                "description": condition.get("description", ""),
+                "recommendations": condition.get("recommendations", []),
+                "urgent": condition.get("urgent", False),
+                "matched": supporting,
+            })
+        return results
+
+    def fit_temperature(self, cases: Sequence[Tuple[Sequence[str], str]],
+                        grid: Optional[np.ndarray] = None) -> float:
+        """
+        Set the softmax temperature that minimizes the negative log-likelihood of
+        labelled cases, given as (patient statements, condition name), and return it.
+        """
+        index = {c["name"]: i for i, c in enumerate(self.conditions)}
+        X = np.array([self.evidence(texts) for texts, _ in cases])
+        labels = np.array([index[name] for _, name in cases])
+        scores = self.log_prior + (self.weights @ X.T).T
+        best, best_nll = self.temperature, np.inf
+        for t in grid if grid is not None else np.geomspace(0.25, 8.0, 61):
+            s = scores / t
+            s -= s.max(axis=1, keepdims=True)
+            nll = -(s[np.arange(len(labels)), labels] - np.log(np.exp(s).sum(axis=1))).mean()
+            if nll < best_nll:
+                best, best_nll = float(t), nll
+        self.temperature = best
+        return best
+
+
+def _binary_entropy(p: np.ndarray) -> np.ndarray:
+    """Entropy in bits of a yes/no answer that is "yes" with probability p."""
+    p = np.clip(p, 1e-12, 1 - 1e-12)
+    return -(p * np.log2(p) + (1 - p) * np.log2(1 - p))
+
+
+def parse_answer(text: str) -> Optional[bool]:
+    """
+    True or False when a reply opens with a yes or a no ("yeah, since Monday"), else None,
+    including for uncertain replies ("I don't know", "maybe") that shouldn't count as either.
+    """
+    words = normalize(text).split()
+    if any(" ".join(words[:length]) in UNSURE for length in (4, 3, 2, 1)):
+        return None
+    for length in (3, 2, 1):
+        opening = " ".join(words[:length])
+        if len(words) >= length and opening in YES:
+            return True
+        if len(words) >= length and opening in NO:
+            return False
+    return None
+
+
+_engine = None
+
+
+def get_symptom_engine() -> SymptomEngine:
+    """Process-wide engine loaded from CONDITIONS_FILE on first use."""
+    global _engine
+    if _engine is None:
+        _engine = SymptomEngine.from_file()
+    return _engine
+
+
+# Example quick test
+if __name__ == "__main__":
+    engine = get_symptom_engine()
+    statements = ["I've had a fever and a dry cough for 2 days, no runny nose", "my whole body aches and I'm exhausted"]
+    print("Extracted:", [engine.extract(s) for s in statements])
+    for result in engine.rank(statements):
+        print(f"{result['probability']:6.1%}  {result['condition']}  (matched: {', '.join(result['matched'])})")
+    question = engine.next_question(statements)
+    print("Next question:", engine.questions[question] if question is not None else None)
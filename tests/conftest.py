@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The modules live flat at the repo root and import each other by bare name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: drives the Streamlit app end to end (deselect with -m 'not slow')")
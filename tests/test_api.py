@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("flask")
+
+import api  # noqa: E402
+
+ITEM = {"medication": "Paracetamol", "dosage": "500mg", "frequency": "qds", "duration": "3 days"}
+
+
+class InlinePool:
+    """Runs jobs in the test process instead of worker processes."""
+
+    def run(self, job, *args, timeout=None):
+        return job(*args)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, "get_worker_pool", InlinePool)
+    return api.app.test_client()
+
+
+@pytest.mark.parametrize("body, message", [
+    ({}, '"prescriptions" must be a list of objects'),
+    ({"prescriptions": [ITEM, "Aspirin"]}, '"prescriptions" must be a list of objects'),
+    ({"prescriptions": [ITEM], "patient_info": []}, '"patient_info" must be an object and "diagnosis" a string'),
+    ({"prescriptions": [ITEM], "diagnosis": 5}, '"patient_info" must be an object and "diagnosis" a string'),
+    ({"prescriptions": [{"medication": 5}]}, '"prescriptions"[0].medication must be a string'),
+    ({"prescriptions": [ITEM, {**ITEM, "dosage": None}]}, '"prescriptions"[1].dosage must be a string'),
+    ({"prescriptions": [ITEM], "patient_info": {"age": None}}, '"patient_info".age must be a number or a string'),
+    ({"prescriptions": [ITEM], "patient_info": {"weight": [70]}}, '"patient_info".weight must be a number or a string'),
+    ({"prescriptions": [ITEM], "patient_info": {"age": True}}, '"patient_info".age must be a number or a string'),
+    ({"prescriptions": [ITEM], "patient_info": {"conditions": 3}}, '"patient_info".conditions must be a string'),
+    ({"prescriptions": [ITEM], "patient_info": {"allergies": ["penicillin"]}},
+     '"patient_info".allergies must be a string'),
+])
+def test_validate_rejects_malformed_bodies(client, body, message):
+    response = client.post("/validate", json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": message}
+
+
+@pytest.mark.parametrize("patient_info", [{"age": 30, "weight": 70.5}, {"age": "30", "weight": "70.5"}])
+def test_validate_accepts_numeric_age_and_weight(client, patient_info):
+    response = client.post("/validate", json={"prescriptions": [{**ITEM, "dosage": "5g"}],
+                                              "patient_info": patient_info})
+    assert response.status_code == 200
+    assert "DOSE ALERT: 5000 mg per dose" in response.get_json()["items"][0]["message"]
+
+
+def test_parse_rejects_missing_text(client):
+    assert client.post("/parse", json={"text": 5}).status_code == 400
+
+
+def test_ocr_rejects_non_images(client):
+    assert client.post("/ocr", data=b"not an image").get_json() == {"error": "upload is not a readable image"}
@@ -0,0 +1,31 @@
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("streamlit")
+
+from benchmarks.app_rerun import (  # noqa: E402
+    COLD_BUDGET_MS, INTERACTIONS, RERUN_BUDGET_MS, render, timed,
+)
+
+REPEAT = 5  # benchmarks/app_rerun.py takes more samples when profiling
+
+pytestmark = pytest.mark.slow
+
+
+def test_cold_interactions_within_budget():
+    start = time.perf_counter()
+    at = render()
+    cold = {"first render": (time.perf_counter() - start) * 1e3,
+            "first validation": timed(at, INTERACTIONS["validate"]),
+            "first chat message": timed(at, INTERACTIONS["send chat message"])}
+    over = {name: round(ms) for name, ms in cold.items() if ms > COLD_BUDGET_MS[name]}
+    assert not over, f"over the cold budget (ms): {over}"
+
+
+@pytest.mark.parametrize("name", list(INTERACTIONS))
+def test_rerun_within_budget(name):
+    render()  # the first run in this process pays for imports and knowledge-base loads
+    p95 = np.percentile([timed(render(), INTERACTIONS[name]) for _ in range(REPEAT)], 95)
+    assert p95 <= RERUN_BUDGET_MS[name], f"{name}: p95 {p95:.0f} ms > {RERUN_BUDGET_MS[name]} ms"
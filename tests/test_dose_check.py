@@ -0,0 +1,105 @@
+import math
+
+import pytest
+
+from dose_check import DoseLimits, get_dose_limits, parse_dose
+from validator import validate_prescription_data
+
+ROWS = [
+    {"drug": "paracetamol", "age_min": "0", "age_max": "12", "weight_min": "0", "weight_max": "",
+     "max_dose_mg": "1000", "max_daily_mg": "4000", "max_dose_mg_per_kg": "15", "max_daily_mg_per_kg": "60"},
+    {"drug": "paracetamol", "age_min": "12", "age_max": "", "weight_min": "0", "weight_max": "50",
+     "max_dose_mg": "1000", "max_daily_mg": "4000", "max_dose_mg_per_kg": "15", "max_daily_mg_per_kg": "60"},
+    {"drug": "paracetamol", "age_min": "12", "age_max": "", "weight_min": "50", "weight_max": "",
+     "max_dose_mg": "1000", "max_daily_mg": "4000", "max_dose_mg_per_kg": "", "max_daily_mg_per_kg": ""},
+    {"drug": "aspirin", "age_min": "16", "age_max": "", "weight_min": "0", "weight_max": "",
+     "max_dose_mg": "1000", "max_daily_mg": "4000", "max_dose_mg_per_kg": "", "max_daily_mg_per_kg": ""},
+]
+
+
+@pytest.fixture(scope="module")
+def limits():
+    return DoseLimits.from_rows(ROWS)
+
+
+def check(limits, medication="Paracetamol", dosage="500mg", frequency="qds", age="30", weight="70"):
+    return limits.check([{"medication": medication, "dosage": dosage, "frequency": frequency,
+                          "age": age, "weight": weight}])[0]
+
+
+def test_parse_dose_units():
+    assert parse_dose("1 g", "bd") == (1000.0, 2.0)
+    assert parse_dose("250 mcg", "")[0] == 0.25
+    dose, per_day = parse_dose("5 ml", "")
+    assert math.isnan(dose) and math.isnan(per_day)
+
+
+def test_within_limits(limits):
+    result = check(limits)
+    assert result == {"dose_mg": 500.0, "daily_mg": 2000.0, "mg_per_kg_day": 28.57, "messages": [], "warnings": []}
+
+
+def test_adult_mg_limits(limits):
+    messages = check(limits, dosage="1.5 g")["messages"]
+    assert messages == ["DOSE ALERT: 1500 mg per dose exceeds the 1000 mg maximum",
+                        "DOSE ALERT: 6000 mg/day (85.7 mg/kg/day) exceeds the 4000 mg/day maximum"]
+
+
+@pytest.mark.parametrize("age, weight, alerts", [
+    ("8", "20", 2),   # child band: 25 mg/kg per dose and 100 mg/kg/day are both over
+    ("8", "40", 0),   # same band, heavier child
+    ("30", "30", 2),  # adult under 50 kg gets the mg/kg limits too
+    ("30", "60", 0),  # adult over 50 kg: mg limits only
+])
+def test_age_and_weight_bands(limits, age, weight, alerts):
+    assert len(check(limits, age=age, weight=weight)["messages"]) == alerts
+
+
+def test_band_edges_belong_to_the_upper_band(limits):
+    assert check(limits, age="12", weight="50", dosage="1000mg")["messages"] == []
+    assert len(check(limits, age="11.9", weight="49", dosage="1000mg")["messages"]) == 2
+
+
+def test_missing_weight_asks_for_it(limits):
+    result = check(limits, weight="")
+    assert result["messages"] == []
+    assert result["warnings"] == ["DOSE WARNING: Patient weight needed to check the 15 mg/kg per dose "
+                                  "and 60 mg/kg/day limit"]
+    assert check(limits, weight="0")["warnings"] == result["warnings"]
+
+
+def test_missing_weight_still_checks_mg_limits(limits):
+    assert len(check(limits, weight="", dosage="2 g")["messages"]) == 2
+
+
+def test_missing_age_is_checked_as_adult_with_a_warning(limits):
+    result = check(limits, age="")
+    assert result["messages"] == []
+    assert result["warnings"] == ["DOSE WARNING: No patient age given, checked against limits for age 18+"]
+
+
+def test_no_limits_apply(limits):
+    assert check(limits, medication="Warfarin") is None
+    assert check(limits, medication="Aspirin", age="10") is None  # no band below 16
+    assert check(limits, dosage="") is None
+
+
+def test_shipped_limits_load():
+    result = get_dose_limits().check([{"medication": "Amoxicillin", "dosage": "500mg", "frequency": "tds",
+                                       "age": "6", "weight": ""}])[0]
+    assert result["warnings"] and result["warnings"][0].startswith("DOSE WARNING: Patient weight needed")
+
+
+@pytest.mark.parametrize("medication", ["Paracetamol", "Acetaminophen", "Paracetmol"])
+def test_synonyms_and_misspellings_get_the_drugs_limits(medication):
+    # 20 g/day for a 70 kg adult: over both the per-dose and daily maxima whatever the name
+    result = get_dose_limits().check([{"medication": medication, "dosage": "5g", "frequency": "qid",
+                                       "age": "30", "weight": "70"}])[0]
+    assert result is not None and len(result["messages"]) == 2
+
+
+def test_misspelled_overdose_is_rejected_end_to_end():
+    result = validate_prescription_data([{"medication": "Paracetmol", "dosage": "5g", "frequency": "qid"}],
+                                        {"age": "30", "weight": "70"}, "")
+    assert result["items"][0]["status"] == "rejected"
+    assert "DOSE ALERT: 5000 mg per dose" in result["items"][0]["message"]
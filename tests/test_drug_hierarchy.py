@@ -0,0 +1,113 @@
+import pytest
+
+from drug_hierarchy import DrugHierarchy, get_drug_hierarchy
+from rules import get_rule_engine, resolve_medication
+from validator import validate_prescription_data
+
+CLASSES = [
+    {"code": "J", "name": "antiinfective"},
+    {"code": "J01", "name": "antibacterial", "aliases": ["antibiotic"]},
+    {"code": "J01C", "name": "penicillin", "aliases": ["penicillins"]},
+    {"code": "J01CA", "name": "aminopenicillin"},
+    {"code": "J01DB", "name": "first-generation cephalosporin", "aliases": ["cephalosporin"]},
+    {"code": "N02", "name": "analgesic"},
+]
+DRUGS = {"amoxicillin": ["J01CA"], "cefalexin": ["J01DB"], "paracetamol": ["N02"]}
+SYNONYMS = {"amoxycillin": "amoxicillin", "cephalexin": "cefalexin"}
+
+
+@pytest.fixture(scope="module")
+def hierarchy():
+    return DrugHierarchy.from_spec(CLASSES, DRUGS, [["J01C", "J01DB"]], version=1, synonyms=SYNONYMS)
+
+
+@pytest.mark.parametrize("allergy", ["amoxicillin", "aminopenicillin", "penicillin", "penicillins", "antibiotic",
+                                     "antiinfective"])
+def test_allergy_to_the_drug_or_any_class_above_it(hierarchy, allergy):
+    assert hierarchy.closure(["amoxicillin"]) & hierarchy.mask([allergy])
+
+
+def test_allergy_does_not_reach_sibling_classes(hierarchy):
+    penicillin = hierarchy.mask(["penicillin"])
+    assert not hierarchy.closure(["cefalexin"]) & penicillin
+    assert not hierarchy.closure(["paracetamol"]) & hierarchy.mask(["antibiotic"])
+    assert hierarchy.label(hierarchy.closure(["amoxicillin"]) & penicillin) == "penicillin"
+
+
+def test_cross_reactivity(hierarchy):
+    (target, label), = hierarchy.cross_reactions(hierarchy.mask(["amoxicillin"]))
+    assert label == "penicillin" and hierarchy.closure(["cefalexin"]) & target
+    assert hierarchy.cross_reactions(hierarchy.mask(["cefalexin"])) == []
+
+
+def test_synonyms_share_the_drugs_closure(hierarchy):
+    assert hierarchy.closure(["cephalexin"]) == hierarchy.closure(["cefalexin"])
+    assert hierarchy.canonical("amoxycillin") == "amoxicillin"
+    assert hierarchy.canonical("amoxicillin") == "amoxicillin"
+    assert hierarchy.canonical("aminopenicillin") is None
+    assert hierarchy.mask(["cephalexin"]) & hierarchy.closure(["cefalexin"])  # allergy written with the synonym
+
+
+def test_classes_of(hierarchy):
+    assert {"penicillin", "antibiotic", "antiinfective"} <= set(hierarchy.classes_of("amoxycillin"))
+    assert hierarchy.classes_of("penicillin") == []
+
+
+def test_synonym_for_unknown_drug_is_rejected():
+    with pytest.raises(ValueError):
+        DrugHierarchy.from_spec(CLASSES, DRUGS, synonyms={"tylenol": "acetaminophen"})
+
+
+def item_status(medication, allergies="Penicillin"):
+    patient = {"age": "40", "weight": "70", "allergies": allergies, "conditions": ""}
+    result = validate_prescription_data(
+        [{"medication": medication, "dosage": "500mg", "frequency": "bd", "duration": "5 days"}], patient, "")
+    item = result["items"][0]
+    return item["status"], item["message"]
+
+
+@pytest.mark.parametrize("medication", ["Amoxicillin", "Co-amoxiclav", "Augmentin", "Amoxycillin", "Amoxicilin"])
+def test_penicillin_allergy_catches_synonyms_and_misspellings(medication):
+    status, message = item_status(medication)
+    assert status == "rejected" and "ALLERGY ALERT" in message
+
+
+@pytest.mark.parametrize("medication", ["Cefalexin", "Cephalexin"])
+def test_penicillin_allergy_warns_for_first_generation_cephalosporins(medication):
+    status, message = item_status(medication)
+    assert status == "warning" and "cross-reactivity" in message
+
+
+def test_unknown_medication_is_flagged_not_approved():
+    status, message = item_status("Foobarzol")
+    assert status == "warning" and "UNKNOWN MEDICATION: Foobarzol" in message
+    assert item_status("Paracetamol", allergies="")[0] == "approved"
+
+
+def test_rules_match_the_canonical_drug_name():
+    engine = get_rule_engine()
+    patient = engine.patient_facts({"age": "10"}, "")
+    fired = engine.check({"medication": "Acetylsalicylic acid", "frequency": "od"}, patient)
+    assert any("Aspirin not recommended" in message for _, message in fired)
+
+
+def test_resolve_medication():
+    hierarchy = get_drug_hierarchy()
+    synonym = resolve_medication("Acetaminophen", hierarchy)
+    assert "paracetamol" in synonym.drugs and synonym.corrected is None and not synonym.unknown
+    misspelled = resolve_medication("Warfrin", hierarchy)
+    assert "warfarin" in misspelled.drugs and misspelled.corrected == "Warfarin" and not misspelled.unknown
+    unknown = resolve_medication("Foobarzol", hierarchy)
+    assert unknown.unknown and unknown.corrected is None and unknown.closure == 0
+
+
+def test_misspelled_interacting_pair_is_caught_and_flagged():
+    result = validate_prescription_data([
+        {"medication": "Warfrin", "dosage": "5mg", "frequency": "od"},
+        {"medication": "Aspirin", "dosage": "75mg", "frequency": "od"},
+    ], {"age": "60", "weight": "70"}, "")
+    assert [found["severity"] for found in result["interactions"]] == ["major"]
+    warfarin = result["items"][0]
+    assert warfarin["status"] == "warning"
+    assert "NAME CHECK: Warfrin was read as Warfarin" in warfarin["message"]
+    assert "INTERACTION (major) with Aspirin" in warfarin["message"]
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobRunner
+
+
+class Gated:
+    """Job function that records when each label starts and blocks until released."""
+
+    def __init__(self):
+        self.started = []
+        self.gates = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, label, progress):
+        with self._lock:
+            self.started.append(label)
+            gate = self.gates.setdefault(label, threading.Event())
+        progress(0.5, "waiting")
+        gate.wait(5)
+        return label
+
+    def release(self, label):
+        with self._lock:
+            self.gates.setdefault(label, threading.Event()).set()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def runner():
+    runner = JobRunner(max_running=2, per_session=1, ttl=600)
+    yield runner
+    runner.shutdown()
+
+
+def test_identical_jobs_in_flight_are_deduplicated(runner):
+    fn = Gated()
+    first = runner.submit("k", fn, "x", session="a")
+    second = runner.submit("k", fn, "x", session="b")
+    assert first == second
+    fn.release("x")
+    assert runner.get(first).wait(5)
+    assert fn.started == ["x"] and runner.get(first).result == "x" and runner.get(first).status == DONE
+
+
+def test_finished_jobs_are_not_reused(runner):
+    fn = Gated()
+    fn.release("x")
+    first = runner.submit("k", fn, "x")
+    runner.get(first).wait(5)
+    second = runner.submit("k", fn, "x")
+    runner.get(second).wait(5)
+    assert first != second and fn.started == ["x", "x"]
+
+
+def test_one_session_cannot_take_every_slot(runner):
+    fn = Gated()
+    a = [runner.submit(f"a{i}", fn, f"a{i}", session="a") for i in range(3)]
+    b = runner.submit("b0", fn, "b0", session="b")
+    wait_for(lambda: len(fn.started) == 2)
+    assert sorted(fn.started) == ["a0", "b0"]
+    assert [runner.get(j).status for j in a] == [RUNNING, QUEUED, QUEUED]
+    assert runner.stats() == {"running": 2, "queued": 2, "kept": 4}
+    for label in ("a0", "a1", "a2", "b0"):
+        fn.release(label)
+    for job_id in a + [b]:
+        assert runner.get(job_id).wait(5)
+
+
+def test_queued_jobs_start_round_robin_across_sessions():
+    runner = JobRunner(max_running=1, per_session=1)
+    fn = Gated()
+    ids = [runner.submit("a0", fn, "a0", session="a")]
+    wait_for(lambda: fn.started == ["a0"])
+    ids += [runner.submit(label, fn, label, session=label[0]) for label in ("a1", "a2", "b0", "c0")]
+    for label in ("a0", "a1", "b0", "c0", "a2"):
+        fn.release(label)
+    for job_id in ids:
+        assert runner.get(job_id).wait(5)
+    runner.shutdown()
+    assert fn.started == ["a0", "a1", "b0", "c0", "a2"]
+
+
+def test_failures_are_reported_and_free_the_key(runner):
+    def boom(progress):
+        raise ValueError("bad input")
+
+    job = runner.get(runner.submit("k", boom))
+    assert job.wait(5)
+    assert (job.status, job.error, job.result) == (FAILED, "ValueError: bad input", None)
+    retry = runner.submit("k", boom)
+    assert retry != job.id
+
+
+def test_progress_is_visible_while_running(runner):
+    fn = Gated()
+    job = runner.get(runner.submit("k", fn, "x"))
+    wait_for(lambda: job.message == "waiting")
+    assert job.progress == 0.5 and not job.done
+    fn.release("x")
+    job.wait(5)
+    assert job.progress == 1.0
+
+
+def test_finished_jobs_expire_after_the_ttl():
+    runner = JobRunner(max_running=1, ttl=0)
+    job_id = runner.submit("k", lambda progress: 1)
+    runner.get(job_id).wait(5)
+    time.sleep(0.01)
+    runner.submit("other", lambda progress: 2)  # submissions prune expired jobs
+    assert runner.get(job_id) is None
+    runner.shutdown()
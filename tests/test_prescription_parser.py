@@ -0,0 +1,68 @@
+import pytest
+
+from prescription_parser import parse_item, parse_many, parse_prescription_text
+
+
+def test_full_item():
+    p = parse_item("Paracetamol 500mg orally twice a day for 7 days")
+    assert p["medication"] == "Paracetamol"
+    assert (p["dosage"], p["strength"], p["unit"]) == ("500mg", 500.0, "mg")
+    assert (p["frequency"], p["doses_per_day"]) == ("twice a day", 2.0)
+    assert (p["duration"], p["duration_days"]) == ("7 days", 7.0)
+    assert p["route"] == "oral"
+
+
+def test_fields_in_any_order():
+    p = parse_item("Tab Amoxicillin for 2 weeks tds 250 mg po")
+    assert p["medication"] == "Amoxicillin"
+    assert (p["strength"], p["doses_per_day"], p["duration_days"], p["route"]) == (250.0, 3.0, 14.0, "oral")
+
+
+def test_multi_word_name_stops_at_route_and_frequency():
+    assert parse_item("Insulin glargine 10 units sc at night")["medication"] == "Insulin glargine"
+    assert parse_item("Salbutamol inhaled 100 mcg qds")["medication"] == "Salbutamol"
+
+
+@pytest.mark.parametrize("frequency, per_day", [
+    ("od", 1), ("bd", 2), ("tds", 3), ("qid", 4), ("3 times a day", 3), ("two times daily", 2),
+    ("every 8 hours", 3), ("q6h", 4), ("once weekly", 1 / 7), ("at night", 1),
+])
+def test_doses_per_day(frequency, per_day):
+    assert parse_item(f"Drug 10mg {frequency}")["doses_per_day"] == pytest.approx(per_day)
+
+
+@pytest.mark.parametrize("unit, expected", [("mcg", "mcg"), ("µg", "mcg"), ("g", "g"), ("IU", "IU"), ("units", "IU")])
+def test_units_are_normalized(unit, expected):
+    assert parse_item(f"Drug 5 {unit} od")["unit"] == expected
+
+
+def test_bare_number_is_the_strength():
+    p = parse_item("Paracetamol 500 bd")
+    assert (p["dosage"], p["strength"], p["unit"]) == ("500", 500.0, None)
+
+
+def test_concentration_with_dose_volume():
+    p = parse_item("Amoxicillin 250mg/5ml 5ml tds for 5 days")
+    assert (p["medication"], p["dosage"]) == ("Amoxicillin", "250mg/5ml 5ml")
+    assert (p["strength"], p["unit"], p["doses_per_day"]) == (250.0, "mg", 3.0)
+    assert parse_item("Amoxicillin 250mg/5ml 10ml tds")["strength"] == 500.0
+    assert parse_item("Cefalexin 125 mg / ml 2 ml bd")["strength"] == 250.0
+
+
+def test_concentration_alone_or_with_explicit_dose():
+    assert parse_item("Amoxicillin 250 mg / 5 ml tds")["strength"] == 250.0
+    p = parse_item("Paracetamol 120mg/5ml 500mg qds")
+    assert (p["strength"], p["unit"]) == (500.0, "mg")
+
+
+def test_items_without_a_dose_fall_back_to_the_whole_text():
+    items = parse_prescription_text("Paracetamol 500mg bd; Rest and fluids\nIbuprofen 200mg tds")
+    assert [i["medication"] for i in items] == ["Paracetamol", "Rest and fluids", "Ibuprofen"]
+
+
+def test_parse_many_matches_single_parses_and_copies_results():
+    texts = ["Paracetamol 500mg bd; Ibuprofen 200mg tds", "Paracetamol 500mg bd"]
+    results = parse_many(texts)
+    assert results == [parse_prescription_text(t) for t in texts]
+    results[0][0]["medication"] = "changed"
+    assert results[1][0]["medication"] == "Paracetamol"
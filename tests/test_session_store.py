@@ -0,0 +1,129 @@
+import random
+import types
+
+import pytest
+
+import session_store
+from session_store import SessionStore, decode, encode
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+def state(seed: int, messages: int = 10) -> dict:
+    # Random text barely compresses, so every session's blob is about the same size
+    rng = random.Random(seed)
+    return {"messages": [("user", "%032x" % rng.getrandbits(128), i) for i in range(messages)],
+            "answers": {3: True, 7: False}, "diagnosis_stage": "followup"}
+
+
+def test_round_trip_restores_tuples_and_int_keys():
+    original = state(0)
+    restored = decode(encode(original))
+    assert restored == original
+    assert isinstance(restored["messages"][0], tuple) and list(restored["answers"]) == [3, 7]
+
+
+def test_encode_keeps_the_newest_messages():
+    assert decode(encode(state(0, 50), max_messages=5))["messages"] == state(0, 50)["messages"][-5:]
+
+
+def test_encode_trims_oversized_sessions():
+    big = {**state(0, 400), "ocr": {"text": "x" * 100}, "validation_result": {"items": []}}
+    restored = decode(encode(big, max_bytes=4096))
+    assert 0 < len(restored["messages"]) < 400
+    assert restored["messages"][-1] == big["messages"][-1]
+    assert "ocr" in restored  # dropped only if trimming the transcript isn't enough
+
+    restored = decode(encode({**big, "ocr": {"text": "%x" % random.Random(1).getrandbits(40000)}}, max_bytes=4096))
+    assert "validation_result" not in restored and "ocr" not in restored and len(restored["messages"]) == 1
+
+
+def test_memory_tier_is_bounded_and_spills_to_sqlite(tmp_path, clock):
+    blob = len(encode(state(0)))
+    store = SessionStore(str(tmp_path / "sessions.db"), ttl=3600, max_memory_bytes=blob * 3)
+    for i in range(10):
+        store.put(f"s{i}", state(i))
+    stats = store.stats()
+    assert stats["memory_bytes"] <= blob * 3 + 64
+    assert stats["sessions_in_memory"] + stats["spilled"] == 10
+
+    assert store.get("s0") == state(0)  # least recently used: read back from SQLite
+    assert store.stats()["sessions_in_memory"] + store.stats()["spilled"] == 10
+    assert store.get("s9") == state(9)
+
+
+def test_without_a_database_evicted_sessions_are_dropped(clock):
+    blob = len(encode(state(0)))
+    store = SessionStore(None, ttl=3600, max_memory_bytes=blob * 3)
+    for i in range(10):
+        store.put(f"s{i}", state(i))
+    assert store.get("s0") is None
+    assert store.get("s9") == state(9)
+    assert store.stats()["spilled"] == 0
+
+
+def test_get_refreshes_recency(clock):
+    blob = len(encode(state(0)))
+    store = SessionStore(None, ttl=3600, max_memory_bytes=blob * 2 + 32)
+    store.put("a", state(0))
+    store.put("b", state(1))
+    store.get("a")
+    store.put("c", state(2))  # pushes out b, not a
+    assert store.get("b") is None and store.get("a") == state(0)
+
+
+@pytest.mark.parametrize("spill", [False, True])
+def test_idle_sessions_expire(tmp_path, clock, spill):
+    blob = len(encode(state(0)))
+    store = SessionStore(str(tmp_path / "sessions.db") if spill else None, ttl=60, max_memory_bytes=blob * 2)
+    for i in range(4):
+        store.put(f"s{i}", state(i))
+    clock.now += 30
+    store.put("fresh", state(9))
+    clock.now += 45  # s0..s3 idle 75s, fresh 45s
+    assert store.get("s3") is None and store.get("s0") is None
+    assert store.get("fresh") == state(9)
+
+
+def test_evict_idle_sweeps_both_tiers(tmp_path, clock):
+    blob = len(encode(state(0)))
+    store = SessionStore(str(tmp_path / "sessions.db"), ttl=60, max_memory_bytes=blob * 2)
+    for i in range(5):
+        store.put(f"s{i}", state(i))
+    assert store.stats()["spilled"] > 0
+    in_memory = store.stats()["sessions_in_memory"]
+    clock.now += 61
+    assert store.evict_idle() == in_memory
+    assert store.stats() == {"sessions_in_memory": 0, "memory_bytes": 0, "spilled": 0}
+
+
+def test_put_sweeps_periodically(clock):
+    store = SessionStore(None, ttl=60)
+    store.put("old", state(0))
+    clock.now += session_store.EVICT_INTERVAL + 61
+    store.put("new", state(1))
+    assert store.stats()["sessions_in_memory"] == 1
+
+
+def test_delete_removes_from_both_tiers(tmp_path, clock):
+    blob = len(encode(state(0)))
+    store = SessionStore(str(tmp_path / "sessions.db"), ttl=3600, max_memory_bytes=blob)
+    store.put("a", state(0))
+    store.put("b", state(1))  # a spills
+    store.delete("a")
+    store.delete("b")
+    assert store.get("a") is None and store.get("b") is None
+    assert store.stats() == {"sessions_in_memory": 0, "memory_bytes": 0, "spilled": 0}
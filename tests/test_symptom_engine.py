@@ -0,0 +1,27 @@
+import pytest
+
+from symptom_engine import parse_answer
+
+
+@pytest.mark.parametrize("reply", ["yes", "Yes!", "yeah, since Monday", "Yep", "sure", "I do", "I have, for a week",
+                                   "a little", "Sometimes at night"])
+def test_yes(reply):
+    assert parse_answer(reply) is True
+
+
+@pytest.mark.parametrize("reply", ["no", "No.", "nope, but my throat hurts", "not really", "never", "I don't",
+                                   "I haven't", "I'm not", "none"])
+def test_no(reply):
+    assert parse_answer(reply) is False
+
+
+@pytest.mark.parametrize("reply", ["I don't know", "I DON'T KNOW.", "dunno", "I'm not sure", "not sure tbh",
+                                   "no idea", "I have no idea", "maybe", "Maybe, a little", "perhaps", "possibly",
+                                   "I can't tell", "I don't remember", "hard to say"])
+def test_uncertain_replies_answer_nothing(reply):
+    assert parse_answer(reply) is None
+
+
+@pytest.mark.parametrize("reply", ["", "   ", "headache since yesterday", "my throat hurts", "the fever started monday"])
+def test_replies_without_an_answer(reply):
+    assert parse_answer(reply) is None
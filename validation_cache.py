@@ -0,0 +1,137 @@
+"""
+Memoized prescription validation, shared by the Streamlit app and any API.
+
+Results are keyed by a SHA-256 of the canonicalized diagnosis, patient info and
+prescription list together with the knowledge-base version (a hash of the rule,
+hierarchy, drug-name, interaction and dose-limit files plus the rule-set version), so a
+rerun with unchanged inputs is a dictionary lookup. The cache is an LRU bounded by entry count;
+reload_knowledge_base() re-reads the data files and drops every cached result.
+Cached results are shared: treat them as read-only.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import dose_check
+import drug_hierarchy
+import drug_lexicon
+import interactions
+import rules
+from prescription_parser import parse_prescription_text
+from validator import validate_prescription_data
+
+VALIDATION_CACHE_SIZE = 1024
+PRESCRIPTION_FIELDS = ("medication", "dosage", "frequency", "duration")
+PATIENT_FIELDS = ("age", "weight", "allergies", "conditions")
+KNOWLEDGE_FILES = (rules.RULES_FILE, drug_hierarchy.HIERARCHY_FILE, drug_lexicon.DRUG_NAMES_FILE,
+                   interactions.INTERACTIONS_FILE, dose_check.DOSE_LIMITS_FILE)
+
+_version: Optional[str] = None
+
+
+def knowledge_version() -> str:
+    """Identifies the rule set and data files that produce validation results."""
+    global _version
+    if _version is None:
+        digest = hashlib.sha256(str(rules.get_rule_engine().version).encode())
+        for path in KNOWLEDGE_FILES:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        _version = digest.hexdigest()[:16]
+    return _version
+
+
+def validation_key(prescriptions: List[Dict], patient_info: Dict, diagnosis: str) -> str:
+    """Canonical hash of one validation request; key order and surrounding whitespace don't matter."""
+    canonical = json.dumps([
+        [[str(p.get(field, "")).strip() for field in PRESCRIPTION_FIELDS] for p in prescriptions],
+        [str(patient_info.get(field, "")).strip() for field in PATIENT_FIELDS],
+        " ".join(str(diagnosis).split()),
+        knowledge_version(),
+    ])
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ValidationCache:
+    def __init__(self, max_entries: int = VALIDATION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, result: Dict):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+
+
+def get_validation_cache() -> ValidationCache:
+    """Process-wide validation cache."""
+    global _cache
+    if _cache is None:
+        _cache = ValidationCache()
+    return _cache
+
+
+def cached_validate(prescriptions: List[Dict], patient_info: Dict, diagnosis: str) -> Dict:
+    """validate_prescription_data, computed once per distinct request and knowledge-base version."""
+    cache = get_validation_cache()
+    key = validation_key(prescriptions, patient_info, diagnosis)
+    result = cache.get(key)
+    if result is None:
+        result = validate_prescription_data(prescriptions, patient_info, diagnosis)
+        cache.put(key, result)
+    return result
+
+
+@lru_cache(maxsize=VALIDATION_CACHE_SIZE)
+def _parse(text: str) -> tuple:
+    return tuple(parse_prescription_text(text))
+
+
+def cached_parse(text: str) -> List[Dict]:
+    """parse_prescription_text, memoized on the text; returns fresh dicts the caller may edit."""
+    return [dict(p) for p in _parse(text)]
+
+
+def load_knowledge_base():
+    """Load the rule set, hierarchy, interaction table and dose limits now instead of on first use."""
+    rules.get_rule_engine()
+    interactions.get_interaction_table()
+    dose_check.get_dose_limits()
+    knowledge_version()
+
+
+def reload_knowledge_base():
+    """Re-read every knowledge-base file on next use and drop all cached validations."""
+    global _version
+    rules._engine = None
+    rules.resolve_medication.cache_clear()
+    drug_hierarchy._hierarchy = None
+    drug_lexicon._lexicon = None
+    interactions._table = None
+    dose_check._limits = None
+    _version = None
+    get_validation_cache().clear()
@@ -1,42 +1,124 @@
-def validate_prescription_data(prescriptions, patient_info, diagnosis):
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dose_check import get_dose_limits
+from interactions import SEVERITY_STATUS, get_interaction_table
+from rules import get_rule_engine
+
+RECOMMENDATIONS = [
+    'Verify patient allergies before dispensing',
+    'Monitor patient for adverse reactions',
+    'Ensure proper patient education on medication usage',
+    'Schedule appropriate follow-up appointments'
+]
+
+
+def validate_prescription_data(prescriptions: List[Dict[str, str]], patient_info: Dict[str, str],
+                               diagnosis: str) -> Dict:
     """
     Validates prescriptions and returns a structured result.
     prescriptions: list of dicts with keys ['medication', 'dosage', 'frequency', 'duration']
     patient_info: dict with keys ['age', 'weight', 'allergies', 'conditions']
     diagnosis: string
+    Clinical checks come from the rule engine (data/rules.json); doses are checked
+    against data/dose_limits.csv and every pair of medications for interactions
+    (data/interactions.csv).
     """
     result = {
         'overall': 'approved',
         'items': [],
-        'recommendations': []
+        'interactions': [],
+        'recommendations': list(RECOMMENDATIONS)
     }
 
-    for p in prescriptions:
-        status = 'approved'
-        issues = []
-
-        # Example checks
-        if not p['medication']:
-            issues.append("Medication name missing")
-            status = 'rejected'
-        if not p['dosage']:
-            issues.append("Dosage missing")
-            status = 'rejected'
-
-        # Allergy check
-        if 'penicillin' in (p['medication'].lower()) and 'penicillin' in patient_info.get('allergies', '').lower():
-            issues.append("ALLERGY ALERT: Patient allergic to penicillin")
-            status = 'rejected'
+    engine = get_rule_engine()
+    patient = engine.patient_facts(patient_info, diagnosis)
+    interactions = get_interaction_table().check(prescriptions)
+    item_interactions = interactions_by_item(interactions)
+    doses = get_dose_limits().check([
+        {**p, 'age': patient_info.get('age', ''), 'weight': patient_info.get('weight', '')} for p in prescriptions
+    ])
 
+    for i, p in enumerate(prescriptions):
+        status, issues = assess_item(p, engine.check(p, patient), doses[i], item_interactions.get(i, []))
         result['items'].append({
-            'medication': p['medication'],
+            'medication': p.get('medication', '').strip() or f"Medication {i + 1}",
             'status': status,
-            'message': '. '.join(issues) if issues else "Looks good"
+            'message': '. '.join(issues)
         })
 
-    if any(item['status'] == 'rejected' for item in result['items']):
-        result['overall'] = 'rejected'
-    elif any(item['status'] == 'warning' for item in result['items']):
-        result['overall'] = 'warning'
+    result['interactions'] = [
+        {'medications': list(found['medications']), 'severity': found['severity'], 'description': found['description']}
+        for found in interactions
+    ]
 
+    result['overall'] = overall_status(item['status'] for item in result['items'])
     return result
+
+
+def interactions_by_item(interactions: List[Dict]) -> Dict[int, List[Tuple[str, str, str]]]:
+    """(severity, other medication, description) for each item index in an interaction."""
+    by_item = {}
+    for found in interactions:
+        for i, other in zip(found['items'], reversed(found['medications'])):
+            by_item.setdefault(i, []).append((found['severity'], other, found['description']))
+    return by_item
+
+
+def assess_item(p: Dict[str, str], rule_hits: List[Tuple[str, str]], dose: Optional[Dict],
+                interactions: List[Tuple[str, str, str]]) -> Tuple[str, List[str]]:
+    """Combine every check on one prescription item into its (status, issues)."""
+    status = 'approved'
+    issues = []
+
+    if not p.get('medication', '').strip():
+        issues.append("Medication name is required")
+        status = 'rejected'
+    if not p.get('dosage', '').strip():
+        issues.append("Dosage is required")
+        status = 'rejected'
+
+    for rule_status, message in rule_hits:
+        issues.append(message)
+        if rule_status == 'rejected' or status == 'approved':
+            status = rule_status
+
+    if dose and dose['messages']:
+        issues.extend(dose['messages'])
+        status = 'rejected'
+    if dose and dose['warnings']:
+        issues.extend(dose['warnings'])
+        if status == 'approved':
+            status = 'warning'
+
+    for severity, other, description in interactions:
+        issues.append(f"INTERACTION ({severity}) with {other}: {description}")
+        interaction_status = SEVERITY_STATUS[severity]
+        if interaction_status == 'rejected' or (status == 'approved' and interaction_status == 'warning'):
+            status = interaction_status
+
+    if not issues:
+        issues.append("Prescription appears appropriate for the given diagnosis")
+    return status, issues
+
+
+def overall_status(statuses: Iterable[str]) -> str:
+    statuses = set(statuses)
+    if 'rejected' in statuses:
+        return 'rejected'
+    if 'warning' in statuses:
+        return 'warning'
+    return 'approved'
+
+
+# Quick test
+if __name__ == "__main__":
+    patient = {'age': '15', 'weight': '50', 'allergies': 'Penicillin', 'conditions': ''}
+    prescriptions = [
+        {'medication': 'Amoxicillin', 'dosage': '500mg', 'frequency': 'twice daily', 'duration': '7 days'},
+        {'medication': 'Aspirin', 'dosage': '100mg', 'frequency': 'once daily', 'duration': '5 days'},
+        {'medication': 'Ibuprofen', 'dosage': '200mg', 'frequency': '4 times a day', 'duration': '3 days'},
+        {'medication': 'Warfarin', 'dosage': '5mg', 'frequency': 'once daily', 'duration': '30 days'}
+    ]
+    diagnosis = 'Bacterial infection'
+    res = validate_prescription_data(prescriptions, patient, diagnosis)
+    print(res)